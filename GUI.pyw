@@ -1,13 +1,25 @@
 import sys
 import traceback
+import multiprocessing
 from pathlib import Path
 import threading
+import time
 from concurrent.futures import CancelledError
-import pythoncom
-from wakepy import keep
 from PyQt6 import QtCore, QtGui, QtWidgets
-from core import run_excel_translation
-from api_key_service import get_openai_api_key
+from telemetry import ProgressEvent, Tracer
+from api_key_service import forget_validation, get_openai_api_key
+
+INFO_TEXT = "Выберите таблицу для перевода (.xlsx)"
+PROGRESS_STAGES = {
+    "collect": "Сбор данных, листов",
+    "translate": "Перевод, пачек",
+    "apply": "Запись перевода, листов",
+    "save": "Сохранение",
+}
+# Доля этапа в общей полосе прогресса: основное время уходит на запросы к API
+STAGE_WEIGHTS = {"collect": 0.10, "translate": 0.75, "apply": 0.10, "save": 0.05}
+LOG_FLUSH_INTERVAL_MS = 100
+LOG_MAX_BLOCKS = 5000
 
 def _load_app_icon() -> QtGui.QIcon:
     """Загружает иконку приложения"""
@@ -29,14 +41,17 @@ def _load_app_icon() -> QtGui.QIcon:
             return QtGui.QIcon(str(icon_path))
     return QtGui.QIcon()
 
-class QtStream(QtCore.QObject):
-    """Файлоподобный объект для перенаправления stdout/stderr в GUI."""
+class QtStream:
+    """Файлоподобный объект для перенаправления stdout/stderr в GUI.
 
-    text = QtCore.pyqtSignal(str)
+    Запись только копит текст в буфере; GUI забирает его через take()
+    по таймеру, одной вставкой за тик.
+    """
 
-    def __init__(self, parent=None):
-        super().__init__(parent)
+    def __init__(self):
         self.encoding = "utf-8"
+        self._chunks: list[str] = []
+        self._lock = threading.Lock()
 
     def write(self, s):
         if s is None:
@@ -46,17 +61,59 @@ class QtStream(QtCore.QObject):
         except Exception:
             text = "[stream] <unprintable>"
         if text:
-            self.text.emit(text)
+            with self._lock:
+                self._chunks.append(text)
         return len(text)
 
+    def take(self) -> str:
+        with self._lock:
+            chunks, self._chunks = self._chunks, []
+        return "".join(chunks)
+
     def flush(self):
         return
 
     def isatty(self):
         return False
 
+class ProgressEstimate:
+    """Сводит события этапов в общий процент выполнения и оценку оставшегося времени"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.stages: dict[str, ProgressEvent] = {}
+        self.last: ProgressEvent | None = None
+        self.fraction = 0.0
+
+    def _stage_fraction(self, stage: str) -> float:
+        # Начатое сохранение значит, что все предыдущие этапы завершены
+        if "save" in self.stages and stage != "save":
+            return 1.0
+        event = self.stages.get(stage)
+        if event is None or event.total <= 0:
+            return 0.0
+        return min(1.0, event.done / event.total)
+
+    def update(self, event: ProgressEvent) -> None:
+        self.stages[event.stage] = event
+        self.last = event
+        fraction = sum(weight * self._stage_fraction(stage) for stage, weight in STAGE_WEIGHTS.items())
+        # Число пачек растёт по мере сбора листов — полоса не должна откатываться назад
+        self.fraction = max(self.fraction, min(1.0, fraction))
+
+    def eta_s(self) -> float | None:
+        elapsed = time.monotonic() - self.started
+        if self.fraction < 0.03 or elapsed < 2:
+            return None
+        return elapsed * (1 - self.fraction) / self.fraction
+
+def _format_eta(seconds: float) -> str:
+    seconds = int(seconds + 0.5)
+    if seconds >= 60:
+        return f"{seconds // 60} мин. {seconds % 60} сек."
+    return f"{seconds} сек."
+
 class TranslateWorker(QtCore.QThread):
-    log = QtCore.pyqtSignal(str)
     finished_ok = QtCore.pyqtSignal()
     finished_fail = QtCore.pyqtSignal(str)
     finished_cancelled = QtCore.pyqtSignal()
@@ -66,26 +123,51 @@ class TranslateWorker(QtCore.QThread):
         self.input_file = input_file
         self.api_key = api_key
         self.cancel_event = cancel_event
+        self.log_stream = QtStream()
+        self._progress: dict[str, ProgressEvent] = {}
+        self._progress_lock = threading.Lock()
 
     def request_cancel(self) -> None:
         self.cancel_event.set()
 
+    def _on_trace_event(self, event) -> None:
+        # Вызывается из рабочих потоков; GUI забирает последнее событие каждого этапа по таймеру
+        if isinstance(event, ProgressEvent):
+            with self._progress_lock:
+                self._progress.pop(event.stage, None)
+                self._progress[event.stage] = event
+
+    def take_log(self) -> str:
+        return self.log_stream.take()
+
+    def take_progress(self) -> list[ProgressEvent]:
+        with self._progress_lock:
+            events, self._progress = list(self._progress.values()), {}
+        return events
+
     def run(self):
+        # Тяжёлые модули (openai, win32com, wakepy) грузятся при первом запуске
+        # перевода, а не до появления окна
+        import pythoncom
+        from wakepy import keep
+        from core import run_excel_translation
+        from translator import TranslationError
+
         pythoncom.CoInitialize()
 
         old_out, old_err = sys.stdout, sys.stderr
 
-        out_stream = QtStream()
-        err_stream = QtStream()
-        out_stream.text.connect(self.log)
-        err_stream.text.connect(self.log)
-
         try:
-            sys.stdout = out_stream
-            sys.stderr = err_stream
+            sys.stdout = self.log_stream
+            sys.stderr = self.log_stream
 
             with keep.running():
-                run_excel_translation(self.input_file, self.api_key, cancel_event=self.cancel_event)
+                run_excel_translation(
+                    self.input_file,
+                    self.api_key,
+                    cancel_event=self.cancel_event,
+                    tracer=Tracer([self._on_trace_event]),
+                )
 
             self.finished_ok.emit()
 
@@ -93,6 +175,8 @@ class TranslateWorker(QtCore.QThread):
             self.finished_cancelled.emit()
 
         except Exception as e:
+            if isinstance(e, TranslationError) and e.fatal:
+                forget_validation()
             if isinstance(e, (ValueError, FileNotFoundError, RuntimeError)):
                 self.finished_fail.emit(str(e) or repr(e))
             else:
@@ -125,7 +209,7 @@ class MainWindow(QtWidgets.QMainWindow):
         layout = QtWidgets.QVBoxLayout(central)
         layout.setSpacing(15)
 
-        self.info_label = QtWidgets.QLabel("Выберите таблицу для перевода (.xlsx)")
+        self.info_label = QtWidgets.QLabel(INFO_TEXT)
         self.info_label.setObjectName("InfoLabel")
         self.info_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
         self.info_label.setStyleSheet("font-size: 14px; font-weight: bold;")
@@ -142,8 +226,21 @@ class MainWindow(QtWidgets.QMainWindow):
         self.log_view.setPlaceholderText("Лог процесса перевода появится здесь...")
         self.log_view.setReadOnly(True)
         self.log_view.setLineWrapMode(QtWidgets.QPlainTextEdit.LineWrapMode.NoWrap)
+        self.log_view.setMaximumBlockCount(LOG_MAX_BLOCKS)
         layout.addWidget(self.log_view)
 
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setTextVisible(True)
+        self.progress_bar.setFormat("%p%")
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+
+        self.progress: ProgressEstimate | None = None
+        self.log_timer = QtCore.QTimer(self)
+        self.log_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self.log_timer.timeout.connect(self.flush_worker_output)
+
         self.action_stack = QtWidgets.QStackedWidget()
         layout.addWidget(self.action_stack)
 
@@ -186,11 +283,50 @@ class MainWindow(QtWidgets.QMainWindow):
     def append_log(self, text: str) -> None:
         if not text:
             return
-        cursor = self.log_view.textCursor()
+        scrollbar = self.log_view.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 2
+        cursor = QtGui.QTextCursor(self.log_view.document())
         cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
         cursor.insertText(text)
-        self.log_view.setTextCursor(cursor)
-        self.log_view.ensureCursorVisible()
+        # Не сбиваем прокрутку, если пользователь читает лог выше
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+    @QtCore.pyqtSlot()
+    def flush_worker_output(self) -> None:
+        """Тик таймера: одна вставка накопленного лога и обновление прогресса"""
+
+        if self.worker is None:
+            return
+        self.append_log(self.worker.take_log())
+
+        events = self.worker.take_progress()
+        if not events or self.progress is None:
+            return
+        for event in events:
+            self.progress.update(event)
+
+        self.progress_bar.setValue(int(self.progress.fraction * 1000))
+        event = self.progress.last
+        label = PROGRESS_STAGES.get(event.stage, event.stage)
+        text = f"{label}..." if event.stage == "save" else f"{label}: {event.done}/{event.total}"
+        eta = self.progress.eta_s()
+        if eta is not None:
+            text += f" · осталось ~{_format_eta(eta)}"
+        self.info_label.setText(text)
+
+    def _start_progress(self) -> None:
+        self.progress = ProgressEstimate()
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.log_timer.start()
+
+    def _stop_progress(self) -> None:
+        self.log_timer.stop()
+        self.flush_worker_output()
+        self.progress = None
+        self.progress_bar.setVisible(False)
+        self.info_label.setText(INFO_TEXT)
 
     def on_choose_file(self) -> None:
         input_file, _ = QtWidgets.QFileDialog.getOpenFileName(
@@ -237,7 +373,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.cancel_event = threading.Event()
 
         self.worker = TranslateWorker(self.input_file, api_key, cancel_event=self.cancel_event, parent=self)
-        self.worker.log.connect(self.append_log)
+        self._start_progress()
         self.worker.finished_ok.connect(self.on_finished_ok)
         self.worker.finished_fail.connect(self.on_finished_fail)
         self.worker.finished_cancelled.connect(self.on_finished_cancelled)
@@ -258,6 +394,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.cancel_btn.setCursor(QtCore.Qt.CursorShape.ArrowCursor)
 
     def on_finished_ok(self) -> None:
+        self._stop_progress()
         self.action_stack.setCurrentWidget(self.start_btn)
         self.start_btn.setEnabled(True)
         self.cancel_btn.setEnabled(True)
@@ -272,6 +409,7 @@ class MainWindow(QtWidgets.QMainWindow):
             QtCore.QTimer.singleShot(0, self.close)
 
     def on_finished_fail(self, detail: str) -> None:
+        self._stop_progress()
         self.append_log("\n\n❌ " + (detail or "Unknown error") + "\n")
         self.action_stack.setCurrentWidget(self.start_btn)
         self.start_btn.setEnabled(True)
@@ -287,6 +425,7 @@ class MainWindow(QtWidgets.QMainWindow):
             QtCore.QTimer.singleShot(0, self.close)
 
     def on_finished_cancelled(self) -> None:
+        self._stop_progress()
         self.append_log("⛔ Перевод отменён. Результат не сохранён.\n\n")
 
         self.action_stack.setCurrentWidget(self.start_btn)
@@ -312,6 +451,7 @@ class MainWindow(QtWidgets.QMainWindow):
         super().closeEvent(event)
 
 def main() -> None:
+    multiprocessing.freeze_support()
     app = QtWidgets.QApplication(sys.argv)
 
     app.setWindowIcon(_load_app_icon())
@@ -1,11 +1,16 @@
+import time
 from typing import NamedTuple, Optional
 from PyQt6.QtCore import QSettings, Qt
 from PyQt6.QtWidgets import QApplication, QInputDialog, QLineEdit, QMessageBox
-from openai import APITimeoutError, APIConnectionError, OpenAI
+from openai_client import key_fingerprint, run_async, shared_async_client
 
 SETTINGS_ORG = "AI_Tools"
 SETTINGS_APP = "PPT_Translator"
 SETTINGS_KEY = "openai_api_key"
+SETTINGS_VALIDATED_HASH = "openai_api_key_validated_hash"
+SETTINGS_VALIDATED_AT = "openai_api_key_validated_at"
+# Сколько секунд доверять успешной проверке ключа без повторного запроса к API
+VALIDATION_TTL_S = 24 * 60 * 60
 
 class ApiKeyValidationResult(NamedTuple):
     is_valid: bool
@@ -31,12 +36,35 @@ def show_no_internet_message(parent, details: str = "") -> bool:
     )
     return btn == QMessageBox.StandardButton.Retry
 
+def is_validation_cached(settings: QSettings, api_key: str) -> bool:
+    """Ключ успешно проверялся не раньше VALIDATION_TTL_S секунд назад."""
+
+    if settings.value(SETTINGS_VALIDATED_HASH, "") != key_fingerprint(api_key):
+        return False
+    try:
+        validated_at = float(settings.value(SETTINGS_VALIDATED_AT, 0) or 0)
+    except (TypeError, ValueError):
+        return False
+    return 0 <= time.time() - validated_at < VALIDATION_TTL_S
+
+def remember_validation(settings: QSettings, api_key: str) -> None:
+    settings.setValue(SETTINGS_VALIDATED_HASH, key_fingerprint(api_key))
+    settings.setValue(SETTINGS_VALIDATED_AT, time.time())
+
+def forget_validation() -> None:
+    """Сбрасывает кеш проверки (например, если API отклонил ключ во время перевода)."""
+
+    settings = QSettings(SETTINGS_ORG, SETTINGS_APP)
+    settings.remove(SETTINGS_VALIDATED_HASH)
+    settings.remove(SETTINGS_VALIDATED_AT)
+
 def validate_api_key(api_key: str) -> ApiKeyValidationResult:
     """Проверка ключа без списания токенов за генерацию."""
 
+    from openai import APIConnectionError, APITimeoutError
+
     try:
-        test_client = OpenAI(api_key=api_key)
-        test_client.models.list()
+        run_async(shared_async_client(api_key).with_options(max_retries=2).models.list())
         return ApiKeyValidationResult(True, "")
     except (APIConnectionError, APITimeoutError) as e:
         msg = str(e) or "Не удалось подключиться к OpenAI (ошибка сети)."
@@ -78,6 +106,9 @@ def get_openai_api_key() -> Optional[str]:
 
     parent = QApplication.activeWindow()
 
+    if api_key and is_validation_cached(settings, api_key):
+        return api_key
+
     while api_key:
         QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
         QApplication.processEvents()
@@ -87,6 +118,7 @@ def get_openai_api_key() -> Optional[str]:
             QApplication.restoreOverrideCursor()
 
         if validation.is_valid:
+            remember_validation(settings, api_key)
             return api_key
 
         if validation.is_network_error:
@@ -130,6 +162,7 @@ def get_openai_api_key() -> Optional[str]:
 
         if validation.is_valid:
             settings.setValue(SETTINGS_KEY, key)
+            remember_validation(settings, key)
             QMessageBox.information(parent, "Успех", "API ключ успешно проверен и сохранен!")
             return key
 
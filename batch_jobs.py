@@ -0,0 +1,151 @@
+import json
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterable, List
+from rate_limit import estimate_tokens
+
+# Статусы Batch API, после которых ждать больше нечего (у expired бывает частичный результат)
+FINAL_STATUSES = ("completed", "expired", "failed", "cancelled")
+
+def batch_state_path(input_file: str) -> str:
+    """Файл состояния отложенного перевода рядом с книгой: name.xlsx.batch.json"""
+
+    return input_file + ".batch.json"
+
+def write_jsonl(path: str, rows: Iterable[dict]) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        for row in rows:
+            fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+def parse_jsonl(text: str) -> List[dict]:
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+@dataclass
+class BatchStatus:
+    status: str
+    output: List[dict] = field(default_factory=list)
+    error: str | None = None
+
+    @property
+    def final(self) -> bool:
+        return self.status in FINAL_STATUSES
+
+@dataclass
+class BatchJobState:
+    """Что отправлено в Batch API для одной книги; переживает перезапуск программы"""
+
+    input_file: str
+    batch_id: str
+    client: str
+    namespace: str
+    # custom_id -> строки пачки в порядке id_0, id_1, ...
+    chunks: Dict[str, List[str]]
+    submitted_at: float = field(default_factory=time.time)
+
+    def save(self, path: str) -> None:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(asdict(self), fh, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BatchJobState":
+        with open(path, encoding="utf-8") as fh:
+            return cls(**json.load(fh))
+
+class OpenAIBatchClient:
+    """Отправка и опрос пакетов через OpenAI Batch API (скидка к цене, результат в течение 24 ч)"""
+
+    name = "openai"
+
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, jsonl_path: str) -> str:
+        with open(jsonl_path, "rb") as fh:
+            uploaded = self.client.files.create(file=fh, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        return batch.id
+
+    def poll(self, batch_id: str) -> BatchStatus:
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status not in FINAL_STATUSES:
+            return BatchStatus(batch.status)
+
+        output: List[dict] = []
+        if batch.output_file_id:
+            output = parse_jsonl(self.client.files.content(batch.output_file_id).text)
+        errors = getattr(batch, "errors", None)
+        return BatchStatus(batch.status, output, str(errors) if errors else None)
+
+class LocalBatchClient:
+    """Замена Batch API на файлы в каталоге: для тестов и прогонов без сети.
+
+    Пакет считается готовым через delay_s секунд после отправки; ответы
+    строятся функцией translate (для прогонов без сети — mock_llm_server.mock_translate).
+    """
+
+    name = "local"
+
+    def __init__(self, directory: str, translate: Callable[[str], str], delay_s: float = 0.0):
+        self.directory = directory
+        self.delay_s = delay_s
+        self.translate = translate
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, batch_id: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{batch_id}.{kind}.jsonl")
+
+    def submit(self, jsonl_path: str) -> str:
+        batch_id = f"batch_local_{uuid.uuid4().hex[:12]}"
+        with open(jsonl_path, encoding="utf-8") as src:
+            data = src.read()
+        with open(self._path(batch_id, "input"), "w", encoding="utf-8") as dst:
+            dst.write(data)
+        return batch_id
+
+    def poll(self, batch_id: str) -> BatchStatus:
+        input_path = self._path(batch_id, "input")
+        if not os.path.exists(input_path):
+            return BatchStatus("failed", error=f"пакет {batch_id} не найден")
+        if time.time() - os.path.getmtime(input_path) < self.delay_s:
+            return BatchStatus("in_progress")
+
+        output_path = self._path(batch_id, "output")
+        if not os.path.exists(output_path):
+            with open(input_path, encoding="utf-8") as fh:
+                requests = parse_jsonl(fh.read())
+            write_jsonl(output_path, (self._respond(request) for request in requests))
+        with open(output_path, encoding="utf-8") as fh:
+            return BatchStatus("completed", parse_jsonl(fh.read()))
+
+    def _respond(self, request: dict) -> dict:
+        messages = request["body"]["messages"]
+        payload = json.loads(messages[-1]["content"])
+        content = json.dumps({key: self.translate(value) for key, value in payload.items()}, ensure_ascii=False)
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        completion_tokens = estimate_tokens(content)
+        return {
+            "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+            "custom_id": request["custom_id"],
+            "response": {
+                "status_code": 200,
+                "body": {
+                    "object": "chat.completion",
+                    "model": request["body"].get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                },
+            },
+            "error": None,
+        }
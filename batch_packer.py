@@ -0,0 +1,110 @@
+import json
+from dataclasses import dataclass
+from typing import List, Sequence
+from rate_limit import estimate_tokens
+
+# "id_123": "...", — ключ, кавычки и разделители вокруг каждой строки
+ITEM_OVERHEAD_TOKENS = 5
+
+# Предел токенов ответа модели (max completion tokens); для неизвестной модели — консервативный
+MODEL_MAX_OUTPUT_TOKENS = {
+    "gpt-5": 128000,
+    "gpt-4.1": 32768,
+    "gpt-4o": 16384,
+}
+DEFAULT_MAX_OUTPUT_TOKENS = 16384
+# Пачка занимает долю предела: остальное — запас на рассуждения модели и на неточность estimate_tokens
+OUTPUT_BUDGET_SHARE = 0.125
+# Ожидаемая скорость генерации ответа и доля таймаута под неё (остальное — очередь и первый токен)
+OUTPUT_TOKENS_PER_S = 100
+TIMEOUT_SHARE = 0.8
+DEFAULT_OUTPUT_BUDGET = 2400
+
+def output_budget(model: str, timeout_s: float) -> int:
+    """Бюджет выходных токенов пачки: ответ должен успеть за timeout_s и уместиться в предел модели
+
+    Предел модели ищется по самому длинному совпавшему префиксу имени.
+    """
+
+    prefix = max((name for name in MODEL_MAX_OUTPUT_TOKENS if model.startswith(name)), key=len, default=None)
+    limit = MODEL_MAX_OUTPUT_TOKENS[prefix] if prefix else DEFAULT_MAX_OUTPUT_TOKENS
+    return max(1, int(min(limit * OUTPUT_BUDGET_SHARE, timeout_s * TIMEOUT_SHARE * OUTPUT_TOKENS_PER_S)))
+
+def item_tokens(text: str) -> int:
+    """Оценка токенов, которые строка добавляет к JSON-пачке (с экранированием и ключом)"""
+
+    return estimate_tokens(json.dumps(text, ensure_ascii=False)) + ITEM_OVERHEAD_TOKENS
+
+@dataclass
+class PackStats:
+    """Насколько плотно пачки заполнили бюджет токенов"""
+
+    requests: int = 0
+    items: int = 0
+    input_tokens: int = 0
+    budget_tokens: int = 0
+    oversized: int = 0
+
+    @property
+    def fill_ratio(self) -> float:
+        return self.input_tokens / self.budget_tokens if self.budget_tokens else 0.0
+
+    def merge(self, other: "PackStats") -> None:
+        self.requests += other.requests
+        self.items += other.items
+        self.input_tokens += other.input_tokens
+        self.budget_tokens += other.budget_tokens
+        self.oversized += other.oversized
+
+def pack_batches(
+    texts: Sequence[str],
+    max_input_tokens: int | None = None,
+    max_output_tokens: int = DEFAULT_OUTPUT_BUDGET,
+    max_items: int = 100,
+    output_ratio: float = 1.0,
+) -> tuple[List[List[str]], PackStats]:
+    """Раскладывает строки по пачкам, заполняя каждую до бюджета входных и выходных токенов.
+
+    Выход оценивается как output_ratio от входа (перевод примерно той же длины
+    плюс повтор ключей). max_input_tokens=None — входной бюджет равен выходному.
+    Строка, которая одна не влезает в бюджет, уходит отдельным запросом.
+    Порядок строк сохраняется.
+    """
+
+    if max_input_tokens is None:
+        max_input_tokens = max_output_tokens
+    budget = max(1, min(max_input_tokens, int(max_output_tokens / output_ratio)))
+    stats = PackStats()
+    batches: List[List[str]] = []
+
+    current: List[str] = []
+    current_tokens = 0
+
+    def flush() -> None:
+        nonlocal current, current_tokens
+        if not current:
+            return
+        batches.append(current)
+        stats.requests += 1
+        stats.items += len(current)
+        stats.input_tokens += current_tokens
+        stats.budget_tokens += max(budget, current_tokens)
+        current = []
+        current_tokens = 0
+
+    for text in texts:
+        tokens = item_tokens(text)
+        if tokens >= budget:
+            flush()
+            current, current_tokens = [text], tokens
+            stats.oversized += 1
+            flush()
+            continue
+
+        if current and (current_tokens + tokens > budget or len(current) >= max_items):
+            flush()
+        current.append(text)
+        current_tokens += tokens
+
+    flush()
+    return batches, stats
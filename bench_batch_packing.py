@@ -0,0 +1,86 @@
+import argparse
+import json
+import random
+from batch_packer import output_budget, pack_batches
+from rate_limit import estimate_tokens
+from translator import SYSTEM_ROLE
+
+WORDS = (
+    "revenue players event guild battle season pass offer bundle spending retention "
+    "daily active users monetization progression reward chest rank arena update launch "
+    "market share downloads growth decline region top grossing casual strategy puzzle "
+    "whales conversion churn schedule global limited time premium currency gacha banner"
+).split()
+
+def _phrase(rng: random.Random, min_words: int, max_words: int) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize()
+
+def synthetic_strings(profile: str, count: int, seed: int = 0) -> list[str]:
+    """Уникальные строки, похожие по длине на содержимое типичных отчётов"""
+
+    rng = random.Random(seed)
+    shapes = {
+        "labels": [(1.0, 1, 3)],
+        "mixed": [(0.70, 1, 4), (0.25, 8, 25), (0.05, 60, 200)],
+        "analysis": [(0.3, 20, 60), (0.7, 80, 400)],
+    }[profile]
+
+    result: set[str] = set()
+    while len(result) < count:
+        roll = rng.random()
+        for share, lo, hi in shapes:
+            if roll < share:
+                break
+            roll -= share
+        result.add(f"{_phrase(rng, lo, hi)} {len(result)}")
+    return sorted(result)
+
+def measure(batches: list[list[str]]) -> dict:
+    system_tokens = estimate_tokens(SYSTEM_ROLE)
+    payloads = [
+        estimate_tokens(json.dumps({f"id_{j}": t for j, t in enumerate(batch)}, ensure_ascii=False)) for batch in batches
+    ]
+    return {
+        "requests": len(batches),
+        "input_tokens": system_tokens * len(batches) + sum(payloads),
+        "output_tokens": sum(payloads),
+        "max_request_output_tokens": max(payloads, default=0),
+    }
+
+def run(count: int, seed: int, model: str = "gpt-5.2", timeout_s: float = 30) -> dict:
+    results = {}
+    for profile in ("labels", "mixed", "analysis"):
+        texts = synthetic_strings(profile, count, seed)
+        fixed = [texts[i : i + 30] for i in range(0, len(texts), 30)]
+        packed, stats = pack_batches(texts, max_output_tokens=output_budget(model, timeout_s))
+        results[profile] = {
+            "fixed_30": measure(fixed),
+            "packed": {**measure(packed), "fill_ratio": round(stats.fill_ratio, 3), "oversized": stats.oversized},
+        }
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сравнение фиксированных пачек по 30 строк и упаковки по бюджету токенов")
+    parser.add_argument("--count", type=int, default=6000, help="уникальных строк в синтетической книге")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model", default="gpt-5.2", help="модель, от предела ответа которой считается бюджет пачки")
+    parser.add_argument("--timeout", type=float, default=30, help="таймаут запроса, сек: ответ пачки должен успеть за него")
+    parser.add_argument("--json", dest="json_path", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    results = run(args.count, args.seed, args.model, args.timeout)
+    print(f"{'профиль':<10} {'режим':<9} {'запросов':>9} {'вход':>10} {'выход':>9} {'макс. выход':>12}")
+    for profile, modes in results.items():
+        for mode, m in modes.items():
+            print(
+                f"{profile:<10} {mode:<9} {m['requests']:>9} {m['input_tokens']:>10} "
+                f"{m['output_tokens']:>9} {m['max_request_output_tokens']:>12}"
+            )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import CancelledError
+from bench_pipeline import generate_workbook
+from mock_llm_server import MockLLMServer
+
+# Короткий промпт: длинный включил бы прогрев кеша префикса, и до его ответа в полёте был бы один запрос
+SHORT_ROLE = "Translate the values of the JSON object into Simplified Chinese. Return a JSON object with the same keys."
+
+def _wait_in_flight(server: MockLLMServer, count: int, timeout_s: float = 10.0) -> int:
+    """Ждёт, пока заглушка одновременно обработает count запросов (они «висят» в latency_s)."""
+
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline and server.stats["max_in_flight"] < count:
+        time.sleep(0.01)
+    return server.stats["max_in_flight"]
+
+def cancel_translator(server: MockLLMServer, in_flight: int) -> dict:
+    """Translator с in_flight зависшими запросами: время от отмены до завершения Future и close()."""
+
+    from translator import Translator
+
+    cancel_event = threading.Event()
+    translator = Translator(
+        "sk-bench",
+        base_url=server.base_url,
+        cancel_event=cancel_event,
+        max_in_flight=in_flight,
+        batch_size=1,
+        timeout_s=60,
+        system_role=SHORT_ROLE,
+    )
+    # Без цифр: строки с числами свелись бы к одному шаблону и одному запросу
+    future = translator.submit_texts(["Slow string " + "x" * i for i in range(1, in_flight * 4 + 1)])
+    reached = _wait_in_flight(server, in_flight)
+
+    started = time.perf_counter()
+    cancel_event.set()
+    try:
+        future.result(timeout=60)
+    except CancelledError:
+        pass
+    future_s = time.perf_counter() - started
+    translator.close()
+    return {"in_flight": reached, "future_s": future_s, "close_s": time.perf_counter() - started}
+
+def cancel_job(server: MockLLMServer, in_flight: int, workdir: str) -> dict:
+    """Полный run_excel_translation в отдельном потоке (как в GUI): время от «Отмены» до выхода."""
+
+    from core import run_excel_translation
+
+    path = os.path.join(workdir, "cancel.xlsx")
+    generate_workbook(path, sheets=2, rows=200, cols=4, charts=0)
+    cancel_event = threading.Event()
+    outcome = {}
+
+    def run() -> None:
+        try:
+            run_excel_translation(
+                path,
+                "sk-bench",
+                cancel_event=cancel_event,
+                backend="ooxml",
+                use_memory=False,
+                translator_options={
+                    "base_url": server.base_url,
+                    "max_in_flight": in_flight,
+                    "timeout_s": 60,
+                    "batch_size": 1,
+                    "system_role": SHORT_ROLE,
+                },
+            )
+            outcome["status"] = "finished"
+        except CancelledError:
+            outcome["status"] = "cancelled"
+
+    saved_stdout, sys.stdout = sys.stdout, open(os.devnull, "w", encoding="utf-8")
+    try:
+        worker = threading.Thread(target=run, name="job")
+        worker.start()
+        reached = _wait_in_flight(server, in_flight)
+        started = time.perf_counter()
+        cancel_event.set()
+        worker.join(60)
+        elapsed = time.perf_counter() - started
+    finally:
+        sys.stdout.close()
+        sys.stdout = saved_stdout
+    return {"in_flight": reached, "job_s": elapsed, "status": outcome.get("status", "hung")}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Задержка отмены при зависших запросах к медленной заглушке API")
+    parser.add_argument("--latency", type=float, default=30.0, help="задержка ответа заглушки, с")
+    parser.add_argument("--in-flight", type=int, default=8, help="одновременных запросов к моменту отмены")
+    parser.add_argument("--budget-ms", type=float, default=1000.0, help="допустимое время от отмены до выхода")
+    parser.add_argument("--json", dest="json_path", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench_cancel_") as workdir:
+        with MockLLMServer(latency_s=args.latency) as server:
+            results["translator"] = cancel_translator(server, args.in_flight)
+        with MockLLMServer(latency_s=args.latency) as server:
+            results["job"] = cancel_job(server, args.in_flight, workdir)
+
+    tr, job = results["translator"], results["job"]
+    print(f"Заглушка отвечает за {args.latency:.0f} с, запросов в полёте: {tr['in_flight']} / {job['in_flight']}")
+    print(f"Translator: Future отменён за {tr['future_s'] * 1000:.0f} мс, close() — за {tr['close_s'] * 1000:.0f} мс")
+    print(f"run_excel_translation: выход за {job['job_s'] * 1000:.0f} мс ({job['status']})")
+    print(f"Бюджет: {args.budget_ms:.0f} мс")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump({"latency_s": args.latency, "budget_ms": args.budget_ms, **results}, fh, ensure_ascii=False, indent=2)
+
+    worst_ms = max(tr["close_s"], job["job_s"]) * 1000
+    if job["status"] != "cancelled" or worst_ms > args.budget_ms:
+        print(f"❌ Отмена заняла {worst_ms:.0f} мс")
+        return 1
+    print("✅ В пределах бюджета")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
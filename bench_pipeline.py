@@ -0,0 +1,391 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from xml.sax.saxutils import escape
+from mock_llm_server import MockLLMServer
+
+WORDS = (
+    "revenue players event guild battle season pass offer bundle spending retention "
+    "daily active users monetization progression reward chest rank arena update launch "
+    "market share downloads growth decline region top grossing casual strategy puzzle "
+    "whales conversion churn schedule global limited time premium currency gacha banner"
+).split()
+
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+_NS_CHART = "http://schemas.openxmlformats.org/drawingml/2006/chart"
+_NS_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+_NS_XDR = "http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing"
+_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+_CT = "application/vnd.openxmlformats-officedocument."
+
+_STYLES = (
+    f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><styleSheet xmlns="{_NS_MAIN}">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    "</styleSheet>"
+)
+
+def _col_letter(col: int) -> str:
+    letters = ""
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+def _rels(items: list[tuple[str, str]]) -> str:
+    body = "".join(
+        f'<Relationship Id="rId{i}" Type="{_REL_TYPE}{kind}" Target="{target}"/>' for i, (kind, target) in enumerate(items, 1)
+    )
+    return f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><Relationships xmlns="{_NS_PKG_REL}">{body}</Relationships>'
+
+def _rich(text: str) -> str:
+    return f"<c:tx><c:rich><a:bodyPr/><a:p><a:r><a:t>{escape(text)}</a:t></a:r></a:p></c:rich></c:tx>"
+
+def _chart_xml(title: str, series: list[str], axis_title: str) -> str:
+    sers = "".join(
+        f'<c:ser><c:idx val="{i}"/><c:order val="{i}"/><c:tx><c:v>{escape(name)}</c:v></c:tx>'
+        f'<c:val><c:numLit><c:ptCount val="1"/><c:pt idx="0"><c:v>{i + 1}</c:v></c:pt></c:numLit></c:val></c:ser>'
+        for i, name in enumerate(series)
+    )
+    return (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<c:chartSpace xmlns:c="{_NS_CHART}" xmlns:a="{_NS_A}" xmlns:r="{_NS_REL}"><c:chart>'
+        f"<c:title>{_rich(title)}</c:title><c:plotArea>"
+        f'<c:barChart><c:barDir val="col"/>{sers}<c:axId val="1"/><c:axId val="2"/></c:barChart>'
+        f'<c:catAx><c:axId val="1"/><c:title>{_rich(axis_title)}</c:title><c:crossAx val="2"/></c:catAx>'
+        f'<c:valAx><c:axId val="2"/><c:crossAx val="1"/></c:valAx>'
+        "</c:plotArea></c:chart></c:chartSpace>"
+    )
+
+def _drawing_xml(charts: int) -> str:
+    anchors = "".join(
+        f"<xdr:twoCellAnchor><xdr:from><xdr:col>{i * 8}</xdr:col><xdr:colOff>0</xdr:colOff><xdr:row>0</xdr:row><xdr:rowOff>0</xdr:rowOff></xdr:from>"
+        f"<xdr:to><xdr:col>{i * 8 + 7}</xdr:col><xdr:colOff>0</xdr:colOff><xdr:row>15</xdr:row><xdr:rowOff>0</xdr:rowOff></xdr:to>"
+        f'<xdr:graphicFrame macro=""><xdr:nvGraphicFramePr><xdr:cNvPr id="{i + 2}" name="Chart {i + 1}"/><xdr:cNvGraphicFramePr/></xdr:nvGraphicFramePr>'
+        f'<xdr:xfrm><a:off x="0" y="0"/><a:ext cx="0" cy="0"/></xdr:xfrm><a:graphic><a:graphicData uri="{_NS_CHART}">'
+        f'<c:chart xmlns:c="{_NS_CHART}" r:id="rId{i + 1}"/></a:graphicData></a:graphic></xdr:graphicFrame><xdr:clientData/></xdr:twoCellAnchor>'
+        for i in range(charts)
+    )
+    return (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<xdr:wsDr xmlns:xdr="{_NS_XDR}" xmlns:a="{_NS_A}" xmlns:r="{_NS_REL}">{anchors}</xdr:wsDr>'
+    )
+
+def _phrase(rng: random.Random, min_len: int, max_len: int) -> str:
+    target = rng.randint(min_len, max_len)
+    words: list[str] = []
+    length = 0
+    while length < target:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words).capitalize()
+
+def generate_workbook(
+    path: str,
+    sheets: int = 4,
+    rows: int = 500,
+    cols: int = 6,
+    text_share: float = 0.7,
+    duplicate_ratio: float = 0.5,
+    min_len: int = 4,
+    max_len: int = 40,
+    charts: int = 1,
+    seed: int = 0,
+) -> dict:
+    """Пишет синтетическую книгу .xlsx (только stdlib) и возвращает её параметры.
+
+    Доля text_share ячеек — строки из общей таблицы; duplicate_ratio задаёт,
+    какая часть текстовых ячеек повторяет уже встречавшиеся строки. На каждом
+    листе charts диаграмм с заголовком, двумя рядами и заголовком оси.
+    """
+    rng = random.Random(seed)
+    text_cells = sum(1 for _ in range(sheets * rows * cols) if rng.random() < text_share)
+    unique_count = max(1, round(text_cells * (1 - duplicate_ratio)))
+
+    pool: dict[str, int] = {}
+    while len(pool) < unique_count:
+        pool.setdefault(f"{_phrase(rng, min_len, max_len)} {len(pool)}", len(pool))
+    strings = list(pool)
+
+    rng = random.Random(seed)
+    content_types = [
+        ("/xl/workbook.xml", "spreadsheetml.sheet.main+xml"),
+        ("/xl/styles.xml", "spreadsheetml.styles+xml"),
+        ("/xl/sharedStrings.xml", "spreadsheetml.sharedStrings+xml"),
+    ]
+    sst_refs = 0
+    chart_no = 0
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for s in range(1, sheets + 1):
+            next_new = 0
+            rows_xml = []
+            for r in range(1, rows + 1):
+                cells = []
+                for c in range(1, cols + 1):
+                    ref = f"{_col_letter(c)}{r}"
+                    if rng.random() < text_share:
+                        # Сначала расходуем ещё не встречавшиеся строки, затем повторяем
+                        if next_new < len(strings) and rng.random() >= duplicate_ratio:
+                            idx = (next_new * sheets + s - 1) % len(strings)
+                            next_new += 1
+                        else:
+                            idx = rng.randrange(len(strings))
+                        cells.append(f'<c r="{ref}" t="s"><v>{idx}</v></c>')
+                        sst_refs += 1
+                    else:
+                        cells.append(f'<c r="{ref}"><v>{rng.randint(0, 100000)}</v></c>')
+                rows_xml.append(f'<row r="{r}">{"".join(cells)}</row>')
+
+            drawing = '<drawing r:id="rId1"/>' if charts else ""
+            zf.writestr(
+                f"xl/worksheets/sheet{s}.xml",
+                f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><worksheet xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}">'
+                f'<sheetData>{"".join(rows_xml)}</sheetData>{drawing}</worksheet>',
+            )
+            content_types.append((f"/xl/worksheets/sheet{s}.xml", "spreadsheetml.worksheet+xml"))
+
+            if charts:
+                zf.writestr(f"xl/worksheets/_rels/sheet{s}.xml.rels", _rels([("drawing", f"../drawings/drawing{s}.xml")]))
+                zf.writestr(f"xl/drawings/drawing{s}.xml", _drawing_xml(charts))
+                content_types.append((f"/xl/drawings/drawing{s}.xml", "drawing+xml"))
+                chart_rels = []
+                for _ in range(charts):
+                    chart_no += 1
+                    zf.writestr(
+                        f"xl/charts/chart{chart_no}.xml",
+                        _chart_xml(
+                            f"Chart {_phrase(rng, 10, 30)}",
+                            [f"Series {_phrase(rng, 5, 15)}", f"Series {_phrase(rng, 5, 15)}"],
+                            f"Axis {_phrase(rng, 5, 15)}",
+                        ),
+                    )
+                    content_types.append((f"/xl/charts/chart{chart_no}.xml", "drawingml.chart+xml"))
+                    chart_rels.append(("chart", f"../charts/chart{chart_no}.xml"))
+                zf.writestr(f"xl/drawings/_rels/drawing{s}.xml.rels", _rels(chart_rels))
+
+        sst = "".join(f"<si><t>{escape(text)}</t></si>" for text in strings)
+        zf.writestr(
+            "xl/sharedStrings.xml",
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<sst xmlns="{_NS_MAIN}" count="{sst_refs}" uniqueCount="{len(strings)}">{sst}</sst>',
+        )
+        zf.writestr("xl/styles.xml", _STYLES)
+
+        sheet_list = "".join(f'<sheet name="Sheet {_phrase(rng, 4, 12)} {s}" sheetId="{s}" r:id="rId{s}"/>' for s in range(1, sheets + 1))
+        zf.writestr(
+            "xl/workbook.xml",
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}">'
+            f"<sheets>{sheet_list}</sheets></workbook>",
+        )
+        zf.writestr(
+            "xl/_rels/workbook.xml.rels",
+            _rels(
+                [("worksheet", f"worksheets/sheet{s}.xml") for s in range(1, sheets + 1)]
+                + [("sharedStrings", "sharedStrings.xml"), ("styles", "styles.xml")]
+            ),
+        )
+        zf.writestr("_rels/.rels", _rels([("officeDocument", "xl/workbook.xml")]))
+
+        overrides = "".join(f'<Override PartName="{part}" ContentType="{_CT}{ct}"/>' for part, ct in content_types)
+        zf.writestr(
+            "[Content_Types].xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            f'<Default Extension="xml" ContentType="application/xml"/>{overrides}</Types>',
+        )
+
+    return {"text_cells": sst_refs, "unique_strings": len(strings), "charts": chart_no, "bytes": os.path.getsize(path)}
+
+def _run_child(input_file: str, options: dict, queue) -> None:
+    """Выполняется в отдельном процессе, чтобы пик памяти относился только к одному прогону."""
+
+    from core import run_excel_translation
+    from telemetry import JsonlTraceWriter, Tracer
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    sink = sys.stdout if options["verbose"] else open(os.devnull, "w", encoding="utf-8")
+    trace = JsonlTraceWriter(options["trace_path"]) if options["trace_path"] else None
+    try:
+        with contextlib.redirect_stdout(sink):
+            result = run_excel_translation(
+                input_file,
+                "sk-bench",
+                backend=options["backend"],
+                use_memory=options["memory_path"] is not None,
+                memory_path=options["memory_path"],
+                translator_options=options["translator"],
+                tracer=Tracer([trace] if trace is not None else None),
+            )
+        data = result.to_dict()
+        data["import_rss_mb"] = round(rss_before / 1024, 1)
+        data["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        queue.put(data)
+    except BaseException as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+    finally:
+        if trace is not None:
+            trace.close()
+
+def run_once(input_file: str, args, workdir: str, repeat: int) -> dict:
+    memory_path = os.path.join(workdir, f"tm_{repeat}.sqlite") if args.memory else None
+    with MockLLMServer(latency_s=args.latency, failure_rate=args.failure_rate, seed=args.seed + repeat) as server:
+        options = {
+            "backend": args.backend,
+            "memory_path": memory_path,
+            "verbose": args.verbose,
+            "trace_path": args.trace_path if repeat == 0 else None,
+            "translator": {"base_url": server.base_url, "max_in_flight": args.max_in_flight},
+        }
+        ctx = multiprocessing.get_context("spawn")
+        queue = ctx.Queue()
+        started = time.perf_counter()
+        process = ctx.Process(target=_run_child, args=(input_file, options, queue))
+        process.start()
+        data = queue.get()
+        process.join()
+        data["wall_s"] = round(time.perf_counter() - started, 3)
+        data["server"] = dict(server.stats)
+
+    if "error" in data:
+        raise RuntimeError(data["error"])
+    data.pop("input_file")
+    with contextlib.suppress(OSError):
+        os.remove(data.pop("output_file"))
+    return data
+
+def _median(runs: list[dict]) -> dict:
+    keys = ("wall_s", "duration_s", "peak_rss_mb", "requests", "prompt_tokens", "completion_tokens", "failed_strings")
+    summary = {key: statistics.median(run[key] for run in runs) for key in keys}
+    phases = {name for run in runs for name in run["phases"]}
+    summary["phases"] = {name: round(statistics.median(run["phases"].get(name, 0.0) for run in runs), 3) for name in sorted(phases)}
+    summary["server_requests"] = statistics.median(run["server"]["requests"] for run in runs)
+    return summary
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+def compare(baseline: dict, current: dict) -> list[str]:
+    """Построчное сравнение медиан двух прогонов бенчмарка."""
+
+    lines = []
+    old, new = baseline["median"], current["median"]
+    flat_old = {**{k: v for k, v in old.items() if k != "phases"}, **{f"phase.{k}": v for k, v in old["phases"].items()}}
+    flat_new = {**{k: v for k, v in new.items() if k != "phases"}, **{f"phase.{k}": v for k, v in new["phases"].items()}}
+    for key in sorted(set(flat_old) | set(flat_new)):
+        a, b = flat_old.get(key), flat_new.get(key)
+        if a is None or b is None:
+            lines.append(f"{key:<22} {a!s:>12} -> {b!s:>12}")
+            continue
+        delta = f"{(b - a) / a:+.1%}" if a else "n/a"
+        lines.append(f"{key:<22} {a:>12} -> {b:>12}  {delta}")
+    return lines
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк полного конвейера на синтетических книгах и локальной заглушке API")
+    parser.add_argument("--sheets", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--cols", type=int, default=6)
+    parser.add_argument("--text-share", type=float, default=0.7, help="доля текстовых ячеек")
+    parser.add_argument("--dup-ratio", type=float, default=0.5, help="доля повторяющихся строк среди текстовых ячеек")
+    parser.add_argument("--min-len", type=int, default=4, help="минимальная длина строки, символов")
+    parser.add_argument("--max-len", type=int, default=40, help="максимальная длина строки, символов")
+    parser.add_argument("--charts", type=int, default=1, help="диаграмм на лист")
+    parser.add_argument("--latency", type=float, default=0.2, help="задержка ответа заглушки, сек")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="доля ответов 500")
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--backend", choices=("ooxml", "com", "auto"), default="ooxml")
+    parser.add_argument("--memory", action="store_true", help="включить память переводов (новая база на каждый прогон)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="сохранить результаты в JSON")
+    parser.add_argument("--compare", dest="baseline_path", help="сравнить с ранее сохранённым JSON")
+    parser.add_argument("--trace", dest="trace_path", help="сохранить JSONL-трассу первого прогона")
+    parser.add_argument("--verbose", action="store_true", help="показывать лог конвейера")
+    args = parser.parse_args()
+
+    config = {k: v for k, v in vars(args).items() if k not in ("json_path", "baseline_path", "trace_path", "verbose")}
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as workdir:
+        input_file = os.path.join(workdir, "bench.xlsx")
+        workbook = generate_workbook(
+            input_file,
+            sheets=args.sheets,
+            rows=args.rows,
+            cols=args.cols,
+            text_share=args.text_share,
+            duplicate_ratio=args.dup_ratio,
+            min_len=args.min_len,
+            max_len=args.max_len,
+            charts=args.charts,
+            seed=args.seed,
+        )
+        print(
+            f"Книга: {args.sheets} листов, {workbook['text_cells']} текстовых ячеек, "
+            f"{workbook['unique_strings']} уникальных строк, {workbook['charts']} диаграмм, {workbook['bytes'] / 1024:.0f} КБ"
+        )
+
+        runs = []
+        for repeat in range(args.repeat):
+            run = run_once(input_file, args, workdir, repeat)
+            runs.append(run)
+            phases = " ".join(f"{name}={value:.2f}" for name, value in run["phases"].items())
+            print(
+                f"[{repeat + 1}/{args.repeat}] {run['wall_s']:.2f} с | {phases} | запросов {run['server']['requests']}"
+                f" | токены {run['prompt_tokens']}/{run['completion_tokens']} | пик RSS {run['peak_rss_mb']} МБ"
+            )
+
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "config": config,
+        "workbook": workbook,
+        "runs": runs,
+        "median": _median(runs),
+    }
+
+    if args.baseline_path:
+        with open(args.baseline_path, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        if baseline.get("config") != config:
+            print("⚠️ Параметры базового прогона отличаются — сравнение может быть некорректным")
+        print(f"\nСравнение с {baseline['meta'].get('commit')}:")
+        print("\n".join(compare(baseline, results)))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
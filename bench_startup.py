@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Эти модули не должны загружаться до появления окна
+HEAVY_MODULES = ("openai", "httpx", "win32com", "pythoncom", "wakepy", "core", "translator")
+
+# Импорт GUI.pyw без запуска main(): ровно то, что выполняется до создания окна
+_PROBE = r"""
+import importlib.machinery, importlib.util, json, sys, time
+started = time.perf_counter()
+loader = importlib.machinery.SourceFileLoader("gui_probe", sys.argv[1])
+spec = importlib.util.spec_from_loader("gui_probe", loader)
+module = importlib.util.module_from_spec(spec)
+loader.exec_module(module)
+elapsed = time.perf_counter() - started
+heavy = sorted(name for name in json.loads(sys.argv[2]) if name in sys.modules)
+print(json.dumps({"import_s": elapsed, "heavy": heavy}))
+"""
+
+def measure_once() -> dict:
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE, os.path.join(HERE, "GUI.pyw"), json.dumps(HEAVY_MODULES)],
+        cwd=HERE,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    data = json.loads(out.stdout.strip().splitlines()[-1])
+    data["process_s"] = time.perf_counter() - started
+    return data
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Время холодного импорта GUI до создания окна (с бюджетом)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=800.0, help="допустимая медиана времени импорта GUI.pyw")
+    parser.add_argument("--json", dest="json_path", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    try:
+        import PyQt6  # noqa: F401
+    except ImportError:
+        print("PyQt6 не установлен — замер старта GUI невозможен")
+        return 2
+
+    runs = [measure_once() for _ in range(args.repeat)]
+    import_ms = statistics.median(r["import_s"] for r in runs) * 1000
+    process_ms = statistics.median(r["process_s"] for r in runs) * 1000
+    heavy = sorted({name for r in runs for name in r["heavy"]})
+
+    print(f"Импорт GUI.pyw: {import_ms:.0f} мс (медиана из {args.repeat}), процесс целиком: {process_ms:.0f} мс")
+    print(f"Бюджет: {args.budget_ms:.0f} мс")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(
+                {"import_ms": import_ms, "process_ms": process_ms, "budget_ms": args.budget_ms, "heavy": heavy, "runs": runs},
+                fh,
+                ensure_ascii=False,
+                indent=2,
+            )
+
+    failed = False
+    if heavy:
+        print(f"❌ До появления окна загружены тяжёлые модули: {', '.join(heavy)}")
+        failed = True
+    if import_ms > args.budget_ms:
+        print(f"❌ Холодный старт превысил бюджет на {import_ms - args.budget_ms:.0f} мс")
+        failed = True
+    if not failed:
+        print("✅ В пределах бюджета")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
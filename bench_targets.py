@@ -0,0 +1,142 @@
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from com_cells import col_letter
+from targets import CELL, CHART_SERIES, CHART_TITLE, TargetIndex
+
+COLS = 20
+CHARTS = 50
+
+def synthetic_sheet(targets: int, unique: int, seed: int = 0):
+    """Ячейки листа (строка, столбец, текст) с повторами текстов и подписи диаграмм.
+
+    Тексты генерируются заново при каждом вызове, чтобы оба представления
+    считали в своей памяти сами строки, а не общие объекты.
+    """
+
+    rng = random.Random(seed)
+    for i in range(targets):
+        yield divmod(i, COLS)[0] + 1, i % COLS + 1, f"Label {rng.randrange(unique)} of the report"
+
+def build_legacy(targets: int, unique: int, seed: int) -> list:
+    """Прежний формат cell_mapping: [(идентификатор, текст)].
+
+    Ячейка — адрес из cell.GetAddress() ("$B$12"), диаграммы — строками "CHART_...:имя:номер".
+    """
+
+    mapping = [(f"${col_letter(col)}${row}", text) for row, col, text in synthetic_sheet(targets, unique, seed)]
+    for c in range(CHARTS):
+        mapping.append((f"CHART_TITLE:Chart {c}", f"Chart {c} title"))
+        mapping.append((f"CHART_SERIES:Chart {c}:1", "Revenue"))
+    return mapping
+
+def build_index(targets: int, unique: int, seed: int) -> TargetIndex:
+    index = TargetIndex()
+    for row, col, text in synthetic_sheet(targets, unique, seed):
+        index.add(text, CELL, row, col)
+    for c in range(CHARTS):
+        handle = index.handle(object(), key=f"Chart {c}")
+        index.add(f"Chart {c} title", CHART_TITLE, handle)
+        index.add("Revenue", CHART_SERIES, handle, 1)
+    return index
+
+def apply_legacy(mapping: list, translations: dict) -> tuple[dict, int]:
+    """Цикл прежнего ComWorkbook.apply_sheet без вызовов COM: разбор строк и поиск диаграммы на каждую цель"""
+
+    cells = {}
+    lookups = 0
+    for identifier, original in mapping:
+        translated = translations.get(original, original)
+        if translated == original:
+            continue
+        if identifier.startswith("CHART_TITLE:"):
+            identifier.replace("CHART_TITLE:", "")
+            lookups += 1
+        elif identifier.startswith("CHART_SERIES:"):
+            parts = identifier.split(":")
+            int(parts[2])
+            lookups += 1
+        else:
+            cells[identifier] = translated
+    return cells, lookups
+
+def apply_index(index: TargetIndex, translations: dict) -> tuple[dict, int]:
+    """Новый цикл: перевод ищется один раз на уникальный текст, диаграммы берутся из handles"""
+
+    cells = {}
+    for kind, a, b, translated in index.translated(translations):
+        if kind == CELL:
+            cells[(a, b)] = translated
+    return cells, 0
+
+def _run(build, apply, targets: int, unique: int, seed: int, traced: bool) -> dict:
+    gc.collect()
+    if traced:
+        tracemalloc.start()
+    started = time.perf_counter()
+    structure = build(targets, unique, seed)
+    build_s = time.perf_counter() - started
+    retained = tracemalloc.get_traced_memory()[0] if traced else 0
+
+    texts = structure.texts if isinstance(structure, TargetIndex) else {text for _, text in structure}
+    translations = {text: f"译{text}" for text in texts}
+    if traced:
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    cells, lookups = apply(structure, translations)
+    apply_s = time.perf_counter() - started
+    apply_peak = tracemalloc.get_traced_memory()[1] if traced else 0
+    if traced:
+        tracemalloc.stop()
+    return {
+        "build_s": build_s,
+        "apply_s": apply_s,
+        "retained_mb": retained / 2**20,
+        "apply_peak_mb": apply_peak / 2**20,
+        "cells_written": len(cells),
+        "chart_lookups": lookups,
+    }
+
+def measure(build, apply, targets: int, unique: int, seed: int) -> dict:
+    """Время — из прогона без tracemalloc (он замедляет аллокации в разы), память — из отдельного прогона"""
+
+    timed = _run(build, apply, targets, unique, seed, traced=False)
+    traced = _run(build, apply, targets, unique, seed, traced=True)
+    return {
+        "build_s": round(timed["build_s"], 3),
+        "apply_s": round(timed["apply_s"], 3),
+        "retained_mb": round(traced["retained_mb"], 1),
+        "apply_peak_mb": round(traced["apply_peak_mb"], 1),
+        "cells_written": timed["cells_written"],
+        "chart_lookups": timed["chart_lookups"],
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Память и время: список (идентификатор, текст) против TargetIndex")
+    parser.add_argument("--targets", type=int, default=500_000, help="текстовых ячеек на листе")
+    parser.add_argument("--unique", type=int, default=50_000, help="уникальных текстов среди них")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    results = {
+        "legacy": measure(build_legacy, apply_legacy, args.targets, args.unique, args.seed),
+        "index": measure(build_index, apply_index, args.targets, args.unique, args.seed),
+    }
+    print(f"Целей: {args.targets + 2 * CHARTS}, уникальных текстов: ~{args.unique}")
+    print(f"{'формат':<8} {'сбор, с':>8} {'применение, с':>14} {'память, МБ':>11} {'пик применения, МБ':>19} {'поисков диаграмм':>17}")
+    for name, m in results.items():
+        print(
+            f"{name:<8} {m['build_s']:>8} {m['apply_s']:>14} {m['retained_mb']:>11} {m['apply_peak_mb']:>19}"
+            f" {m['chart_lookups']:>17}"
+        )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import json
+from batch_packer import output_budget, pack_batches
+from bench_batch_packing import synthetic_strings
+from mock_llm_server import MockLLMServer, mock_translate
+from rate_limit import estimate_tokens
+from wire_format import WIRE_FORMATS
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Строки, на которых ломаются наивные разборщики: переносы, табуляция, кавычки, обратные слеши, метки
+EDGE_STRINGS = [
+    "Revenue\nby region",
+    "Top 10\tgames",
+    'Offer "Starter pack"',
+    "C:\\Reports\\Q3",
+    "Literal \\n is not a line break",
+    "{{0}} paying players in {{1}}",
+    "3 players left the guild",
+    "1. Introduction",
+]
+
+def token_counter():
+    """Токенизатор o200k_base, если установлен tiktoken, иначе оценка estimate_tokens"""
+
+    if tiktoken is None:
+        return "estimate_tokens", estimate_tokens
+    encoding = tiktoken.get_encoding("o200k_base")
+    return "o200k_base", lambda text: len(encoding.encode(text))
+
+def load_corpus(path: str) -> list[str]:
+    """Корпус строк: JSON-список или текстовый файл (строка на строку)"""
+
+    with open(path, encoding="utf-8") as fh:
+        data = fh.read()
+    try:
+        texts = json.loads(data)
+    except ValueError:
+        texts = data.splitlines()
+    return sorted({t.strip() for t in texts if isinstance(t, str) and t.strip()})
+
+def offline_output_tokens(texts: list[str], wire, count) -> int:
+    """Токены ответов, которые модель вернула бы на пачки Translator (перевод — как у MockLLMServer)"""
+
+    chunks, _stats = pack_batches(texts, max_output_tokens=output_budget("gpt-5.2", 30))
+    total = 0
+    for chunk in chunks:
+        translated = {f"id_{j}": mock_translate(text) for j, text in enumerate(chunk)}
+        total += count(wire.encode(translated))
+    return total
+
+def mock_run(texts: list[str], wire_name: str) -> dict:
+    """Полный проход Translator через заглушку: токены из usage и проверка, что разбор сопоставил все строки"""
+
+    from translator import Translator
+
+    with MockLLMServer() as server:
+        translator = Translator("sk-bench", base_url=server.base_url, wire_format=wire_name, templates=False)
+        try:
+            result = translator.translate_texts(texts)
+        finally:
+            translator.close()
+    wrong = sum(1 for text in texts if result.get(text) != mock_translate(text))
+    return {
+        "completion_tokens": translator.usage.completion_tokens,
+        "prompt_tokens": translator.usage.prompt_tokens,
+        "requests": translator.api_requests,
+        "mismatched": wrong,
+        "failed": len(translator.failures),
+    }
+
+def run(corpora: dict[str, list[str]]) -> dict:
+    counter_name, count = token_counter()
+    results = {"counter": counter_name, "corpora": {}}
+    for name, texts in corpora.items():
+        rows = {}
+        for wire_name, wire in WIRE_FORMATS.items():
+            offline = offline_output_tokens(texts, wire, count)
+            mock = mock_run(texts, wire_name)
+            rows[wire_name] = {
+                "strings": len(texts),
+                "output_tokens_per_string": round(offline / len(texts), 2),
+                "mock_completion_tokens_per_string": round(mock["completion_tokens"] / len(texts), 2),
+                **mock,
+            }
+        base = rows["json"]["output_tokens_per_string"]
+        for row in rows.values():
+            row["vs_json"] = round(row["output_tokens_per_string"] / base - 1, 3) if base else 0.0
+        results["corpora"][name] = rows
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Выходные токены на строку: формат пачек json против numeric и lines")
+    parser.add_argument("--corpus", default=None, help="записанный корпус строк (JSON-список или строка на строку)")
+    parser.add_argument("--count", type=int, default=1000, help="строк в синтетических корпусах")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpora = {"corpus": load_corpus(args.corpus)}
+    else:
+        corpora = {
+            profile: sorted(set(synthetic_strings(profile, args.count, args.seed)) | set(EDGE_STRINGS))
+            for profile in ("labels", "mixed", "analysis")
+        }
+
+    results = run(corpora)
+    print(f"Подсчёт токенов: {results['counter']} (в заглушке — estimate_tokens)")
+    print(f"{'корпус':<9} {'формат':<8} {'ток./строку':>11} {'к json':>7} {'заглушка':>9} {'запросов':>9} {'ошибок':>7}")
+    for name, rows in results["corpora"].items():
+        for wire_name, row in rows.items():
+            print(
+                f"{name:<9} {wire_name:<8} {row['output_tokens_per_string']:>11} {row['vs_json']:>+7.0%}"
+                f" {row['mock_completion_tokens_per_string']:>9} {row['requests']:>9} {row['mismatched'] + row['failed']:>7}"
+            )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+import traceback
+from concurrent.futures import CancelledError, ProcessPoolExecutor, as_completed
+from batch_jobs import FINAL_STATUSES
+from core import BACKENDS, run_excel_translation, run_multilingual_translation
+from languages import DEFAULT_LANGUAGE, LANGUAGES, parse_languages
+from protected_terms import load_terms
+from rate_limit import RateLimitManager, SharedRateLimiter
+from routing import load_routes
+from telemetry import JsonlTraceWriter, Tracer
+from translation_memory import default_memory_path
+from wire_format import WIRE_FORMATS
+
+# Результаты прошлых запусков (name_cn.xlsx, name_ja (2).xlsx) и lock-файлы Excel
+_SUFFIXES = "|".join(re.escape(language.suffix) for language in LANGUAGES.values())
+_OUTPUT_RE = re.compile(rf"(?:{_SUFFIXES})(?: \(\d+\))?\.xlsx$", re.IGNORECASE)
+
+def is_translated_output(path: str) -> bool:
+    name = os.path.basename(path)
+    return name.startswith("~$") or bool(_OUTPUT_RE.search(name))
+
+def expand_inputs(patterns: list[str], recursive: bool = False) -> list[str]:
+    """Разворачивает файлы, каталоги и glob-шаблоны в список .xlsx без повторов.
+
+    Явно указанный файл берётся как есть; из каталогов и шаблонов отбрасываются
+    результаты прошлых запусков (*_cn.xlsx) и временные файлы Excel.
+    """
+
+    found: list[str] = []
+    for pattern in patterns:
+        if os.path.isfile(pattern):
+            found.append(pattern)
+            continue
+
+        if os.path.isdir(pattern):
+            sub = os.path.join("**", "*.xlsx") if recursive else "*.xlsx"
+            matches = glob.glob(os.path.join(pattern, sub), recursive=recursive)
+        else:
+            matches = glob.glob(pattern, recursive=True)
+            if not matches:
+                print(f"⚠️ Ничего не найдено: {pattern}", file=sys.stderr)
+        found.extend(
+            m for m in sorted(matches) if os.path.isfile(m) and m.lower().endswith(".xlsx") and not is_translated_output(m)
+        )
+
+    unique: dict[str, None] = {}
+    for path in found:
+        unique.setdefault(os.path.abspath(path), None)
+    return list(unique)
+
+class _PrefixedStream:
+    """Пишет построчно в stderr с префиксом файла, чтобы логи процессов не перемешивались."""
+
+    def __init__(self, prefix: str, target=None):
+        self.prefix = prefix
+        self.target = target or sys.__stderr__
+        self.encoding = "utf-8"
+        self._buffer = ""
+
+    def write(self, s: str) -> int:
+        self._buffer += s
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            if line.strip():
+                self.target.write(f"[{self.prefix}] {line}\n")
+        self.target.flush()
+        return len(s)
+
+    def flush(self) -> None:
+        if self._buffer.strip():
+            self.target.write(f"[{self.prefix}] {self._buffer}\n")
+            self.target.flush()
+        self._buffer = ""
+
+    def isatty(self) -> bool:
+        return False
+
+def _init_worker() -> None:
+    if sys.platform == "win32":
+        import pythoncom
+
+        pythoncom.CoInitialize()
+
+def _summary(result) -> dict:
+    summary = {"status": "ok", **result.to_dict()}
+    summary["file"] = summary.pop("input_file")
+    summary["output"] = summary.pop("output_file")
+    if result.batch_status and result.batch_status not in FINAL_STATUSES:
+        summary.update(status="pending", output=None)
+    elif result.failed_strings:
+        summary["status"] = "partial"
+    return summary
+
+def _run_job(input_file: str, api_key: str, options: dict, limiter_proxy=None) -> list[dict]:
+    """Выполняется в процессе-обработчике: переводит одну книгу и возвращает строки сводки (по строке на язык)."""
+
+    start = time.time()
+    stream = _PrefixedStream(os.path.basename(input_file))
+    saved_stdout = sys.stdout
+    sys.stdout = stream
+
+    translator_options = dict(options.get("translator") or {})
+    if limiter_proxy is not None:
+        translator_options["rate_limiter"] = SharedRateLimiter(limiter_proxy)
+
+    trace = None
+    if options.get("trace_dir"):
+        trace = JsonlTraceWriter(os.path.join(options["trace_dir"], os.path.basename(input_file) + ".trace.jsonl"))
+
+    summary = {"file": input_file, "status": "ok", "output": None}
+    tracer = Tracer([trace] if trace is not None else None)
+    try:
+        if options.get("languages"):
+            results = run_multilingual_translation(
+                input_file,
+                api_key,
+                parse_languages(options["languages"]),
+                backend=options["backend"],
+                use_memory=options["use_memory"],
+                memory_path=options["memory_path"],
+                translator_options=translator_options,
+                tracer=tracer,
+            )
+            return [_summary(result) for result in results]
+
+        result = run_excel_translation(
+            input_file,
+            api_key,
+            backend=options["backend"],
+            use_memory=options["use_memory"],
+            memory_path=options["memory_path"],
+            translator_options=translator_options,
+            tracer=tracer,
+            batch=options.get("batch", False),
+            incremental=options.get("incremental", False),
+        )
+        return [_summary(result)]
+    except (KeyboardInterrupt, CancelledError):
+        summary.update(status="cancelled", duration_s=round(time.time() - start, 3))
+    except Exception as e:
+        traceback.print_exc(file=stream)
+        summary.update(status="failed", error=f"{type(e).__name__}: {e}", duration_s=round(time.time() - start, 3))
+    finally:
+        if trace is not None:
+            trace.close()
+        stream.flush()
+        sys.stdout = saved_stdout
+    return [summary]
+
+def _report(results: list[dict], summaries: list[dict]) -> None:
+    for summary in summaries:
+        results.append(summary)
+        print(json.dumps(summary, ensure_ascii=False), flush=True)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Пакетный перевод книг .xlsx без GUI. Результаты сохраняются рядом с исходниками как *_cn.xlsx (с --lang — *_ja.xlsx, *_ko.xlsx, ...)."
+    )
+    parser.add_argument("inputs", nargs="+", help="файлы, каталоги или glob-шаблоны (\"reports/**/*.xlsx\")")
+    parser.add_argument("-r", "--recursive", action="store_true", help="искать .xlsx в подкаталогах указанных каталогов")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="процессов-обработчиков (по умолчанию до 4)")
+    parser.add_argument("--backend", choices=BACKENDS, default="auto")
+    parser.add_argument("--api-key", default=None, help="ключ OpenAI (по умолчанию из OPENAI_API_KEY)")
+    parser.add_argument("--base-url", default=None, help="альтернативный адрес API (например, локальная заглушка)")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--rpm", type=int, default=None, help="общий лимит запросов в минуту на все процессы")
+    parser.add_argument("--tpm", type=int, default=None, help="общий лимит токенов в минуту на все процессы")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="одновременных запросов на одну книгу")
+    parser.add_argument("--memory", dest="memory_path", default=None, help="путь к базе памяти переводов")
+    parser.add_argument("--no-memory", action="store_true", help="не использовать память переводов")
+    parser.add_argument("--glossary", default=None, help="глоссарий CSV/TSV (термин,перевод) или JSON")
+    parser.add_argument("--dnt", default=None, help="список терминов «не переводить», по одному в строке")
+    parser.add_argument(
+        "--routes",
+        default=None,
+        help="маршруты моделей по классам строк: JSON-файл или default (подписи, имена листов и диаграммы — gpt-5-mini)",
+    )
+    parser.add_argument(
+        "--wire-format",
+        choices=list(WIRE_FORMATS),
+        default="json",
+        help="кодировка пачек: json (id_N), numeric (ключи-числа) или lines (номер TAB текст) — меньше выходных токенов",
+    )
+    parser.add_argument("--no-templates", action="store_true", help="не выносить числа, даты и суммы в шаблоны")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="отложенный перевод через Batch API со скидкой: повторный запуск собирает готовые книги",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="переводить только изменившееся с прошлого запуска (манифест name.xlsx.manifest.json), результат перезаписывается",
+    )
+    parser.add_argument(
+        "--lang",
+        default=DEFAULT_LANGUAGE,
+        help=f"языки перевода через запятую ({', '.join(LANGUAGES)}): книга сканируется один раз, результат — по файлу на язык",
+    )
+    parser.add_argument("--summary", dest="summary_path", default=None, help="сохранить сводку по файлам в JSON")
+    parser.add_argument("--trace-dir", default=None, help="каталог для JSONL-трасс (name.xlsx.trace.jsonl на файл)")
+    return parser
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        languages = parse_languages(args.lang)
+    except ValueError as e:
+        parser.error(str(e))
+    # Язык по умолчанию идёт обычным конвейером (с пакетным и инкрементальным режимами)
+    multilingual = [language.code for language in languages] != [DEFAULT_LANGUAGE]
+    if multilingual and (args.batch or args.incremental):
+        parser.error("--batch и --incremental поддерживаются только для языка по умолчанию")
+    if multilingual and args.glossary and len(languages) > 1:
+        parser.error("--glossary задаёт переводы для одного языка; для нескольких положите glossary.<код>.csv рядом с памятью переводов")
+
+    api_key = args.api_key or os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        print("❌ Не задан API-ключ: укажите --api-key или переменную OPENAI_API_KEY", file=sys.stderr)
+        return 2
+
+    files = expand_inputs(args.inputs, args.recursive)
+    if not files:
+        print("❌ Не найдено ни одного файла .xlsx", file=sys.stderr)
+        return 2
+
+    translator_options = {}
+    if not multilingual:
+        translator_options["terms"] = load_terms(args.glossary, args.dnt)
+    elif args.glossary or args.dnt:
+        # Глоссарий по умолчанию китайский, поэтому для других языков без --glossary он не подставляется
+        translator_options["terms"] = load_terms(args.glossary or "", args.dnt)
+    if args.base_url:
+        translator_options["base_url"] = args.base_url
+    if args.model:
+        translator_options["model"] = args.model
+    if args.max_in_flight:
+        translator_options["max_in_flight"] = args.max_in_flight
+    if args.no_templates:
+        translator_options["templates"] = False
+    if args.wire_format != "json":
+        translator_options["wire_format"] = args.wire_format
+    if args.routes:
+        try:
+            translator_options["routes"] = load_routes(args.routes)
+        except (OSError, ValueError, TypeError) as e:
+            parser.error(f"--routes: {e}")
+
+    options = {
+        "backend": args.backend,
+        "use_memory": not args.no_memory,
+        # Одна база на все процессы: WAL позволяет читать и писать одновременно
+        "memory_path": args.memory_path or default_memory_path(),
+        "translator": translator_options,
+        "trace_dir": args.trace_dir,
+        "batch": args.batch,
+        "incremental": args.incremental,
+        "languages": args.lang if multilingual else None,
+    }
+    if args.trace_dir:
+        os.makedirs(args.trace_dir, exist_ok=True)
+    workers = max(1, min(args.workers or 4, len(files)))
+    print(f"⏳ Файлов: {len(files)}, процессов: {workers}", file=sys.stderr)
+
+    start = time.time()
+    results: list[dict] = []
+    manager = None
+    try:
+        limiter_proxy = None
+        if args.rpm or args.tpm:
+            manager = RateLimitManager()
+            manager.start()
+            limiter_proxy = manager.RateLimiter(args.rpm, args.tpm)
+
+        # Процесс на книгу: COM-экземпляр Excel и память процесса не переживают задачу
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, max_tasks_per_child=1) as pool:
+            futures = {pool.submit(_run_job, path, api_key, options, limiter_proxy): path for path in files}
+            try:
+                for future in as_completed(futures):
+                    _report(results, future.result())
+            except KeyboardInterrupt:
+                # Ctrl+C получают и обработчики: запущенные книги вернут статус cancelled
+                print("\n⛔ Прервано пользователем", file=sys.stderr)
+                pool.shutdown(wait=True, cancel_futures=True)
+                reported = {r["file"] for r in results}
+                for future, path in futures.items():
+                    if path in reported:
+                        continue
+                    if future.cancelled() or future.exception() is not None:
+                        _report(results, [{"file": path, "status": "cancelled", "output": None}])
+                    else:
+                        _report(results, future.result())
+    finally:
+        if manager is not None:
+            manager.shutdown()
+
+    totals = {
+        "files": len(results),
+        "ok": sum(r["status"] == "ok" for r in results),
+        "partial": sum(r["status"] == "partial" for r in results),
+        "failed": sum(r["status"] == "failed" for r in results),
+        "cancelled": sum(r["status"] == "cancelled" for r in results),
+        "pending": sum(r["status"] == "pending" for r in results),
+        "prompt_tokens": sum(r.get("prompt_tokens", 0) for r in results),
+        "completion_tokens": sum(r.get("completion_tokens", 0) for r in results),
+        "cached_tokens": sum(r.get("cached_tokens", 0) for r in results),
+        "local_strings": sum(r.get("local_strings", 0) for r in results),
+        "local_tokens_saved": sum(r.get("local_tokens_saved", 0) for r in results),
+        "templated_strings": sum(r.get("templated_strings", 0) for r in results),
+        "template_tokens_saved": sum(r.get("template_tokens_saved", 0) for r in results),
+        "cost_usd": round(sum(r.get("cost_usd", 0.0) for r in results), 6),
+        "duration_s": round(time.time() - start, 3),
+    }
+    print(
+        f"\n✅ Готово: {totals['ok']} ок, {totals['partial']} частично, {totals['failed']} с ошибкой,"
+        f" {totals['cancelled']} отменено, {totals['pending']} ждут пакета | Стоимость: ${totals['cost_usd']:.4f} | Время: {totals['duration_s']:.1f} с",
+        file=sys.stderr,
+    )
+
+    if args.summary_path:
+        with open(args.summary_path, "w", encoding="utf-8") as fh:
+            json.dump({"totals": totals, "files": results}, fh, ensure_ascii=False, indent=2)
+
+    if totals["cancelled"]:
+        return 130
+    return 1 if totals["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+import re
+from targets import CELL, TargetIndex
+from utils import check_cancel, should_translate_text
+
+XL_CELL_TYPE_CONSTANTS = 2
+XL_TEXT_VALUES = 2
+
+# Сколько строк UsedRange читать одним массивом в запасном режиме
+CHUNK_ROWS = 2000
+# При сильной фрагментации SpecialCells (тысячи одиночных областей) дешевле
+# прочитать UsedRange крупными блоками
+MAX_AREAS = 5000
+# Ограничение Excel на длину адреса, передаваемого в Range(...)
+MAX_ADDRESS_LEN = 255
+# Ошибка Excel «Не найдено ни одной ячейки» (SpecialCells без подходящих ячеек)
+XL_NO_CELLS_FOUND = 0x800A03EC
+
+_ADDRESS_RE = re.compile(r"\$?([A-Z]+)\$?(\d+)(?::\$?([A-Z]+)\$?(\d+))?")
+
+
+def col_letter(col: int) -> str:
+    letters = ""
+    while col > 0:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def col_number(letters: str) -> int:
+    col = 0
+    for ch in letters:
+        col = col * 26 + ord(ch) - 64
+    return col
+
+
+def cell_address(row: int, col: int, last_row: int | None = None, last_col: int | None = None) -> str:
+    address = f"{col_letter(col)}{row}"
+    if last_row is not None and (last_row, last_col) != (row, col):
+        address += f":{col_letter(last_col)}{last_row}"
+    return address
+
+
+def parse_address(address: str) -> tuple[int, int, int, int]:
+    """'$B$2:$D$5' -> (2, 2, 5, 4): первая строка/столбец и последняя строка/столбец."""
+
+    m = _ADDRESS_RE.fullmatch(address.strip())
+    if m is None:
+        raise ValueError(f"Неподдерживаемый адрес диапазона: {address}")
+    row, col = int(m.group(2)), col_number(m.group(1))
+    if m.group(3) is None:
+        return row, col, row, col
+    return row, col, int(m.group(4)), col_number(m.group(3))
+
+
+def _as_rows(value) -> list | tuple:
+    """Range.Value возвращает скаляр для одной ячейки и кортеж кортежей для блока."""
+
+    if isinstance(value, (tuple, list)):
+        return value
+    return ((value,),)
+
+
+def _is_no_cells_error(exc: Exception) -> bool:
+    """COM-ошибка «ячейки не найдены»: код в hresult или (для DISP_E_EXCEPTION) в excepinfo[5]"""
+
+    codes = [getattr(exc, "hresult", None)]
+    excepinfo = getattr(exc, "excepinfo", None)
+    if isinstance(excepinfo, tuple) and len(excepinfo) > 5:
+        codes.append(excepinfo[5])
+    return any(isinstance(code, int) and code & 0xFFFFFFFF == XL_NO_CELLS_FOUND for code in codes)
+
+
+def rectangles(cells: dict[tuple[int, int], str]) -> list[tuple[int, int, list[list[str]]]]:
+    """Склеивает ячейки {(строка, столбец): текст} в прямоугольники для записи одним массивом.
+
+    Соседние по горизонтали ячейки объединяются в отрезки, одинаковые отрезки
+    на строках подряд (без пропусков) — в прямоугольники. Непереведённые ячейки
+    не попадают ни в один прямоугольник и не перезаписываются.
+    """
+    by_row: dict[int, list[int]] = {}
+    for row, col in cells:
+        by_row.setdefault(row, []).append(col)
+
+    result = []
+    active: dict[tuple[int, int], list] = {}
+    prev_row = None
+    for row in sorted(by_row):
+        if prev_row is not None and row != prev_row + 1:
+            # Пропущенная строка: продолжить прямоугольник через неё нельзя
+            result.extend(active.values())
+            active = {}
+        prev_row = row
+        cols = sorted(by_row[row])
+        runs = []
+        start = prev = cols[0]
+        for col in cols[1:]:
+            if col != prev + 1:
+                runs.append((start, prev))
+                start = col
+            prev = col
+        runs.append((start, prev))
+
+        extended = {}
+        for c1, c2 in runs:
+            values = [cells[(row, c)] for c in range(c1, c2 + 1)]
+            rect = active.pop((c1, c2), None)
+            if rect is not None and row != rect[0] + len(rect[2]):
+                result.append(rect)
+                rect = None
+            if rect is None:
+                rect = [row, c1, []]
+            rect[2].append(values)
+            extended[(c1, c2)] = rect
+
+        result.extend(active.values())
+        active = extended
+
+    result.extend(active.values())
+    return [tuple(rect) for rect in result]
+
+
+class ComCellAccess:
+    """Тонкий слой массового доступа к ячейкам листа через COM.
+
+    Вместо Cells(r, c).Value/.Formula/.GetAddress() на каждую ячейку читает
+    значения целыми областями (только области с текстовыми константами через
+    SpecialCells), а переводы записывает прямоугольными массивами и меняет
+    шрифт объединёнными диапазонами. Работает с любым объектом, повторяющим
+    нужную часть объектной модели Excel (UsedRange, SpecialCells, Areas,
+    Range(address).Value/.Formula/.Font.Name), поэтому проверяется без Excel.
+    """
+
+    def __init__(self, sheet):
+        self.sheet = sheet
+
+    def _text_areas(self, used_range):
+        try:
+            constants = used_range.SpecialCells(XL_CELL_TYPE_CONSTANTS, XL_TEXT_VALUES)
+        except Exception as e:
+            if _is_no_cells_error(e):
+                # Текстовых констант нет: раздутый форматированием UsedRange не читаем вовсе
+                return []
+            # Другой сбой: корректный результат даёт чтение UsedRange блоками
+            return None
+
+        areas = constants.Areas
+        count = areas.Count
+        if count > MAX_AREAS:
+            return None
+        return [areas(i) for i in range(1, count + 1)]
+
+    def read_texts(self, cancel_event=None, targets: TargetIndex | None = None) -> TargetIndex:
+        """Добавляет текстовые константы листа в targets (целями CELL) и возвращает его."""
+
+        used_range = self.sheet.UsedRange
+        result = TargetIndex() if targets is None else targets
+
+        areas = self._text_areas(used_range)
+        if areas is not None:
+            for area in areas:
+                check_cancel(cancel_event)
+                row0, col0, _, _ = parse_address(area.Address)
+                for r, row_values in enumerate(_as_rows(area.Value)):
+                    for c, val in enumerate(row_values):
+                        if isinstance(val, str):
+                            text = val.strip()
+                            if should_translate_text(text):
+                                result.add(text, CELL, row0 + r, col0 + c)
+            return result
+
+        row0, col0, last_row, last_col = parse_address(used_range.Address)
+        for top in range(row0, last_row + 1, CHUNK_ROWS):
+            check_cancel(cancel_event)
+            bottom = min(top + CHUNK_ROWS - 1, last_row)
+            block = self.sheet.Range(cell_address(top, col0, bottom, last_col))
+            values = _as_rows(block.Value)
+            formulas = _as_rows(block.Formula)
+            for r, (row_values, row_formulas) in enumerate(zip(values, formulas)):
+                for c, (val, formula) in enumerate(zip(row_values, row_formulas)):
+                    if isinstance(val, str) and not str(formula).startswith("="):
+                        text = val.strip()
+                        if should_translate_text(text):
+                            result.add(text, CELL, top + r, col0 + c)
+        return result
+
+    def write_texts(self, cells: dict[tuple[int, int], str], font_name: str | None = None, cancel_event=None) -> None:
+        """Записывает переводы прямоугольными массивами и задаёт шрифт объединёнными диапазонами."""
+
+        if not cells:
+            return
+
+        addresses = []
+        for top, left, values in rectangles(cells):
+            check_cancel(cancel_event)
+            address = cell_address(top, left, top + len(values) - 1, left + len(values[0]) - 1)
+            rng = self.sheet.Range(address)
+            if len(values) == 1 and len(values[0]) == 1:
+                rng.Value = values[0][0]
+            else:
+                rng.Value = tuple(tuple(row) for row in values)
+            addresses.append(address)
+
+        if not font_name:
+            return
+
+        unions = []
+        current = ""
+        for address in addresses:
+            if current and len(current) + 1 + len(address) > MAX_ADDRESS_LEN:
+                unions.append(current)
+                current = address
+            else:
+                current = f"{current},{address}" if current else address
+        unions.append(current)
+
+        for union in unions:
+            check_cancel(cancel_event)
+            try:
+                self.sheet.Range(union).Font.Name = font_name
+            except Exception:
+                pass
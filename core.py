@@ -1,36 +1,109 @@
 import os
 import sys
 import time
-import re
 import threading
-from concurrent.futures import CancelledError
-from translator import Translator
-from excel_app import ExcelApp
+from typing import Dict
+from concurrent.futures import FIRST_COMPLETED, Future, TimeoutError, wait
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass, field
+from batch_jobs import BatchJobState, OpenAIBatchClient, batch_state_path, write_jsonl
+from openai_client import shared_client
+from manifest import SheetDigest, TranslationManifest, manifest_path
+from languages import TargetLanguage
+from protected_terms import language_glossary_path, load_terms
+from rate_limit import RateLimiter
+from translation_memory import TranslationMemory
+from translator import Translator, system_role_for
+from routing import CHART, PRIMARY, SHEET_NAME
+from targets import CHART_KINDS, TargetIndex
+from telemetry import Tracer
+from utils import check_cancel as _check_cancel
+
+BACKENDS = ("auto", "com", "ooxml")
+PHASES = ("open", "collect", "wait", "apply", "save")
+MAX_REPORTED_FAILURES = 20
+
+@dataclass
+class JobResult:
+    """Итог перевода одной книги (для GUI и машинно-читаемой сводки CLI)"""
+
+    input_file: str
+    output_file: str
+    sheets: int = 0
+    targets: int = 0
+    strings: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    cost_usd: float = 0.0
+    requests: int = 0
+    duration_s: float = 0.0
+    failed_strings: int = 0
+    memory_hits: int = 0
+    local_strings: int = 0
+    local_tokens_saved: int = 0
+    templated_strings: int = 0
+    templates_sent: int = 0
+    template_fallbacks: int = 0
+    template_tokens_saved: int = 0
+    # Отложенный перевод через Batch API: submitted/in_progress — книга ещё не собрана
+    batch_status: str = ""
+    batch_id: str = ""
+    # Инкрементальный режим: листы без изменений и строки, взятые из манифеста прошлого запуска
+    sheets_unchanged: int = 0
+    manifest_strings: int = 0
+    # Код языка перевода (languages.LANGUAGES); пусто — язык по умолчанию
+    language: str = ""
+    # По маршрутам моделей (см. routing): модель, строки, токены, стоимость, средняя задержка, откаты
+    routes: Dict[str, dict] = field(default_factory=dict)
+    # Время по фазам, сек: open, collect, wait (ожидание перевода), apply, save
+    phases: Dict[str, float] = field(default_factory=dict)
+    counters: Dict[str, int] = field(default_factory=dict)
+    failures: Dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data.pop("failures")
+        data["cost_usd"] = round(self.cost_usd, 6)
+        data["duration_s"] = round(self.duration_s, 3)
+        data["phases"] = {name: round(value, 3) for name, value in self.phases.items()}
+        return data
+
+def build_output_path(input_file: str, suffix: str = "_cn") -> str:
+    """Свободное имя результата рядом с исходником: name_cn.xlsx, name_cn (1).xlsx, ..."""
 
-_HAS_LETTERS_RE = re.compile(r"[A-Za-zА-Яа-яЁё]", re.UNICODE)
+    name_part, extension = os.path.splitext(os.path.basename(input_file))
+    output_dir = os.path.dirname(input_file)
+    base_output_name = f"{name_part}{suffix}"
+    output_file = os.path.join(output_dir, f"{base_output_name}{extension}")
+    index = 1
+    while os.path.exists(output_file):
+        output_file = os.path.join(output_dir, f"{base_output_name} ({index}){extension}")
+        index += 1
+    return output_file
 
-def _check_cancel(cancel_event: threading.Event | None) -> None:
-    if cancel_event is not None and cancel_event.is_set():
-        raise CancelledError()
+def open_workbook_backend(input_file: str, backend: str = "auto"):
+    """Возвращает контекст-менеджер книги для выбранного бэкенда.
 
-def _should_translate_text(text: str) -> bool:
-    """Определяет, нужно ли переводить строку.
-       Возвращает True, если текст содержит буквы.
+    "com" — Excel через win32com (только Windows с установленным Excel),
+    "ooxml" — прямое чтение/запись пакета .xlsx без Excel,
+    "auto" — COM на Windows, OOXML на остальных платформах.
     """
+    if backend == "auto":
+        backend = "com" if sys.platform == "win32" else "ooxml"
 
-    t = text.strip()
-    if len(t) <= 1:
-        return False
+    if backend == "com":
+        from excel_app import ComWorkbook
+        return ComWorkbook(input_file)
 
-    if not _HAS_LETTERS_RE.search(t):
-        return False
+    if backend == "ooxml":
+        from ooxml_workbook import OoxmlWorkbook
+        return OoxmlWorkbook(input_file)
 
-    return True
+    raise ValueError(f"Неизвестный бэкенд книги: {backend}. Допустимо: {', '.join(BACKENDS)}")
 
-def run_excel_translation(input_file, api_key: str, cancel_event: threading.Event | None = None):
-    start_time = time.time()
-    _check_cancel(cancel_event)
-    translator = Translator(api_key, cancel_event=cancel_event)
+def _resolve_input(input_file) -> str:
+    """Абсолютный путь к входной книге; ошибка, если файла нет или это не .xlsx"""
 
     if not input_file:
         raise ValueError("Не указан входной файл (.xlsx).")
@@ -40,148 +113,461 @@ def run_excel_translation(input_file, api_key: str, cancel_event: threading.Even
     if not os.path.isfile(input_file):
         raise FileNotFoundError(f"Файл не найден: {input_file}")
 
-    name_part, extension = os.path.splitext(os.path.basename(input_file))
-    if extension.lower() != ".xlsx":
+    if os.path.splitext(input_file)[1].lower() != ".xlsx":
         raise ValueError("Поддерживаются только файлы .xlsx")
+    return input_file
 
-    output_dir = os.path.dirname(input_file)
-    base_output_name = f"{name_part}_cn"
-    output_file = os.path.join(output_dir, f"{base_output_name}{extension}")
-    index = 1
-    while os.path.exists(output_file):
-        output_file = os.path.join(output_dir, f"{base_output_name} ({index}){extension}")
-        index += 1
+def _wait_future(future: Future, cancel_event: threading.Event | None):
+    """Ждёт Future, периодически проверяя отмену"""
+
+    while True:
+        _check_cancel(cancel_event)
+        try:
+            return future.result(timeout=0.2)
+        except TimeoutError:
+            continue
+
+def _apply_ready_sheets(book, translator: Translator, pending_sheets: list, total_sheets: int, cancel_event, block: bool) -> None:
+    """Применяет перевод к листам, все строки которых уже переведены.
 
+    При block=True ждёт, пока не будут применены все листы, и печатает прогресс перевода.
+    """
+    last_progress = None
+    while pending_sheets:
+        _check_cancel(cancel_event)
+        ready = [item for item in pending_sheets if item[3].done()]
+        tracer = translator.tracer
+
+        if not ready:
+            if not block:
+                return
+            progress = (translator.batches_done, translator.batches_total)
+            if progress != last_progress:
+                last_progress = progress
+                print(f"⏳ Перевод: {progress[0]}/{progress[1]} пачек...")
+            with tracer.span("wait"):
+                wait([item[3] for item in pending_sheets], timeout=0.2, return_when=FIRST_COMPLETED)
+            continue
+
+        for item in ready:
+            pending_sheets.remove(item)
+            index, sheet_name, targets, future, submitted = item
+            translations_map = future.result()
+            tracer.record("translate", submitted, sheet=sheet_name, strings=len(translations_map))
+
+            sys.stdout.write(f"⏳ Лист [{index}/{total_sheets}]: {sheet_name} —> Применяю перевод...")
+            sys.stdout.flush()
+            with tracer.span("apply", sheet=sheet_name, targets=len(targets)):
+                book.apply_sheet(index - 1, targets, translations_map, cancel_event)
+            tracer.progress("apply", total_sheets - len(pending_sheets), total_sheets, sheet_name)
+            sys.stdout.write(" готово\n")
+            sys.stdout.flush()
+
+        if not block:
+            return
+
+def _route_hints(translator: Translator, targets: TargetIndex) -> Dict[str, str] | None:
+    """Тексты диаграмм листа для маршрутизации; без маршрутов по классам строк не нужны"""
+
+    if len(translator.routes) == 1:
+        return None
+    return dict.fromkeys(targets.texts_of(CHART_KINDS), CHART)
+
+def _fill_usage(result: JobResult, translator: Translator) -> None:
+    """Токены, стоимость и статистика обхода API из Translator в итог книги"""
+
+    result.prompt_tokens = translator.usage.prompt_tokens + translator.batch_usage.prompt_tokens
+    result.completion_tokens = translator.usage.completion_tokens + translator.batch_usage.completion_tokens
+    result.cached_tokens = translator.usage.cached_tokens + translator.batch_usage.cached_tokens
+    result.cost_usd = translator.total_cost_usd
+    result.requests = translator.api_requests
+    result.failures = dict(translator.failures)
+    result.failed_strings = len(result.failures)
+    result.memory_hits = translator.memory_hits
+    result.local_strings = translator.local_strings
+    result.local_tokens_saved = translator.local_tokens_saved
+    templates = translator.template_stats
+    result.templated_strings = templates.strings
+    result.templates_sent = templates.templates_sent
+    result.template_fallbacks = templates.fallbacks
+    result.template_tokens_saved = templates.tokens_saved
+    result.routes = translator.route_report()
+
+def _print_usage(result: JobResult, translator: Translator, memory: TranslationMemory | None) -> None:
+    memory_info = f" | {memory.summary()}" if memory is not None else ""
+    pack = translator.pack_stats
+    print(
+        f"Токены: {result.prompt_tokens + result.completion_tokens} | Стоимость: ${translator.total_cost_usd:.4f}"
+        f" | Кеш промпта: {translator.usage.cache_hit_rate:.0%}"
+        f" | Запросов: {result.requests} (пачек {pack.requests}, заполнение {pack.fill_ratio:.0%}){memory_info}"
+    )
+    if translator.local_strings:
+        print(f"Без API (термины и идентификаторы): {translator.local_strings} строк, ~{translator.local_tokens_saved} токенов сэкономлено")
+    templates = translator.template_stats
+    if templates.strings:
+        print(
+            f"Шаблоны (числа, даты, суммы): {templates.strings} строк через {templates.templates_sent} новых шаблонов"
+            f" | Попадания: {templates.hit_rate:.0%} | ~{templates.tokens_saved} токенов сэкономлено"
+            f" | Переведено целиком: {templates.fallbacks}"
+        )
+    if set(result.routes) - {PRIMARY}:
+        for name, route in result.routes.items():
+            print(
+                f"Маршрут {name} ({route['model']}): {route['strings']} строк, {route['requests']} запросов"
+                f" | Токены: {route['prompt_tokens'] + route['completion_tokens']} | Стоимость: ${route['cost_usd']:.4f}"
+                f" | Задержка: {route['avg_latency_s']:.2f} с | Откат на основную модель: {route['fallbacks']}"
+            )
+
+def _print_failures(translator: Translator) -> None:
+    if translator.failures:
+        print(f"⚠️ Не удалось перевести {len(translator.failures)} строк (оставлены как в оригинале):")
+        for text, reason in sorted(translator.failures.items())[:MAX_REPORTED_FAILURES]:
+            print(f"   • {text[:80]!r}: {reason[:200]}")
+        if len(translator.failures) > MAX_REPORTED_FAILURES:
+            print(f"   … и ещё {len(translator.failures) - MAX_REPORTED_FAILURES}")
+
+def _offline_batch_stage(book, translator: Translator, input_file: str, client, cancel_event) -> JobResult | None:
+    """Отправляет строки книги в Batch API или забирает готовый пакет.
+
+    Возвращает JobResult, если книгу пока нельзя собрать (пакет только что
+    отправлен или ещё выполняется), и None, если переводы уже в кеше и
+    книгу можно собирать обычным конвейером.
+    """
+    state_path = batch_state_path(input_file)
+    sheet_names = book.sheet_names()
+
+    if os.path.exists(state_path):
+        state = BatchJobState.load(state_path)
+        status = client.poll(state.batch_id)
+        if not status.final:
+            print(f"⏳ Пакет {state.batch_id}: {status.status}. Запустите перевод книги позже, чтобы собрать результат.")
+            return JobResult(input_file, "", sheets=len(sheet_names), batch_status=status.status, batch_id=state.batch_id)
+
+        if state.namespace != translator.memory_namespace:
+            print("⚠️ Пакет отправлен с другой моделью или промптом — его переводы идут в книгу, а в память — под namespace пакета")
+        expected = sum(len(chunk) for chunk in state.chunks.values())
+        absorbed = translator.absorb_batch_output(state.chunks, status.output, state.namespace)
+        print(f"✅ Пакет {state.batch_id}: {status.status}, получено переводов: {absorbed} из {expected}")
+        if status.error:
+            print(f"⚠️ Ошибки пакета: {status.error[:500]}")
+        missing = expected - absorbed
+        if missing > 0:
+            # Недостающие строки уйдут обычными запросами — без скидки Batch API
+            print(f"⚠️ Без перевода из пакета ({status.status}): {missing} строк — они будут отправлены синхронно по полной цене")
+            translator.tracer.count("batch.resent_sync", missing)
+        return None
+
+    texts = set(sheet_names)
+    for index in range(len(sheet_names)):
+        with translator.tracer.span("collect", sheet=sheet_names[index]):
+            texts.update(book.collect_sheet(index, cancel_event).texts)
+    chunks = translator.plan_offline(texts)
+    if not chunks:
+        print("✅ Все строки уже переведены, пакет не нужен")
+        return None
+
+    state_chunks = {f"chunk-{i}": chunk for i, chunk in enumerate(chunks)}
+    jsonl_path = input_file + ".batch.jsonl"
+    write_jsonl(jsonl_path, (translator.batch_request(custom_id, chunk) for custom_id, chunk in state_chunks.items()))
+    try:
+        _check_cancel(cancel_event)
+        batch_id = client.submit(jsonl_path)
+    finally:
+        os.remove(jsonl_path)
+
+    BatchJobState(input_file, batch_id, client.name, translator.memory_namespace, state_chunks).save(state_path)
+    strings = sum(len(chunk) for chunk in chunks)
+    print(f"📦 Отправлен пакет {batch_id}: {len(chunks)} запросов, {strings} строк. Запустите перевод книги позже, чтобы собрать результат.")
+    return JobResult(input_file, "", sheets=len(sheet_names), strings=len(texts), batch_status="submitted", batch_id=batch_id)
+
+def run_excel_translation(
+    input_file,
+    api_key: str,
+    cancel_event: threading.Event | None = None,
+    backend: str = "auto",
+    use_memory: bool = True,
+    memory_path: str | None = None,
+    translator_options: dict | None = None,
+    tracer: Tracer | None = None,
+    batch: bool = False,
+    batch_client=None,
+    incremental: bool = False,
+) -> JobResult:
+    """Переводит книгу и сохраняет результат рядом с ней (name_cn.xlsx).
+
+    translator_options передаются в Translator как есть (модель, лимиты,
+    base_url, общий rate_limiter и т. п.). Если terms не передан, глоссарий и
+    список «не переводить» берутся из файлов по умолчанию (см. protected_terms). Через tracer можно получать
+    span-ы, счётчики и события прогресса (GUI, JSONL-трасса). Маршруты моделей по
+    классам строк задаются через translator_options["routes"] (см. routing).
+
+    batch=True включает отложенный режим: первый вызов отправляет строки в
+    Batch API (batch_client, по умолчанию OpenAIBatchClient) и возвращается
+    сразу, состояние сохраняется в name.xlsx.batch.json. Следующий вызов
+    забирает готовый пакет и собирает книгу.
+
+    incremental=True сверяет книгу с манифестом прошлого запуска
+    (name.xlsx.manifest.json): переводы оттуда используются повторно, в API
+    уходят только новые и изменённые строки, листы с прежним хешем не
+    переводятся вовсе, а результат перезаписывает прошлый файл вместо нового name_cn (N).xlsx.
+    """
+    start_time = time.time()
     _check_cancel(cancel_event)
+    input_file = _resolve_input(input_file)
+    output_file = build_output_path(input_file)
 
-    with ExcelApp() as exel_app:
-        with exel_app.open_workbook(input_file) as workbook:
+    _check_cancel(cancel_event)
 
-            print("⏳ Перевод названий листов...")
+    with ExitStack() as stack:
+        memory = stack.enter_context(TranslationMemory(memory_path)) if use_memory else None
+        tracer = tracer or Tracer()
+        options = dict(translator_options or {})
+        if "terms" not in options:
+            options["terms"] = load_terms()
+        translator = Translator(api_key, cancel_event=cancel_event, memory=memory, tracer=tracer, **options)
+        with tracer.span("open", file=input_file, backend=backend):
+            book = stack.enter_context(open_workbook_backend(input_file, backend))
+
+        stack.callback(translator.close)
+
+        batch_id = ""
+        if batch:
+            client = batch_client or OpenAIBatchClient(shared_client(api_key, translator.base_url))
+            deferred = _offline_batch_stage(book, translator, input_file, client, cancel_event)
+            if deferred is not None:
+                deferred.duration_s = time.time() - start_time
+                return deferred
+            if os.path.exists(batch_state_path(input_file)):
+                batch_id = BatchJobState.load(batch_state_path(input_file)).batch_id
+
+        previous = None
+        digests: Dict[str, SheetDigest] = {}
+        if incremental:
+            previous = TranslationManifest.load(manifest_path(input_file))
+            if previous is not None and previous.namespace != translator.memory_namespace:
+                print("⚠️ Манифест составлен для другой модели или промпта — книга переводится заново")
+                previous = None
+            if previous is not None:
+                translator.preload(previous.translations)
+                if previous.output_file:
+                    output_file = previous.output_file
+
+        sheet_names = book.sheet_names()
+        total_sheets = len(sheet_names)
+
+        print("⏳ Перевод названий листов поставлен в очередь...")
+        names_future = translator.submit_texts(sheet_names, hints=dict.fromkeys(sheet_names, SHEET_NAME))
+        pending_sheets: list[tuple[int, str, TargetIndex, Future, float]] = []
+        result = JobResult(input_file, output_file, sheets=total_sheets)
+        all_texts: set[str] = set(sheet_names)
+
+        for index, sheet_name in enumerate(sheet_names, 1):
             _check_cancel(cancel_event)
-            sheet_batch = {f"sh_{i}": sheet.Name for i, sheet in enumerate(workbook.Sheets)}
-            translated_sheet_data = translator.translate_batch(sheet_batch)
+            sys.stdout.write(f"⏳ Лист [{index}/{total_sheets}]: {sheet_name} —> Сбор данных...")
+            sys.stdout.flush()
+            with tracer.span("collect", sheet=sheet_name) as span:
+                targets = book.collect_sheet(index - 1, cancel_event)
+                unique_texts_to_translate = targets.texts
+                span.set(targets=len(targets), strings=len(unique_texts_to_translate))
+            tracer.count("targets.collected", len(targets))
+            tracer.count("strings.deduplicated", len(targets) - len(unique_texts_to_translate))
+            tracer.progress("collect", index, total_sheets, sheet_name)
+            result.targets += len(targets)
+            all_texts.update(unique_texts_to_translate)
+
+            submitted = time.perf_counter()
+            if incremental:
+                digest = digests[sheet_name] = SheetDigest.of(targets)
+                diff = previous.diff(sheet_name, digest) if previous is not None else None
+                if diff is not None and diff.unchanged and all(t in previous.translations for t in unique_texts_to_translate):
+                    sys.stdout.write(" -> Без изменений, перевод из манифеста\n")
+                    tracer.count("sheets.unchanged")
+                    result.sheets_unchanged += 1
+                    future = Future()
+                    future.set_result(previous.translations_for(unique_texts_to_translate))
+                    pending_sheets.append((index, sheet_name, targets, future, submitted))
+                    continue
+                if diff is not None:
+                    sys.stdout.write(f" -> Изменено: {diff.changed}, новых: {diff.added}, удалено: {diff.removed}")
+
+            sys.stdout.write(f" -> В очередь на перевод: {len(unique_texts_to_translate)} строк\n")
+            sys.stdout.flush()
+            future = translator.submit_texts(unique_texts_to_translate, hints=_route_hints(translator, targets))
+            pending_sheets.append((index, sheet_name, targets, future, submitted))
+
+            _apply_ready_sheets(book, translator, pending_sheets, total_sheets, cancel_event, block=False)
+
+        _apply_ready_sheets(book, translator, pending_sheets, total_sheets, cancel_event, block=True)
+
+        with tracer.span("wait"):
+            translated_names = _wait_future(names_future, cancel_event)
+        book.rename_sheets({i: translated_names.get(name, name) for i, name in enumerate(sheet_names)})
+
+        _check_cancel(cancel_event)
+        tracer.progress("save", 0, 1)
+        with tracer.span("save", file=output_file):
+            book.save(output_file)
+        tracer.progress("save", 1, 1)
+        if batch_id:
+            os.remove(batch_state_path(input_file))
+        if incremental:
+            TranslationManifest(
+                translator.memory_namespace, output_file, digests, translator.cached(all_texts)
+            ).save(manifest_path(input_file))
+
+        end_time = time.time()
+        duration = end_time - start_time
+
+        result.phases = {name: tracer.totals[name] for name in PHASES if name in tracer.totals}
+        result.counters = dict(tracer.counters)
+        result.strings = len(all_texts)
+        result.duration_s = duration
+        _fill_usage(result, translator)
+        if previous is not None:
+            result.manifest_strings = sum(1 for t in all_texts if t in previous.translations)
+        if batch_id:
+            result.batch_status = "completed"
+            result.batch_id = batch_id
+
+        print(f"\n✅ Готово! Результат в: {output_file}")
+        _print_usage(result, translator, memory)
+        if previous is not None:
+            print(
+                f"Инкрементально: листов без изменений {result.sheets_unchanged}/{total_sheets}"
+                f" | строк из манифеста {result.manifest_strings}/{result.strings}"
+            )
+        print(f"Общее время: {int(duration // 60)} мин. {int(duration % 60)} сек.\n")
+        _print_failures(translator)
+
+        return result
+
+def run_multilingual_translation(
+    input_file,
+    api_key: str,
+    languages: list[TargetLanguage],
+    cancel_event: threading.Event | None = None,
+    backend: str = "auto",
+    use_memory: bool = True,
+    memory_path: str | None = None,
+    translator_options: dict | None = None,
+    tracer: Tracer | None = None,
+) -> list[JobResult]:
+    """Переводит книгу сразу на несколько языков: name_cn.xlsx, name_ja.xlsx, ...
+
+    Книга открывается и сканируется один раз, уникальные строки всех листов
+    отправляются в Translator каждого языка одновременно. У каждого языка свой
+    промпт (а значит, свой namespace памяти и кеша промпта), свой глоссарий
+    (см. language_glossary_path) и свой шрифт. Готовые переводы применяются к
+    собранным TargetIndex по очереди, между языками книга сбрасывается (reset).
+
+    translator_options общие для всех языков, кроме system_role и terms;
+    лимиты rpm/tpm действуют на все языки вместе, так как ключ API один.
+    """
+    start_time = time.time()
+    _check_cancel(cancel_event)
+    input_file = _resolve_input(input_file)
+
+    with ExitStack() as stack:
+        memory = stack.enter_context(TranslationMemory(memory_path)) if use_memory else None
+        tracer = tracer or Tracer()
+        options = dict(translator_options or {})
+        options.pop("system_role", None)
+        if "rate_limiter" not in options:
+            options["rate_limiter"] = RateLimiter(options.pop("rpm", None), options.pop("tpm", None))
+
+        translators: dict[str, Translator] = {}
+        for language in languages:
+            language_options = dict(options, system_role=system_role_for(language))
+            if "terms" not in options:
+                glossary_path = language_glossary_path(language.code)
+                language_options["terms"] = load_terms(glossary_path if os.path.isfile(glossary_path) else "")
+            translator = Translator(api_key, cancel_event=cancel_event, memory=memory, tracer=tracer, **language_options)
+            stack.callback(translator.close)
+            translators[language.code] = translator
+
+        with tracer.span("open", file=input_file, backend=backend):
+            book = stack.enter_context(open_workbook_backend(input_file, backend))
+
+        sheet_names = book.sheet_names()
+        total_sheets = len(sheet_names)
+        collected: list[TargetIndex] = []
+        all_texts: set[str] = set(sheet_names)
+        for index, sheet_name in enumerate(sheet_names, 1):
             _check_cancel(cancel_event)
-
-            if translated_sheet_data:
-                for i, sheet in enumerate(workbook.Sheets):
-                    sheet.Name = translated_sheet_data.get(f"sh_{i}", sheet.Name)
-
-            total_sheets = workbook.Sheets.Count
-
-            for index, sheet in enumerate(workbook.Sheets, 1):
-                _check_cancel(cancel_event)
-                sys.stdout.write(f"⏳ Лист [{index}/{total_sheets}]: {sheet.Name} —> Сбор данных...")
-                sys.stdout.flush()
-                used_range = sheet.UsedRange
-                cell_mapping = []
-                unique_texts_to_translate = set()
-
-                for r in range(1, used_range.Rows.Count + 1):
-                    _check_cancel(cancel_event)
-                    for c in range(1, used_range.Columns.Count + 1):
-                        cell = used_range.Cells(r, c)
-                        val = cell.Value
-                        if isinstance(val, str) and not str(cell.Formula).startswith("="):
-                            text = val.strip()
-                            if _should_translate_text(text):
-                                cell_mapping.append((cell.GetAddress(), text))
-                                unique_texts_to_translate.add(text)
-
-                for chart_obj in sheet.ChartObjects():
-                    _check_cancel(cancel_event)
-                    chart = chart_obj.Chart
-                    if chart.HasTitle:
-                        text = chart.ChartTitle.Text.strip()
-                        if _should_translate_text(text):
-                            cell_mapping.append((f"CHART_TITLE:{chart_obj.Name}", text))
-                            unique_texts_to_translate.add(text)
-
-                    for s_idx in range(1, chart.SeriesCollection().Count + 1):
-                        _check_cancel(cancel_event)
-                        series = chart.SeriesCollection(s_idx)
-                        try:
-                            text = series.Name.strip()
-                            if _should_translate_text(text):
-                                cell_mapping.append((f"CHART_SERIES:{chart_obj.Name}:{s_idx}", text))
-                                unique_texts_to_translate.add(text)
-                        except:
-                            pass
-
-                    for ax_type in [1, 2]:
-                        try:
-                            _check_cancel(cancel_event)
-                            axis = chart.Axes(ax_type)
-                            if axis.HasTitle:
-                                text = axis.AxisTitle.Text.strip()
-                                if _should_translate_text(text):
-                                    cell_mapping.append((f"CHART_AXIS:{chart_obj.Name}:{ax_type}", text))
-                                    unique_texts_to_translate.add(text)
-                        except:
-                            pass
-
-                if unique_texts_to_translate:
-                    unique_list = list(unique_texts_to_translate)
-                    sys.stdout.write(f" -> Перевод {len(unique_list)} строк...")
-                    sys.stdout.flush()
-
-                    translations_map = translator.translate_texts(unique_list)
-                else:
-                    translations_map = {}
-
-                _check_cancel(cancel_event)
-
-                sys.stdout.write(" -> Применяю перевод...")
-                sys.stdout.flush()
-
-                for i_map, (identifier, original_text) in enumerate(cell_mapping):
-                    if i_map % 200 == 0:
-                        _check_cancel(cancel_event)
-                    translated_text = translations_map.get(original_text, original_text)
-
-                    if translated_text == original_text:
-                        continue
-
-                    if identifier.startswith("CHART_TITLE:"):
-                        c_name = identifier.replace("CHART_TITLE:", "")
-                        chart = sheet.ChartObjects(c_name).Chart
-                        chart.ChartTitle.Text = translated_text
-                        try:
-                            chart.ChartTitle.Font.Name = "Microsoft YaHei"
-                        except:
-                            pass
-
-                    elif identifier.startswith("CHART_SERIES:"):
-                        parts = identifier.split(":")
-                        series = sheet.ChartObjects(parts[1]).Chart.SeriesCollection(int(parts[2]))
-                        series.Name = translated_text
-
-                    elif identifier.startswith("CHART_AXIS:"):
-                        parts = identifier.split(":")
-                        axis = sheet.ChartObjects(parts[1]).Chart.Axes(int(parts[2]))
-                        axis.AxisTitle.Text = translated_text
-                        try:
-                            axis.AxisTitle.Font.Name = "Microsoft YaHei"
-                        except:
-                            pass
-
-                    else:
-                        cell_range = sheet.Range(identifier)
-                        cell_range.Value = translated_text
-                        try:
-                            cell_range.Font.Name = "Microsoft YaHei"
-                        except:
-                            pass
-
-                sys.stdout.write("\n")
-                sys.stdout.flush()
-
+            sys.stdout.write(f"⏳ Лист [{index}/{total_sheets}]: {sheet_name} —> Сбор данных...")
+            sys.stdout.flush()
+            with tracer.span("collect", sheet=sheet_name) as span:
+                targets = book.collect_sheet(index - 1, cancel_event)
+                span.set(targets=len(targets), strings=len(targets.texts))
+            tracer.count("targets.collected", len(targets))
+            tracer.count("strings.deduplicated", len(targets) - len(targets.texts))
+            tracer.progress("collect", index, total_sheets, sheet_name)
+            collected.append(targets)
+            all_texts.update(targets.texts)
+            sys.stdout.write(f" {len(targets.texts)} строк\n")
+
+        codes = ", ".join(language.code for language in languages)
+        print(f"⏳ В очередь на перевод: {len(all_texts)} уникальных строк × {len(languages)} языков ({codes})")
+        texts = list(all_texts)
+        hints = {text: CHART for targets in collected for text in targets.texts_of(CHART_KINDS)}
+        hints.update(dict.fromkeys(sheet_names, SHEET_NAME))
+        submitted = time.perf_counter()
+        pending = {
+            language.code: (language, translators[language.code].submit_texts(texts, hints=hints)) for language in languages
+        }
+
+        results: list[JobResult] = []
+        last_progress = None
+        while pending:
             _check_cancel(cancel_event)
-            workbook.SaveAs(output_file)
+            ready = [code for code, (_language, future) in pending.items() if future.done()]
+            if not ready:
+                progress = " | ".join(
+                    f"{code}: {translators[code].batches_done}/{translators[code].batches_total}" for code in pending
+                )
+                if progress != last_progress:
+                    last_progress = progress
+                    print(f"⏳ Перевод (пачки): {progress}")
+                with tracer.span("wait"):
+                    wait([future for _language, future in pending.values()], timeout=0.2, return_when=FIRST_COMPLETED)
+                continue
+
+            for code in ready:
+                language, future = pending.pop(code)
+                translator = translators[code]
+                translations_map = future.result()
+                tracer.record("translate", submitted, language=code, strings=len(translations_map))
+                output_file = build_output_path(input_file, language.suffix)
+
+                if results:
+                    book.reset()
+                book.font_name = language.font
+                print(f"⏳ [{code}] Применяю перевод...")
+                for index, targets in enumerate(collected):
+                    with tracer.span("apply", sheet=sheet_names[index], targets=len(targets), language=code):
+                        book.apply_sheet(index, targets, translations_map, cancel_event)
+                book.rename_sheets({i: translations_map.get(name, name) for i, name in enumerate(sheet_names)})
 
-            end_time = time.time()
-            duration = end_time - start_time
-
-            print(f"\n✅ Готово! Результат в: {output_file}")
-            print(f"Токены: {translator.usage.total_tokens} | Стоимость: ${translator.total_cost_usd:.4f}")
-            print(f"Общее время: {int(duration // 60)} мин. {int(duration % 60)} сек.\n")
+                _check_cancel(cancel_event)
+                with tracer.span("save", file=output_file, language=code):
+                    book.save(output_file)
+                tracer.progress("save", len(results) + 1, len(languages))
+
+                result = JobResult(input_file, output_file, sheets=total_sheets, language=code)
+                result.targets = sum(len(targets) for targets in collected)
+                result.strings = len(all_texts)
+                result.duration_s = time.time() - start_time
+                result.phases = {name: tracer.totals[name] for name in PHASES if name in tracer.totals}
+                result.counters = dict(tracer.counters)
+                _fill_usage(result, translator)
+                results.append(result)
+
+                print(f"✅ [{code}] {language.name}: {output_file}")
+                _print_usage(result, translator, memory)
+                _print_failures(translator)
+
+        duration = time.time() - start_time
+        cost = sum(result.cost_usd for result in results)
+        print(f"\n✅ Готово! Языков: {len(results)} | Стоимость: ${cost:.4f}")
+        print(f"Общее время: {int(duration // 60)} мин. {int(duration % 60)} сек.\n")
+        return [result for language in languages for result in results if result.language == language.code]
@@ -1,4 +1,7 @@
 import win32com.client as win32
+from com_cells import ComCellAccess, cell_address, parse_address
+from targets import CELL, CHART_AXIS, CHART_SERIES, CHART_TITLE, TargetIndex
+from utils import check_cancel, should_translate_text
 
 class ExcelApp:
     """Контекст-менеджер для Excel.Application.
@@ -54,4 +57,175 @@ class WorkbookSession:
                 self.wb.Close(SaveChanges=False)
             except Exception:
                 pass
-            self.wb = None
\ No newline at end of file
+            self.wb = None
+
+
+FONT_NAME = "Microsoft YaHei"
+
+
+class ComWorkbook:
+    """Бэкенд книги поверх Excel COM (ExcelApp + WorkbookSession).
+
+    Реализует те же фазы, что и OoxmlWorkbook: сбор строк листа,
+    применение перевода и сохранение результата. В режиме bulk ячейки читаются
+    и записываются массивами через ComCellAccess, иначе — по одной ячейке.
+    """
+
+    def __init__(self, path: str, bulk: bool = True, font_name: str = FONT_NAME):
+        self.path = path
+        self.bulk = bulk
+        self.font_name = font_name
+        self._app = None
+        self._session = None
+        self._reopened = False
+        self.wb = None
+
+    def __enter__(self):
+        self._app = ExcelApp().__enter__()
+        try:
+            self._session = self._app.open_workbook(self.path)
+            self.wb = self._session.__enter__()
+        except BaseException:
+            self._app.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._session is not None:
+                self._session.__exit__(exc_type, exc, tb)
+        finally:
+            if self._app is not None:
+                self._app.__exit__(exc_type, exc, tb)
+            self._session = None
+            self._app = None
+            self.wb = None
+
+    def reset(self) -> None:
+        """Переоткрывает исходную книгу без сохранения: её можно перевести заново (на другой язык).
+
+        COM-объекты диаграмм в собранных TargetIndex после этого недействительны —
+        apply_sheet находит их заново по имени, один раз на диаграмму.
+        """
+
+        self._session.__exit__(None, None, None)
+        self._session = self._app.open_workbook(self.path)
+        self.wb = self._session.__enter__()
+        self._reopened = True
+
+    def sheet_names(self) -> list[str]:
+        return [sheet.Name for sheet in self.wb.Sheets]
+
+    def rename_sheets(self, names: dict[int, str]) -> None:
+        for i, sheet in enumerate(self.wb.Sheets):
+            if i in names:
+                sheet.Name = names[i]
+
+    def _collect_cells_by_one(self, sheet, cancel_event=None) -> TargetIndex:
+        used_range = sheet.UsedRange
+        targets = TargetIndex()
+
+        for r in range(1, used_range.Rows.Count + 1):
+            check_cancel(cancel_event)
+            for c in range(1, used_range.Columns.Count + 1):
+                cell = used_range.Cells(r, c)
+                val = cell.Value
+                if isinstance(val, str) and not str(cell.Formula).startswith("="):
+                    text = val.strip()
+                    if should_translate_text(text):
+                        row, col, _, _ = parse_address(cell.GetAddress())
+                        targets.add(text, CELL, row, col)
+
+        return targets
+
+    def collect_sheet(self, index: int, cancel_event=None) -> TargetIndex:
+        """Собирает цели перевода листа: ячейки (CELL) и тексты диаграмм.
+
+        COM-объект каждой диаграммы попадает в handles один раз и
+        используется при применении перевода без повторного поиска по имени.
+        """
+
+        sheet = self.wb.Sheets(index + 1)
+        if self.bulk:
+            targets = ComCellAccess(sheet).read_texts(cancel_event)
+        else:
+            targets = self._collect_cells_by_one(sheet, cancel_event)
+
+        for chart_obj in sheet.ChartObjects():
+            check_cancel(cancel_event)
+            chart = chart_obj.Chart
+            handle = targets.handle(chart, key=chart_obj.Name)
+            if chart.HasTitle:
+                text = chart.ChartTitle.Text.strip()
+                if should_translate_text(text):
+                    targets.add(text, CHART_TITLE, handle)
+
+            for s_idx in range(1, chart.SeriesCollection().Count + 1):
+                check_cancel(cancel_event)
+                series = chart.SeriesCollection(s_idx)
+                try:
+                    text = series.Name.strip()
+                    if should_translate_text(text):
+                        targets.add(text, CHART_SERIES, handle, s_idx)
+                except:
+                    pass
+
+            for ax_type in [1, 2]:
+                try:
+                    check_cancel(cancel_event)
+                    axis = chart.Axes(ax_type)
+                    if axis.HasTitle:
+                        text = axis.AxisTitle.Text.strip()
+                        if should_translate_text(text):
+                            targets.add(text, CHART_AXIS, handle, ax_type)
+                except:
+                    pass
+
+        return targets
+
+    def apply_sheet(self, index: int, targets: TargetIndex, translations_map: dict[str, str], cancel_event=None) -> None:
+        sheet = self.wb.Sheets(index + 1)
+        bulk_cells = {}
+        if self._reopened:
+            charts = targets.rebind(lambda name: sheet.ChartObjects(name).Chart)
+        else:
+            charts = targets.handles
+
+        for i_target, (kind, a, b, translated_text) in enumerate(targets.translated(translations_map)):
+            if i_target % 200 == 0:
+                check_cancel(cancel_event)
+
+            if kind == CELL and self.bulk:
+                bulk_cells[(a, b)] = translated_text
+
+            elif kind == CELL:
+                cell_range = sheet.Range(cell_address(a, b))
+                cell_range.Value = translated_text
+                try:
+                    cell_range.Font.Name = self.font_name
+                except:
+                    pass
+
+            elif kind == CHART_TITLE:
+                chart = charts[a]
+                chart.ChartTitle.Text = translated_text
+                try:
+                    chart.ChartTitle.Font.Name = self.font_name
+                except:
+                    pass
+
+            elif kind == CHART_SERIES:
+                charts[a].SeriesCollection(b).Name = translated_text
+
+            elif kind == CHART_AXIS:
+                axis = charts[a].Axes(b)
+                axis.AxisTitle.Text = translated_text
+                try:
+                    axis.AxisTitle.Font.Name = self.font_name
+                except:
+                    pass
+
+        ComCellAccess(sheet).write_texts(bulk_cells, self.font_name, cancel_event)
+
+    def save(self, output_file: str) -> None:
+        self.wb.SaveAs(output_file)
@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+from typing import Dict, List
+
+@dataclass(frozen=True)
+class TargetLanguage:
+    """Язык перевода: название для промпта, жаргон-примеры, суффикс результата и шрифт.
+
+    Шрифт ставится переведённым ячейкам и текстам диаграмм, чтобы Excel не
+    подставлял для иероглифов или хангыля случайный шрифт темы.
+    """
+
+    code: str
+    name: str
+    suffix: str
+    font: str
+    # Строки раздела «Terminology & Style Guidelines» с примерами игрового жаргона
+    jargon: str
+
+LANGUAGES: Dict[str, TargetLanguage] = {
+    language.code: language
+    for language in (
+        TargetLanguage(
+            "zh",
+            "Simplified Chinese",
+            "_cn",
+            "Microsoft YaHei",
+            "- Spending/Monetization:\n"
+            "  * 'Non-paying players' -> 非付费玩家 / 零氪玩家\n"
+            "  * 'Spending real money' -> 付费 / 氪金\n"
+            "- Events & Scheduling:\n"
+            "  * 'Global schedule' -> 全服统一日程 / 固定档期\n"
+            "  * 'Progress in events' -> 推进活动进度\n",
+        ),
+        TargetLanguage(
+            "zh-tw",
+            "Traditional Chinese (Taiwan)",
+            "_tw",
+            "Microsoft JhengHei",
+            "- Spending/Monetization:\n"
+            "  * 'Non-paying players' -> 非付費玩家 / 零課玩家\n"
+            "  * 'Spending real money' -> 付費 / 課金\n"
+            "- Events & Scheduling:\n"
+            "  * 'Global schedule' -> 全服統一日程 / 固定檔期\n"
+            "  * 'Progress in events' -> 推進活動進度\n",
+        ),
+        TargetLanguage(
+            "ja",
+            "Japanese",
+            "_ja",
+            "Yu Gothic",
+            "- Spending/Monetization:\n"
+            "  * 'Non-paying players' -> 無課金プレイヤー / 無課金勢\n"
+            "  * 'Spending real money' -> 課金\n"
+            "- Events & Scheduling:\n"
+            "  * 'Global schedule' -> 全サーバー共通スケジュール\n"
+            "  * 'Progress in events' -> イベントを進める\n",
+        ),
+        TargetLanguage(
+            "ko",
+            "Korean",
+            "_ko",
+            "Malgun Gothic",
+            "- Spending/Monetization:\n"
+            "  * 'Non-paying players' -> 무과금 유저\n"
+            "  * 'Spending real money' -> 과금 / 현질\n"
+            "- Events & Scheduling:\n"
+            "  * 'Global schedule' -> 전 서버 공통 일정\n"
+            "  * 'Progress in events' -> 이벤트 진행\n",
+        ),
+    )
+}
+
+DEFAULT_LANGUAGE = "zh"
+
+def get_language(code: str) -> TargetLanguage:
+    language = LANGUAGES.get(code.strip().lower())
+    if language is None:
+        raise ValueError(f"Неизвестный язык: {code}. Допустимо: {', '.join(LANGUAGES)}")
+    return language
+
+def parse_languages(value: str) -> List[TargetLanguage]:
+    """Список языков из строки вида "zh,ja,ko" без повторов, в исходном порядке"""
+
+    languages: List[TargetLanguage] = []
+    for code in value.split(","):
+        if code.strip():
+            language = get_language(code)
+            if language not in languages:
+                languages.append(language)
+    if not languages:
+        raise ValueError("Не указан ни один язык перевода")
+    return languages
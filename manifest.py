@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable
+from targets import TargetIndex
+
+# 2: ячейки OOXML получают ключ по адресу, а не по индексу общей строки
+MANIFEST_VERSION = 2
+
+def manifest_path(input_file: str) -> str:
+    """Манифест инкрементального перевода рядом с книгой: name.xlsx.manifest.json"""
+
+    return input_file + ".manifest.json"
+
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+@dataclass
+class SheetDigest:
+    """Хеш листа целиком и хеши текстов по ключам целей (ячейки, общие строки, тексты диаграмм)"""
+
+    hash: str
+    cells: Dict[str, str]
+
+    @classmethod
+    def of(cls, targets: TargetIndex) -> "SheetDigest":
+        cells = {key: text_hash(text) for key, text in targets.keyed()}
+        digest = hashlib.blake2b(digest_size=16)
+        for key in sorted(cells):
+            digest.update(f"{key}={cells[key]}\n".encode("utf-8"))
+        return cls(digest.hexdigest(), cells)
+
+@dataclass(frozen=True)
+class SheetDiff:
+    unchanged: bool
+    changed: int = 0
+    added: int = 0
+    removed: int = 0
+
+@dataclass
+class TranslationManifest:
+    """Что было переведено в прошлый раз: хеши листов (по исходным именам) и применённые переводы.
+
+    Переводы действительны только для того же namespace (модель + промпт),
+    что и у памяти переводов; при другом namespace манифест игнорируется.
+    """
+
+    namespace: str
+    output_file: str = ""
+    sheets: Dict[str, SheetDigest] = field(default_factory=dict)
+    translations: Dict[str, str] = field(default_factory=dict)
+    version: int = MANIFEST_VERSION
+
+    def diff(self, sheet_name: str, digest: SheetDigest) -> SheetDiff:
+        """Сравнивает лист с прошлым запуском; новый лист — все цели добавлены"""
+
+        previous = self.sheets.get(sheet_name)
+        if previous is None:
+            return SheetDiff(False, added=len(digest.cells))
+        if previous.hash == digest.hash:
+            return SheetDiff(True)
+
+        changed = added = 0
+        for key, value in digest.cells.items():
+            old = previous.cells.get(key)
+            if old is None:
+                added += 1
+            elif old != value:
+                changed += 1
+        removed = sum(1 for key in previous.cells if key not in digest.cells)
+        return SheetDiff(False, changed, added, removed)
+
+    def translations_for(self, texts: Iterable[str]) -> Dict[str, str]:
+        return {text: self.translations.get(text, text) for text in texts}
+
+    def save(self, path: str) -> None:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(asdict(self), fh, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "TranslationManifest | None":
+        """Манифест из файла или None, если файла нет или он другого формата"""
+
+        try:
+            with open(path, encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return None
+        sheets = {name: SheetDigest(**digest) for name, digest in data.get("sheets", {}).items()}
+        return cls(data["namespace"], data.get("output_file", ""), sheets, data.get("translations", {}))
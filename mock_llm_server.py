@@ -0,0 +1,273 @@
+import argparse
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from rate_limit import estimate_tokens
+from wire_format import format_lines, parse_lines
+
+def mock_translate(text: str) -> str:
+    """Детерминированный «перевод» для заглушки"""
+
+    return f"译{text}"
+
+class MockLLMServer:
+    """Локальный HTTP-сервер, имитирующий OpenAI /v1/chat/completions и /v1/models.
+
+    Позволяет гонять Translator без сети: задаётся задержка ответа, лимит
+    запросов в минуту (сверх лимита — 429 с Retry-After), доля случайных 500 и
+    доля ключей, «забытых» моделью (drop_rate). Если translate бросает
+    исключение, запрос завершается 500 — так имитируется «ядовитая» строка.
+    Пользовательское сообщение должно быть JSON-объектом {id: текст}; в ответ
+    приходит объект с теми же ключами и «переведёнными» значениями. Если запрошен
+    текстовый ответ (response_format text), пачка и ответ — строки «номер TAB текст»
+    (см. wire_format.LinesFormat).
+
+    Кеш промптов имитируется как у OpenAI: если системное сообщение длиннее
+    1024 токенов и запрос с ним уже был обработан до прихода текущего, его
+    часть (кратная 128 токенам) возвращается в usage.prompt_tokens_details.cached_tokens.
+
+    Лимит rpm считается в скользящем окне window_s (его можно уменьшить, чтобы
+    тесты не ждали минуту); Retry-After по умолчанию — время до освобождения слота.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_s: float = 0.0,
+        rpm: int | None = None,
+        failure_rate: float = 0.0,
+        drop_rate: float = 0.0,
+        retry_after_s: float | None = None,
+        translate=mock_translate,
+        seed: int = 0,
+        window_s: float = 60.0,
+    ):
+        self.latency_s = latency_s
+        self.rpm = rpm
+        self.failure_rate = failure_rate
+        self.drop_rate = drop_rate
+        self.retry_after_s = retry_after_s
+        self.window_s = window_s
+        self.translate = translate
+
+        self.stats = {
+            "requests": 0,
+            "completed": 0,
+            "rate_limited": 0,
+            "failed": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cached_tokens": 0,
+            "max_in_flight": 0,
+        }
+        self._in_flight = 0
+        self._window: deque[float] = deque()
+        self._seen_prefixes: set[str] = set()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, _exc_type, _exc, _tb):
+        self.stop()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _admit(self) -> tuple[str, float]:
+        """Решает судьбу запроса: ("ok" | "rate_limited" | "failed", retry_after)."""
+
+        with self._lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            if self.rpm:
+                while self._window and now - self._window[0] >= self.window_s:
+                    self._window.popleft()
+                if len(self._window) >= self.rpm:
+                    self.stats["rate_limited"] += 1
+                    retry_after = self.retry_after_s
+                    if retry_after is None:
+                        retry_after = self._window[0] + self.window_s - now
+                    return "rate_limited", retry_after
+                self._window.append(now)
+
+            if self.failure_rate and self._random.random() < self.failure_rate:
+                self.stats["failed"] += 1
+                return "failed", 0.0
+
+            self._in_flight += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self._in_flight)
+            return "ok", 0.0
+
+    @staticmethod
+    def _prefix(messages: list) -> str:
+        return str(messages[0].get("content", "")) if len(messages) > 1 else ""
+
+    def _prefix_cached(self, body: dict) -> bool:
+        prefix = self._prefix(body.get("messages") or [])
+        with self._lock:
+            return prefix in self._seen_prefixes
+
+    def _complete(self, body: dict, prefix_cached: bool = False) -> dict:
+        messages = body.get("messages") or []
+        user_content = messages[-1].get("content", "") if messages else ""
+        lines = (body.get("response_format") or {}).get("type") == "text"
+        if lines:
+            payload = parse_lines(user_content)
+        else:
+            try:
+                payload = json.loads(user_content)
+            except json.JSONDecodeError:
+                payload = {}
+            if not isinstance(payload, dict):
+                payload = {}
+
+        result = {}
+        for key, value in payload.items():
+            with self._lock:
+                dropped = bool(self.drop_rate) and self._random.random() < self.drop_rate
+            if not dropped:
+                result[key] = self.translate(value) if isinstance(value, str) else value
+        content = format_lines(result.items()) if lines else json.dumps(result, ensure_ascii=False)
+
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+        completion_tokens = estimate_tokens(content)
+        prefix = self._prefix(messages)
+        prefix_tokens = estimate_tokens(prefix) if prefix else 0
+        with self._lock:
+            cached_tokens = 0
+            if prefix_tokens >= 1024:
+                if prefix_cached:
+                    cached_tokens = prefix_tokens // 128 * 128
+                self._seen_prefixes.add(prefix)
+            self.stats["completed"] += 1
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+            self.stats["cached_tokens"] += cached_tokens
+
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            },
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *_args):
+                return
+
+            def _send_json(self, status: int, data: dict, headers: dict | None = None) -> None:
+                raw = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model", "created": 0, "owned_by": "mock"}]})
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+
+                verdict, retry_after = server._admit()
+                if verdict == "rate_limited":
+                    self._send_json(
+                        429,
+                        {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                        {"Retry-After": f"{max(retry_after, 0.0):.3f}"},
+                    )
+                    return
+                if verdict == "failed":
+                    self._send_json(500, {"error": {"message": "Mock server error", "type": "server_error"}})
+                    return
+
+                try:
+                    try:
+                        body = json.loads(raw or b"{}")
+                        prefix_cached = server._prefix_cached(body)
+                        if server.latency_s:
+                            time.sleep(server.latency_s)
+                        response = server._complete(body, prefix_cached)
+                    except Exception as e:
+                        with server._lock:
+                            server.stats["failed"] += 1
+                        self._send_json(500, {"error": {"message": f"Mock failure: {e}", "type": "server_error"}})
+                        return
+                    self._send_json(200, response)
+                finally:
+                    with server._lock:
+                        server._in_flight -= 1
+
+        return Handler
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Локальная заглушка OpenAI chat-completions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, сек")
+    parser.add_argument("--rpm", type=int, default=None, help="лимит запросов в минуту (сверх — 429)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="доля ответов 500")
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.host, args.port, args.latency, args.rpm, args.failure_rate)
+    print(f"Mock LLM server: {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1133 @@
+import io
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+from array import array
+import xml.sax
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.handler import ContentHandler
+from xml.sax.saxutils import XMLGenerator
+from com_cells import col_number
+from targets import CHART_BLOCK, INLINE, SST, TargetIndex, cell_position
+from utils import check_cancel, should_translate_text
+
+FONT_NAME = "Microsoft YaHei"
+
+# Параллельная обработка частей имеет смысл только для достаточно больших книг:
+# запуск пула процессов (особенно spawn на Windows) стоит сотни миллисекунд.
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024
+
+_FORMULA_TAGS = {"f", "formula", "formula1", "formula2"}
+_CHART_AXES = {"valAx", "catAx", "dateAx", "serAx"}
+_RPR_AFTER_FONTS = {"cs", "sym", "hlinkClick", "hlinkMouseOver", "rtl", "extLst"}
+
+_INVALID_SHEET_CHARS_RE = re.compile(r"[\[\]:*?/\\]")
+_STRING_LITERAL_RE = re.compile(r'"(?:[^"]|"")*"')
+_SHEET_REF_RE = re.compile(r"'((?:[^']|'')+)'!|(?<![\w.\]'])([^\W\d][\w.]*)!")
+_CELL_REF_RE = re.compile(r"([A-Z]+)(\d+)")
+
+
+def _local(name: str) -> str:
+    return name.rpartition(":")[2]
+
+
+def _prefix(name: str) -> str:
+    head, sep, _ = name.rpartition(":")
+    return head + sep
+
+
+def _resolve_target(source_part: str, target: str) -> str:
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source_part), target))
+
+
+def _read_rels(zf: zipfile.ZipFile, part: str) -> list[tuple[str, str, str]]:
+    """Читает связи части: [(rId, тип, путь к целевой части)]."""
+
+    rels_part = posixpath.join(posixpath.dirname(part), "_rels", posixpath.basename(part) + ".rels")
+    try:
+        data = zf.read(rels_part)
+    except KeyError:
+        return []
+
+    rels = []
+    for rel in ET.fromstring(data):
+        if rel.get("TargetMode") == "External":
+            continue
+        rel_type = rel.get("Type", "").rsplit("/", 1)[-1]
+        rels.append((rel.get("Id", ""), rel_type, _resolve_target(part, rel.get("Target", ""))))
+    return rels
+
+
+def _quote_sheet_name(name: str) -> str:
+    return "'" + name.replace("'", "''") + "'"
+
+
+def _rename_sheet_refs(formula: str, renames: dict[str, str]) -> str:
+    """Заменяет ссылки вида Лист!A1 / 'Лист 1'!A1 на переименованные листы.
+       Строковые литералы внутри формулы не трогаются.
+    """
+    if not renames or "!" not in formula:
+        return formula
+
+    def replace(m: re.Match) -> str:
+        name = m.group(1).replace("''", "'") if m.group(1) is not None else m.group(2)
+        new_name = renames.get(name)
+        if new_name is None:
+            return m.group(0)
+        return _quote_sheet_name(new_name) + "!"
+
+    parts = []
+    pos = 0
+    for m in _STRING_LITERAL_RE.finditer(formula):
+        parts.append(_SHEET_REF_RE.sub(replace, formula[pos : m.start()]))
+        parts.append(m.group(0))
+        pos = m.end()
+    parts.append(_SHEET_REF_RE.sub(replace, formula[pos:]))
+    return "".join(parts)
+
+
+def _safe_sheet_name(name, fallback: str, taken: set[str]) -> str:
+    """Приводит имя листа к ограничениям Excel: до 31 символа, без []:*?/\\, уникально."""
+
+    name = _INVALID_SHEET_CHARS_RE.sub(" ", str(name)).strip().strip("'")[:31].strip()
+    if not name:
+        name = fallback
+
+    base = name
+    n = 2
+    while name.lower() in taken:
+        suffix = f" ({n})"
+        name = base[: 31 - len(suffix)] + suffix
+        n += 1
+    return name
+
+
+def _parse_part(zf: zipfile.ZipFile, part: str, handler: ContentHandler) -> None:
+    parser = xml.sax.make_parser()
+    parser.setContentHandler(handler)
+    with zf.open(part) as stream:
+        parser.parse(stream)
+
+
+def _replay(out: XMLGenerator, events) -> None:
+    for event in events:
+        if event[0] == "s":
+            out.startElement(event[1], event[2])
+        elif event[0] == "e":
+            out.endElement(event[1])
+        else:
+            out.characters(event[1])
+
+
+def _emit_text(out: XMLGenerator, name: str, text: str) -> None:
+    attrs = {"xml:space": "preserve"} if text != text.strip() else {}
+    out.startElement(name, attrs)
+    out.characters(text)
+    out.endElement(name)
+
+
+class _Rewriter(ContentHandler):
+    """Потоковый SAX-фильтр: по умолчанию копирует XML-часть без изменений.
+
+    Префиксы пространств имён сохраняются как есть (в отличие от ElementTree),
+    иначе Excel ломается на атрибутах вроде mc:Ignorable.
+    """
+
+    def __init__(self, out):
+        super().__init__()
+        self.out = XMLGenerator(out, "utf-8", short_empty_elements=True)
+
+    def startDocument(self):
+        self.out.startDocument()
+
+    def endDocument(self):
+        self.out.endDocument()
+
+    def startElement(self, name, attrs):
+        self.out.startElement(name, attrs)
+
+    def endElement(self, name):
+        self.out.endElement(name)
+
+    def characters(self, content):
+        self.out.characters(content)
+
+    def ignorableWhitespace(self, whitespace):
+        self.out.ignorableWhitespace(whitespace)
+
+    def processingInstruction(self, target, data):
+        self.out.processingInstruction(target, data)
+
+
+class _SstScanner(ContentHandler):
+    """Потоково читает sharedStrings.xml в список строк (без фонетических подсказок rPh)."""
+
+    def __init__(self):
+        super().__init__()
+        self.strings: list[str] = []
+        self._parts: list[str] | None = None
+        self._in_t = False
+        self._in_rph = False
+
+    def startElement(self, name, attrs):
+        tag = _local(name)
+        if tag == "si":
+            self._parts = []
+        elif tag == "rPh":
+            self._in_rph = True
+        elif tag == "t" and not self._in_rph and self._parts is not None:
+            self._in_t = True
+
+    def endElement(self, name):
+        tag = _local(name)
+        if tag == "si":
+            self.strings.append("".join(self._parts or ()))
+            self._parts = None
+        elif tag == "rPh":
+            self._in_rph = False
+        elif tag == "t":
+            self._in_t = False
+
+    def characters(self, content):
+        if self._in_t:
+            self._parts.append(content)
+
+
+class _SstRewriter(_Rewriter):
+    """Заменяет содержимое переведённых элементов <si> одним <t> с переводом."""
+
+    def __init__(self, out, translations: dict[int, str]):
+        super().__init__(out)
+        self.translations = translations
+        self._index = -1
+        self._skip = False
+        self._depth = 0
+
+    def startElement(self, name, attrs):
+        if self._skip:
+            self._depth += 1
+            return
+
+        self.out.startElement(name, attrs)
+        if _local(name) == "si":
+            self._index += 1
+            text = self.translations.get(self._index)
+            if text is not None:
+                _emit_text(self.out, _prefix(name) + "t", text)
+                self._skip = True
+                self._depth = 0
+
+    def endElement(self, name):
+        if self._skip:
+            if self._depth:
+                self._depth -= 1
+                return
+            self._skip = False
+        self.out.endElement(name)
+
+    def characters(self, content):
+        if not self._skip:
+            self.out.characters(content)
+
+    def ignorableWhitespace(self, whitespace):
+        if not self._skip:
+            self.out.ignorableWhitespace(whitespace)
+
+
+class _CellTracker:
+    """Общая логика разбора ячейки <c> для сканера и переписчика листа."""
+
+    def _reset_cell(self, attrs) -> None:
+        self.cell_type = attrs.get("t", "n")
+        try:
+            self.cell_style = int(attrs.get("s", 0) or 0)
+        except ValueError:
+            self.cell_style = 0
+        self.has_formula = False
+        self.value_parts: list[str] = []
+        self.inline_parts: list[str] = []
+        self.capture: str | None = None
+        self.in_rph = False
+
+    def _track_start(self, tag: str) -> None:
+        if tag == "f":
+            self.has_formula = True
+        elif tag == "v":
+            self.capture = "v"
+        elif tag == "rPh":
+            self.in_rph = True
+        elif tag == "t" and not self.in_rph:
+            self.capture = "t"
+
+    def _track_end(self, tag: str) -> None:
+        if tag in ("v", "t"):
+            self.capture = None
+        elif tag == "rPh":
+            self.in_rph = False
+
+    def _track_chars(self, content: str) -> None:
+        if self.capture == "v":
+            self.value_parts.append(content)
+        elif self.capture == "t":
+            self.inline_parts.append(content)
+
+    def _sst_index(self) -> int | None:
+        if self.cell_type != "s" or self.has_formula:
+            return None
+        try:
+            return int("".join(self.value_parts))
+        except ValueError:
+            return None
+
+
+def _cell_ref(attrs, row: int, col: int) -> tuple[int, int]:
+    """Строка и столбец ячейки из атрибута r ("B12"); без него — ячейка следом за предыдущей"""
+
+    m = _CELL_REF_RE.fullmatch(attrs.get("r", ""))
+    if m is None:
+        return row, col
+    return int(m.group(2)), col_number(m.group(1))
+
+
+class _SheetScanner(ContentHandler, _CellTracker):
+    """Собирает из листа ссылки на общие строки и переводимые inline-строки вместе с позициями ячеек."""
+
+    def __init__(self):
+        super().__init__()
+        self.sst_styles: dict[int, set[int]] = {}
+        # Ячейки с общими строками: индекс в sharedStrings и позиция ячейки (targets.cell_position)
+        self.sst_cells = (array("i"), array("q"))
+        self.inline: list[tuple[int, str, int, int]] = []
+        self._in_cell = False
+        self._inline_count = 0
+        self._row = 0
+        self._col = 0
+
+    def startElement(self, name, attrs):
+        tag = _local(name)
+        if tag == "c":
+            self._in_cell = True
+            self._reset_cell(attrs)
+            self._row, self._col = _cell_ref(attrs, self._row, self._col + 1)
+        elif self._in_cell:
+            self._track_start(tag)
+        elif tag == "row":
+            try:
+                self._row = int(attrs.get("r", ""))
+            except ValueError:
+                self._row += 1
+            self._col = 0
+
+    def endElement(self, name):
+        tag = _local(name)
+        if tag != "c":
+            if self._in_cell:
+                self._track_end(tag)
+            return
+
+        self._in_cell = False
+        if self.cell_type == "inlineStr":
+            ordinal = self._inline_count
+            self._inline_count += 1
+            text = "".join(self.inline_parts).strip()
+            if not self.has_formula and should_translate_text(text):
+                self.inline.append((ordinal, text, self.cell_style, cell_position(self._row, self._col)))
+            return
+
+        idx = self._sst_index()
+        if idx is not None:
+            self.sst_styles.setdefault(idx, set()).add(self.cell_style)
+            self.sst_cells[0].append(idx)
+            self.sst_cells[1].append(cell_position(self._row, self._col))
+
+    def characters(self, content):
+        if self._in_cell:
+            self._track_chars(content)
+
+
+class _SheetRewriter(_Rewriter, _CellTracker):
+    """Переписывает лист: стили переведённых ячеек, inline-строки и ссылки на листы в формулах."""
+
+    def __init__(self, out, sst_translated, inline_translations: dict[int, str], style_map: dict[int, int], renames: dict[str, str]):
+        super().__init__(out)
+        self.sst_translated = sst_translated
+        self.inline_translations = inline_translations
+        self.style_map = style_map
+        self.renames = renames
+        self._cell_events: list | None = None
+        self._formula: list[str] | None = None
+        self._inline_count = 0
+
+    def startElement(self, name, attrs):
+        tag = _local(name)
+        if self._cell_events is None and tag != "c":
+            if tag in _FORMULA_TAGS:
+                self._formula = []
+            self.out.startElement(name, attrs)
+            return
+
+        if tag == "c":
+            self._cell_events = []
+            self._reset_cell(attrs)
+        else:
+            self._track_start(tag)
+            if tag == "f":
+                self._formula = []
+        self._cell_events.append(("s", name, dict(attrs)))
+
+    def characters(self, content):
+        if self._formula is not None:
+            self._formula.append(content)
+        elif self._cell_events is not None:
+            self._track_chars(content)
+            self._cell_events.append(("c", content))
+        else:
+            self.out.characters(content)
+
+    def ignorableWhitespace(self, whitespace):
+        self.characters(whitespace)
+
+    def endElement(self, name):
+        tag = _local(name)
+        formula_text = None
+        if self._formula is not None and (tag in _FORMULA_TAGS):
+            formula_text = _rename_sheet_refs("".join(self._formula), self.renames)
+            self._formula = None
+
+        if self._cell_events is None:
+            if formula_text is not None:
+                self.out.characters(formula_text)
+            self.out.endElement(name)
+            return
+
+        if formula_text is not None:
+            self._cell_events.append(("c", formula_text))
+        self._track_end(tag)
+        self._cell_events.append(("e", name))
+        if tag == "c":
+            self._flush_cell()
+
+    def _flush_cell(self) -> None:
+        events = self._cell_events
+        self._cell_events = None
+
+        translation = None
+        if self.cell_type == "inlineStr":
+            ordinal = self._inline_count
+            self._inline_count += 1
+            if not self.has_formula:
+                translation = self.inline_translations.get(ordinal)
+            translated = translation is not None
+        else:
+            idx = self._sst_index()
+            translated = idx is not None and idx in self.sst_translated
+
+        if translated:
+            new_style = self.style_map.get(self.cell_style)
+            if new_style is not None:
+                events[0][2]["s"] = str(new_style)
+
+        if translation is None:
+            _replay(self.out, events)
+            return
+
+        skip_depth = 0
+        for event in events:
+            if skip_depth:
+                if event[0] == "s":
+                    skip_depth += 1
+                elif event[0] == "e":
+                    skip_depth -= 1
+                continue
+            if event[0] == "s" and _local(event[1]) == "is":
+                self.out.startElement(event[1], event[2])
+                _emit_text(self.out, _prefix(event[1]) + "t", translation)
+                self.out.endElement(event[1])
+                skip_depth = 1
+                continue
+            _replay(self.out, (event,))
+
+
+class _ChartBlocks:
+    """Нумерует текстовые блоки диаграммы в порядке документа:
+       заголовок диаграммы, имена рядов и заголовки осей.
+    """
+
+    def _init_blocks(self) -> None:
+        self.stack: list[str] = []
+        self.block: tuple[int, str] | None = None
+        self._block_depth = 0
+        self._block_count = 0
+
+    def _enter(self, tag: str) -> None:
+        stack = self.stack
+        stack.append(tag)
+        if self.block is not None:
+            return
+
+        kind = None
+        if tag == "rich" and len(stack) >= 4 and stack[-2] == "tx" and stack[-3] == "title":
+            if stack[-4] == "chart":
+                kind = "title"
+            elif stack[-4] in _CHART_AXES:
+                kind = "axis"
+        elif tag == "tx" and len(stack) >= 2 and stack[-2] == "ser":
+            kind = "series"
+
+        if kind is not None:
+            self.block = (self._block_count, kind)
+            self._block_count += 1
+            self._block_depth = len(stack)
+
+    def _leave(self) -> None:
+        if self.block is not None and len(self.stack) == self._block_depth:
+            self.block = None
+        self.stack.pop()
+
+    def _is_block_text(self) -> bool:
+        if self.block is None or not self.stack:
+            return False
+        if self.block[1] == "series":
+            return self.stack[-1] == "v"
+        return self.stack[-1] == "t"
+
+
+class _ChartScanner(ContentHandler, _ChartBlocks):
+    def __init__(self):
+        super().__init__()
+        self._init_blocks()
+        self.blocks: list[tuple[int, str, str]] = []
+        self._parts: list[str] = []
+
+    def startElement(self, name, attrs):
+        tag = _local(name)
+        was_in_block = self.block is not None
+        self._enter(tag)
+        if self.block is not None and not was_in_block:
+            self._parts = []
+        elif tag == "p" and self.block is not None and self._parts:
+            self._parts.append("\n")
+
+    def endElement(self, name):
+        block = self.block
+        self._leave()
+        if block is not None and self.block is None:
+            text = "".join(self._parts).strip()
+            if should_translate_text(text):
+                self.blocks.append((block[0], block[1], text))
+
+    def characters(self, content):
+        if self._is_block_text():
+            self._parts.append(content)
+
+
+class _ChartRewriter(_Rewriter, _ChartBlocks):
+    """Подставляет переводы в текстовые блоки диаграммы и задаёт шрифт в runs заголовков."""
+
+    def __init__(self, out, translations: dict[int, str], renames: dict[str, str], font_name: str = FONT_NAME):
+        super().__init__(out)
+        self._init_blocks()
+        self.translations = translations
+        self.renames = renames
+        self.font_name = font_name
+        self._translation: str | None = None
+        self._text_written = False
+        self._formula: list[str] | None = None
+        self._run_has_rpr = False
+        self._fonts_done: set[str] = set()
+
+    def _emit_fonts(self, prefix: str, before: str | None = None) -> None:
+        for tag in ("latin", "ea"):
+            if tag == before:
+                break
+            if tag not in self._fonts_done:
+                self._fonts_done.add(tag)
+                self.out.startElement(prefix + tag, {"typeface": self.font_name})
+                self.out.endElement(prefix + tag)
+
+    def startElement(self, name, attrs):
+        tag = _local(name)
+        was_in_block = self.block is not None
+        self._enter(tag)
+        if self.block is not None and not was_in_block:
+            self._translation = self.translations.get(self.block[0])
+            self._text_written = False
+
+        if self._translation is None or self.block is None or self.block[1] == "series":
+            if tag == "f":
+                self._formula = []
+            self.out.startElement(name, attrs)
+            return
+
+        parent = self.stack[-2] if len(self.stack) >= 2 else ""
+        if tag in ("r", "fld"):
+            self._run_has_rpr = False
+        elif tag == "rPr" and parent in ("r", "fld"):
+            self._run_has_rpr = True
+            self._fonts_done = set()
+        elif parent == "rPr" and len(self.stack) >= 3 and self.stack[-3] in ("r", "fld"):
+            if tag in ("latin", "ea"):
+                self._emit_fonts(_prefix(name), before=tag)
+                self._fonts_done.add(tag)
+                attrs = dict(attrs)
+                attrs["typeface"] = self.font_name
+            elif tag in _RPR_AFTER_FONTS:
+                self._emit_fonts(_prefix(name))
+        elif tag == "t" and parent in ("r", "fld") and not self._run_has_rpr:
+            prefix = _prefix(name)
+            self.out.startElement(prefix + "rPr", {})
+            self._fonts_done = set()
+            self._emit_fonts(prefix)
+            self.out.endElement(prefix + "rPr")
+            self._run_has_rpr = True
+
+        self.out.startElement(name, attrs)
+
+    def endElement(self, name):
+        tag = _local(name)
+        if self._formula is not None and tag == "f":
+            self.out.characters(_rename_sheet_refs("".join(self._formula), self.renames))
+            self._formula = None
+        elif self._translation is not None and self._is_block_text():
+            if not self._text_written:
+                self.out.characters(self._translation)
+                self._text_written = True
+        elif self._translation is not None and tag == "rPr" and len(self.stack) >= 2 and self.stack[-2] in ("r", "fld"):
+            self._emit_fonts(_prefix(name))
+
+        self._leave()
+        if self.block is None:
+            self._translation = None
+        self.out.endElement(name)
+
+    def characters(self, content):
+        if self._formula is not None:
+            self._formula.append(content)
+        elif self._translation is not None and self._is_block_text():
+            return
+        else:
+            self.out.characters(content)
+
+
+class _StylesScanner(ContentHandler):
+    """Запоминает элементы <font> из <fonts> и <xf> из <cellXfs> как списки событий."""
+
+    def __init__(self):
+        super().__init__()
+        self.fonts: list[list] = []
+        self.xfs: list[list] = []
+        self._section: str | None = None
+        self._events: list | None = None
+        self._depth = 0
+
+    def startElement(self, name, attrs):
+        tag = _local(name)
+        if self._events is not None:
+            self._events.append(("s", name, dict(attrs)))
+            self._depth += 1
+        elif tag in ("fonts", "cellXfs"):
+            self._section = tag
+        elif (self._section, tag) in (("fonts", "font"), ("cellXfs", "xf")):
+            self._events = [("s", name, dict(attrs))]
+            self._depth = 1
+
+    def endElement(self, name):
+        if self._events is not None:
+            self._events.append(("e", name))
+            self._depth -= 1
+            if not self._depth:
+                (self.fonts if self._section == "fonts" else self.xfs).append(self._events)
+                self._events = None
+        elif _local(name) == self._section:
+            self._section = None
+
+    def characters(self, content):
+        if self._events is not None:
+            self._events.append(("c", content))
+
+
+class _StylesRewriter(_Rewriter):
+    """Дописывает в styles.xml копии шрифтов (с другим name) и копии xf, ссылающиеся на них."""
+
+    def __init__(self, out, new_fonts: list[list], new_xfs: list[list]):
+        super().__init__(out)
+        self.new_fonts = new_fonts
+        self.new_xfs = new_xfs
+
+    def _additions(self, tag: str):
+        if tag == "fonts":
+            return self.new_fonts
+        if tag == "cellXfs":
+            return self.new_xfs
+        return None
+
+    def startElement(self, name, attrs):
+        added = self._additions(_local(name))
+        if added and "count" in attrs:
+            attrs = dict(attrs)
+            try:
+                attrs["count"] = str(int(attrs["count"]) + len(added))
+            except ValueError:
+                pass
+        self.out.startElement(name, attrs)
+
+    def endElement(self, name):
+        for events in self._additions(_local(name)) or ():
+            _replay(self.out, events)
+        self.out.endElement(name)
+
+
+def _clone_font(events: list, font_name: str = FONT_NAME) -> list:
+    """Копия <font> с name=font_name, без scheme/charset (иначе Excel возьмёт шрифт темы)."""
+
+    result = []
+    skip_depth = 0
+    has_name = False
+    for event in events:
+        if skip_depth:
+            if event[0] == "s":
+                skip_depth += 1
+            elif event[0] == "e":
+                skip_depth -= 1
+            continue
+        if event[0] == "s" and _local(event[1]) in ("scheme", "charset"):
+            skip_depth = 1
+            continue
+        if event[0] == "s" and _local(event[1]) == "name":
+            has_name = True
+            event = ("s", event[1], {**event[2], "val": font_name})
+        result.append(event)
+
+    if not has_name:
+        name_tag = _prefix(events[0][1]) + "name"
+        result[-1:-1] = [("s", name_tag, {"val": font_name}), ("e", name_tag)]
+    return result
+
+
+class _WorkbookRewriter(_Rewriter):
+    """Переименовывает листы в workbook.xml и обновляет ссылки в definedNames."""
+
+    def __init__(self, out, new_names: list[str], renames: dict[str, str]):
+        super().__init__(out)
+        self.new_names = new_names
+        self.renames = renames
+        self._sheet_index = 0
+        self._defined_name: list[str] | None = None
+
+    def startElement(self, name, attrs):
+        tag = _local(name)
+        if tag == "sheet" and self._sheet_index < len(self.new_names):
+            attrs = dict(attrs)
+            attrs["name"] = self.new_names[self._sheet_index]
+            self._sheet_index += 1
+        elif tag == "definedName":
+            self._defined_name = []
+        self.out.startElement(name, attrs)
+
+    def endElement(self, name):
+        if self._defined_name is not None and _local(name) == "definedName":
+            self.out.characters(_rename_sheet_refs("".join(self._defined_name), self.renames))
+            self._defined_name = None
+        self.out.endElement(name)
+
+    def characters(self, content):
+        if self._defined_name is not None:
+            self._defined_name.append(content)
+        else:
+            self.out.characters(content)
+
+
+class _TableRewriter(_Rewriter):
+    """Синхронизирует имена столбцов таблицы с переведёнными заголовками."""
+
+    def __init__(self, out, translations: dict[str, str]):
+        super().__init__(out)
+        self.translations = translations
+        self._taken: set[str] = set()
+
+    def startElement(self, name, attrs):
+        if _local(name) == "tableColumn" and "name" in attrs:
+            attrs = dict(attrs)
+            col_name = attrs["name"]
+            new_name = self.translations.get(col_name.strip(), col_name)
+            candidate = new_name
+            n = 2
+            while candidate.lower() in self._taken:
+                candidate = f"{new_name}{n}"
+                n += 1
+            self._taken.add(candidate.lower())
+            attrs["name"] = candidate
+        self.out.startElement(name, attrs)
+
+
+_SCANNERS = {"sheet": _SheetScanner, "chart": _ChartScanner}
+_REWRITERS = {
+    "sst": _SstRewriter,
+    "sheet": _SheetRewriter,
+    "chart": _ChartRewriter,
+    "styles": _StylesRewriter,
+    "workbook": _WorkbookRewriter,
+    "table": _TableRewriter,
+}
+
+
+def _scan_part(src_path: str, part: str, kind: str):
+    """Сканирует часть пакета (выполняется в том числе в дочерних процессах)."""
+
+    handler = _SCANNERS[kind]()
+    with zipfile.ZipFile(src_path) as zf:
+        _parse_part(zf, part, handler)
+    if kind == "sheet":
+        return handler.sst_styles, handler.inline, handler.sst_cells
+    return handler.blocks
+
+
+def _rewrite_part(src_path: str, part: str, kind: str, params: dict, out_path: str) -> str:
+    """Переписывает часть пакета во временный файл (выполняется в том числе в дочерних процессах)."""
+
+    with zipfile.ZipFile(src_path) as zf, open(out_path, "wb") as fh:
+        writer = io.TextIOWrapper(fh, encoding="utf-8", newline="\n", write_through=True)
+        try:
+            _parse_part(zf, part, _REWRITERS[kind](writer, **params))
+            writer.flush()
+        finally:
+            writer.detach()
+    return out_path
+
+
+class OoxmlWorkbook:
+    """Бэкенд книги, работающий напрямую с пакетом .xlsx (zip из XML-частей) без Excel.
+
+    Общие строки (sharedStrings.xml) переводятся один раз на всю книгу, листы и
+    диаграммы читаются и переписываются потоково (SAX), а независимые части
+    больших книг обрабатываются в пуле процессов.
+    """
+
+    def __init__(self, path: str, workers: int | None = None, font_name: str = FONT_NAME):
+        self.path = path
+        self.workers = workers
+        self.font_name = font_name
+        self._zip: zipfile.ZipFile | None = None
+
+        self._sheets: list[dict] = []
+        self._sst_part: str | None = None
+        self._styles_part: str | None = None
+        self._workbook_part = "xl/workbook.xml"
+
+        self._sst: list[str] | None = None
+        self._sheet_scans: list | None = None
+        self._chart_scans: dict[str, list] = {}
+
+        self._renames: dict[str, str] = {}
+        self._sst_tr: dict[int, str] = {}
+        self._inline_tr: dict[str, dict[int, str]] = {}
+        self._chart_tr: dict[str, dict[int, str]] = {}
+        self._applied: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._zip = zipfile.ZipFile(self.path)
+        try:
+            self._load_structure()
+        except BaseException:
+            self._zip.close()
+            self._zip = None
+            raise
+        return self
+
+    def __exit__(self, _exc_type, _exc, _tb):
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def _load_structure(self) -> None:
+        zf = self._zip
+        for _rid, rel_type, target in _read_rels(zf, ""):
+            if rel_type == "officeDocument":
+                self._workbook_part = target
+
+        try:
+            root = ET.fromstring(zf.read(self._workbook_part))
+        except KeyError:
+            raise ValueError("Файл не является книгой Excel (.xlsx): нет workbook.xml") from None
+
+        wb_rels = {}
+        for rid, rel_type, target in _read_rels(zf, self._workbook_part):
+            wb_rels[rid] = (rel_type, target)
+            if rel_type == "sharedStrings":
+                self._sst_part = target
+            elif rel_type == "styles":
+                self._styles_part = target
+
+        for el in root.iter():
+            if _local(el.tag.rpartition("}")[2]) != "sheet":
+                continue
+            rid = next((v for k, v in el.attrib.items() if k.endswith("}id")), "")
+            rel_type, part = wb_rels.get(rid, ("", ""))
+            sheet = {"name": el.get("name", ""), "part": part, "kind": rel_type, "charts": [], "tables": []}
+
+            for _rid, sub_type, sub_target in _read_rels(zf, part) if part else ():
+                if sub_type == "drawing":
+                    sheet["charts"].extend(t for _, kind, t in _read_rels(zf, sub_target) if kind == "chart")
+                elif sub_type == "table":
+                    sheet["tables"].append(sub_target)
+            self._sheets.append(sheet)
+
+    def _part_size(self, part: str) -> int:
+        try:
+            return self._zip.getinfo(part).file_size
+        except KeyError:
+            return 0
+
+    def _pool_size(self, parts: list[str]) -> int:
+        if len(parts) < 2:
+            return 1
+        if self.workers is not None:
+            return max(1, min(self.workers, len(parts)))
+        if sum(self._part_size(p) for p in parts) < PARALLEL_MIN_BYTES:
+            return 1
+        return max(1, min(os.cpu_count() or 1, len(parts)))
+
+    def _map_parts(self, func, jobs: list[tuple], cancel_event=None) -> list:
+        """Выполняет func(self.path, *job) для каждой части — в пуле процессов, если это оправдано."""
+
+        workers = self._pool_size([job[0] for job in jobs])
+        if workers <= 1:
+            results = []
+            for job in jobs:
+                check_cancel(cancel_event)
+                results.append(func(self.path, *job))
+            return results
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(func, self.path, *job) for job in jobs]
+            try:
+                results = []
+                for future in futures:
+                    check_cancel(cancel_event)
+                    results.append(future.result())
+                return results
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def _ensure_scanned(self, cancel_event=None) -> None:
+        with self._lock:
+            if self._sheet_scans is not None:
+                return
+
+            if self._sst is None:
+                scanner = _SstScanner()
+                if self._sst_part and self._part_size(self._sst_part):
+                    _parse_part(self._zip, self._sst_part, scanner)
+                self._sst = scanner.strings
+
+            jobs = [(s["part"], "sheet") for s in self._sheets if s["kind"] == "worksheet" and s["part"] in self._zip.NameToInfo]
+            charts = sorted({c for s in self._sheets for c in s["charts"] if c in self._zip.NameToInfo})
+            jobs.extend((c, "chart") for c in charts)
+            results = dict(zip((job[0] for job in jobs), self._map_parts(_scan_part, jobs, cancel_event)))
+
+            self._chart_scans = {c: results[c] for c in charts}
+            self._sheet_scans = [results.get(s["part"], ({}, [], (array("i"), array("q")))) for s in self._sheets]
+
+    def sheet_names(self) -> list[str]:
+        return [s["name"] for s in self._sheets]
+
+    def rename_sheets(self, names: dict[int, str]) -> None:
+        taken: set[str] = set()
+        for i, sheet in enumerate(self._sheets):
+            old_name = sheet["name"]
+            new_name = _safe_sheet_name(names.get(i, old_name), old_name, taken)
+            taken.add(new_name.lower())
+            if new_name != old_name:
+                original = next((k for k, v in self._renames.items() if v == old_name), old_name)
+                self._renames[original] = new_name
+                sheet["name"] = new_name
+
+    def collect_sheet(self, index: int, cancel_event=None) -> TargetIndex:
+        """Собирает цели перевода листа: ячейки с общими и inline-строками и тексты диаграмм.
+
+        Цель ячейки хранит её позицию, поэтому ключи манифеста (TargetIndex.keyed)
+        не зависят от нумерации sharedStrings.
+        """
+
+        self._ensure_scanned(cancel_event)
+        sheet = self._sheets[index]
+        _sst_styles, inline, (sst_indices, sst_positions) = self._sheet_scans[index]
+        targets = TargetIndex()
+
+        # Текст и проверка should_translate_text — один раз на общую строку, а не на ячейку
+        sst_texts: dict[int, str | None] = {}
+        for i_cell, (idx, position) in enumerate(zip(sst_indices, sst_positions)):
+            if i_cell % 10000 == 0:
+                check_cancel(cancel_event)
+            if idx not in sst_texts:
+                text = self._sst[idx].strip() if 0 <= idx < len(self._sst) else ""
+                sst_texts[idx] = text if should_translate_text(text) else None
+            text = sst_texts[idx]
+            if text is not None:
+                targets.add(text, SST, idx, position)
+
+        for ordinal, text, _style, position in inline:
+            targets.add(text, INLINE, ordinal, position)
+
+        for chart_part in sheet["charts"]:
+            check_cancel(cancel_event)
+            blocks = self._chart_scans.get(chart_part, ())
+            if blocks:
+                part = targets.handle(chart_part)
+                for block_no, _kind, text in blocks:
+                    targets.add(text, CHART_BLOCK, part, block_no)
+
+        return targets
+
+    def apply_sheet(self, index: int, targets: TargetIndex, translations_map: dict[str, str], cancel_event=None) -> None:
+        """Запоминает переводы для целей листа; сами XML-части переписываются в save()."""
+
+        parts = targets.handles
+        sheet_part = self._sheets[index]["part"]
+        for text in targets.texts:
+            translated_text = translations_map.get(text, text)
+            if translated_text != text:
+                self._applied[text] = translated_text
+
+        for i_target, (kind, a, b, translated_text) in enumerate(targets.translated(translations_map)):
+            if i_target % 1000 == 0:
+                check_cancel(cancel_event)
+            if kind == SST:
+                self._sst_tr[a] = translated_text
+            elif kind == INLINE:
+                self._inline_tr.setdefault(sheet_part, {})[a] = translated_text
+            else:
+                self._chart_tr.setdefault(parts[a], {})[b] = translated_text
+
+    def reset(self) -> None:
+        """Забывает применённые переводы и переименования: книгу можно перевести заново (на другой язык).
+
+        Результаты сканирования сохраняются, поэтому собранные TargetIndex остаются действительными.
+        """
+
+        originals = {new: old for old, new in self._renames.items()}
+        for sheet in self._sheets:
+            sheet["name"] = originals.get(sheet["name"], sheet["name"])
+        self._renames.clear()
+        self._sst_tr.clear()
+        self._inline_tr.clear()
+        self._chart_tr.clear()
+        self._applied.clear()
+
+    def _style_additions(self) -> tuple[dict[int, int], list, list]:
+        """Строит копии xf/font с font_name для стилей, реально используемых переведёнными ячейками."""
+
+        used = set()
+        for sheet, (sst_styles, inline, _sst_cells) in zip(self._sheets, self._sheet_scans):
+            for idx, styles in sst_styles.items():
+                if idx in self._sst_tr:
+                    used |= styles
+            part_tr = self._inline_tr.get(sheet["part"], {})
+            used.update(style for ordinal, _text, style, _position in inline if ordinal in part_tr)
+
+        if not used or not self._styles_part or self._styles_part not in self._zip.NameToInfo:
+            return {}, [], []
+
+        scanner = _StylesScanner()
+        _parse_part(self._zip, self._styles_part, scanner)
+        if not scanner.xfs or not scanner.fonts:
+            return {}, [], []
+
+        font_map: dict[int, int] = {}
+        new_fonts: list[list] = []
+        style_map: dict[int, int] = {}
+        new_xfs: list[list] = []
+        for style in sorted(used):
+            if style >= len(scanner.xfs):
+                continue
+            xf_events = scanner.xfs[style]
+            try:
+                font_id = int(xf_events[0][2].get("fontId", 0))
+            except ValueError:
+                font_id = 0
+            if font_id >= len(scanner.fonts):
+                font_id = 0
+            if font_id not in font_map:
+                font_map[font_id] = len(scanner.fonts) + len(new_fonts)
+                new_fonts.append(_clone_font(scanner.fonts[font_id], self.font_name))
+
+            attrs = {**xf_events[0][2], "fontId": str(font_map[font_id]), "applyFont": "1"}
+            style_map[style] = len(scanner.xfs) + len(new_xfs)
+            new_xfs.append([("s", xf_events[0][1], attrs)] + xf_events[1:])
+
+        return style_map, new_fonts, new_xfs
+
+    def save(self, output_file: str, cancel_event=None) -> None:
+        """Потоково пишет новый пакет: изменённые части переписываются, остальные копируются."""
+
+        self._ensure_scanned(cancel_event)
+        style_map, new_fonts, new_xfs = self._style_additions()
+        renames = dict(self._renames)
+        sst_translated = frozenset(self._sst_tr)
+
+        jobs: list[tuple[str, str, dict]] = []
+        if self._sst_tr and self._sst_part:
+            jobs.append((self._sst_part, "sst", {"translations": self._sst_tr}))
+        if new_xfs:
+            jobs.append((self._styles_part, "styles", {"new_fonts": new_fonts, "new_xfs": new_xfs}))
+        if renames:
+            jobs.append((self._workbook_part, "workbook", {"new_names": self.sheet_names(), "renames": renames}))
+
+        tables = set()
+        for sheet, (sst_styles, _inline, _sst_cells) in zip(self._sheets, self._sheet_scans):
+            part = sheet["part"]
+            tables.update(sheet["tables"])
+            if sheet["kind"] != "worksheet" or part not in self._zip.NameToInfo:
+                continue
+            inline_tr = self._inline_tr.get(part, {})
+            if renames or inline_tr or not sst_translated.isdisjoint(sst_styles):
+                params = {
+                    "sst_translated": sst_translated,
+                    "inline_translations": inline_tr,
+                    "style_map": style_map,
+                    "renames": renames,
+                }
+                jobs.append((part, "sheet", params))
+
+        for chart_part in self._chart_scans:
+            if renames or chart_part in self._chart_tr:
+                params = {"translations": self._chart_tr.get(chart_part, {}), "renames": renames, "font_name": self.font_name}
+                jobs.append((chart_part, "chart", params))
+
+        if self._applied:
+            jobs.extend((t, "table", {"translations": self._applied}) for t in sorted(tables) if t in self._zip.NameToInfo)
+
+        tmp_output = output_file + ".part"
+        with tempfile.TemporaryDirectory(prefix="xlsx_") as tmp_dir:
+            rewrite_jobs = [
+                (part, kind, params, os.path.join(tmp_dir, f"{i}.xml")) for i, (part, kind, params) in enumerate(jobs)
+            ]
+            rewritten = dict(zip((job[0] for job in jobs), self._map_parts(_rewrite_part, rewrite_jobs, cancel_event)))
+
+            try:
+                with zipfile.ZipFile(tmp_output, "w", zipfile.ZIP_DEFLATED) as dst:
+                    for info in self._zip.infolist():
+                        check_cancel(cancel_event)
+                        if info.filename in rewritten:
+                            dst.write(rewritten[info.filename], info.filename)
+                            continue
+                        out_info = zipfile.ZipInfo(info.filename, info.date_time)
+                        out_info.compress_type = zipfile.ZIP_DEFLATED
+                        out_info.external_attr = info.external_attr
+                        with self._zip.open(info) as src, dst.open(out_info, "w") as out:
+                            shutil.copyfileobj(src, out, 1024 * 1024)
+                os.replace(tmp_output, output_file)
+            except BaseException:
+                if os.path.exists(tmp_output):
+                    os.remove(tmp_output)
+                raise
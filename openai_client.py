@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import CancelledError, TimeoutError
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+# Как часто ожидающий поток проверяет отмену, пока запрос выполняется в фоновом цикле
+CANCEL_POLL_S = 0.05
+
+_clients: dict = {}
+_async_clients: dict = {}
+_lock = threading.Lock()
+_loop: asyncio.AbstractEventLoop | None = None
+
+def key_fingerprint(api_key: str) -> str:
+    """Хеш ключа — чтобы не хранить и не логировать сам ключ."""
+
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+def shared_client(api_key: str, base_url: str | None = None):
+    """Один клиент OpenAI (и один пул HTTP-соединений) на пару ключ + base_url.
+
+    Нужен для синхронных вызовов (Batch API); повторы выключены, ими
+    управляет вызывающий код. openai импортируется при первом вызове,
+    а не при старте приложения.
+    """
+
+    cache_key = (key_fingerprint(api_key), base_url)
+    with _lock:
+        client = _clients.get(cache_key)
+        if client is None:
+            from openai import OpenAI
+
+            client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+            _clients[cache_key] = client
+        return client
+
+def io_loop() -> asyncio.AbstractEventLoop:
+    """Фоновый цикл asyncio (один на процесс), в котором выполняются запросы асинхронных клиентов."""
+
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="openai-io", daemon=True).start()
+            _loop = loop
+        return _loop
+
+def shared_async_client(api_key: str, base_url: str | None = None):
+    """Как shared_client, но AsyncOpenAI: его запросы можно прервать посреди ответа (см. run_async).
+
+    Проверка ключа и Translator берут клиента отсюда, поэтому соединение,
+    открытое при проверке, переиспользуется первыми запросами перевода.
+    """
+
+    cache_key = (key_fingerprint(api_key), base_url)
+    with _lock:
+        client = _async_clients.get(cache_key)
+        if client is None:
+            from openai import AsyncOpenAI
+
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+            _async_clients[cache_key] = client
+        return client
+
+def run_async(awaitable: Awaitable[T], cancelled: Callable[[], bool] | None = None) -> T:
+    """Выполняет запрос в фоновом цикле и ждёт его из текущего потока.
+
+    Если cancelled() вернула True, задача отменяется: asyncio закрывает
+    соединение и запрос прерывается сразу, а не по таймауту. Отмена
+    замечается не позже чем через CANCEL_POLL_S; бросается CancelledError.
+    """
+
+    async def run() -> T:
+        return await awaitable
+
+    future = asyncio.run_coroutine_threadsafe(run(), io_loop())
+    while True:
+        try:
+            return future.result(timeout=CANCEL_POLL_S)
+        except TimeoutError:
+            if cancelled is not None and cancelled():
+                future.cancel()
+                raise CancelledError() from None
@@ -0,0 +1,214 @@
+import csv
+import json
+import os
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+from languages import DEFAULT_LANGUAGE
+from translation_memory import default_memory_path
+
+# Метрики, валюты и платформы, которые в китайских отчётах пишутся латиницей
+BUILTIN_KEEP = frozenset(
+    (
+        "DAU MAU WAU ARPU ARPPU ARPDAU LTV ROI ROAS CPI CPM eCPM CPC CTR CVR KPI IAP IAA "
+        "GMV MoM YoY QoQ WoW YTD MTD FTUE UA PvP PvE MMO RPG MMORPG SLG RTS MOBA FPS TPS "
+        "USD EUR CNY RMB JPY KRW GBP HKD TWD SGD RUB INR BRL "
+        "iOS Android iPadOS PC Steam Google Apple AppStore"
+    ).split()
+)
+
+# Целиком «технические» фрагменты: ссылки, адреса почты, идентификаторы пакетов (com.company.game)
+_WHOLE_RE = re.compile(
+    r"https?://\S+|www\.\S+|[\w.+-]+@[\w-]+(?:\.[\w-]+)+|\b[a-z][a-z0-9_-]*(?:\.[a-z0-9_-]+){2,}\b"
+)
+# Разделители между токенами, которые не требуют перевода
+_SEPARATORS_RE = re.compile(r"[\s/\\|,;:()\[\]{}<>\-–—+&.!?'\"·•=*#%$€£¥₽~^]+")
+_CAMEL_RE = re.compile(r"[a-z][A-Z]")
+
+def default_terms_paths() -> Tuple[str, str]:
+    """glossary.csv и do_not_translate.txt рядом с базой памяти переводов"""
+
+    base = os.path.dirname(default_memory_path())
+    return os.path.join(base, "glossary.csv"), os.path.join(base, "do_not_translate.txt")
+
+def language_glossary_path(code: str) -> str:
+    """Глоссарий для языка перевода: glossary.csv для китайского, glossary.<код>.csv для остальных"""
+
+    glossary, _dnt = default_terms_paths()
+    if code == DEFAULT_LANGUAGE:
+        return glossary
+    root, extension = os.path.splitext(glossary)
+    return f"{root}.{code}{extension}"
+
+def is_identifier_token(token: str) -> bool:
+    """Токен похож на идентификатор: SKU, Q3, FY2024, v1.2, snake_case, camelCase, известная аббревиатура."""
+
+    if token in BUILTIN_KEEP:
+        return True
+    if any(ch.isdigit() for ch in token):
+        return True
+    if "_" in token:
+        return True
+    return bool(_CAMEL_RE.search(token))
+
+class AhoCorasick:
+    """Поиск всех вхождений набора шаблонов за один проход по строке (без учёта регистра)."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for pattern in patterns:
+            key = pattern.lower()
+            if not key:
+                continue
+            node = 0
+            for ch in key:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(len(self.patterns))
+            self.patterns.append(key)
+
+        # Ссылки неудач строятся обходом в ширину: у узлов первого уровня — корень
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                if node:
+                    fail = self._fail[node]
+                    while fail and ch not in self._goto[fail]:
+                        fail = self._fail[fail]
+                    self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def find_all(self, text: str) -> List[Tuple[int, int, int]]:
+        """[(начало, конец, номер шаблона)] для всех вхождений, включая перекрывающиеся."""
+
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            lowered = text
+        found = []
+        node = 0
+        for i, ch in enumerate(lowered):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for idx in self._out[node]:
+                found.append((i + 1 - len(self.patterns[idx]), i + 1, idx))
+        return found
+
+def _is_boundary(text: str, pos: int) -> bool:
+    return pos <= 0 or pos >= len(text) or not (text[pos - 1].isalnum() and text[pos].isalnum())
+
+class TermMatcher:
+    """Решает локально строки, которые не нужно отправлять модели.
+
+    Строка решается без API, если целиком состоит из терминов «не переводить»,
+    терминов глоссария, идентификаторов (SKU, Q3 2024, DAU/MAU, ссылки, почта)
+    и разделителей. Термины глоссария заменяются переводом, остальное
+    остаётся как в оригинале.
+    """
+
+    def __init__(self, do_not_translate: Iterable[str] = (), glossary: Dict[str, str] | None = None):
+        self.glossary: Dict[str, str] = {k.strip(): v.strip() for k, v in (glossary or {}).items() if k.strip()}
+        self.do_not_translate = sorted({t.strip() for t in do_not_translate if t.strip()})
+
+        self._replacements: List[str | None] = []
+        patterns = []
+        for term in self.do_not_translate:
+            patterns.append(term)
+            self._replacements.append(None)
+        for src, dst in self.glossary.items():
+            patterns.append(src)
+            self._replacements.append(dst)
+        self._automaton = AhoCorasick(patterns)
+
+    def _term_spans(self, text: str) -> List[Tuple[int, int, str | None]]:
+        """Непересекающиеся вхождения терминов по границам слов: самое левое, затем самое длинное."""
+
+        if not self._automaton:
+            return []
+        matches = sorted(self._automaton.find_all(text), key=lambda m: (m[0], m[0] - m[1]))
+        spans = []
+        pos = 0
+        for start, end, idx in matches:
+            if start < pos or not (_is_boundary(text, start) and _is_boundary(text, end)):
+                continue
+            spans.append((start, end, self._replacements[idx]))
+            pos = end
+        return spans
+
+    def resolve(self, text: str) -> str | None:
+        """Перевод без API или None, если строку нужно отправить модели."""
+
+        spans = self._term_spans(text)
+        spans.extend((m.start(), m.end(), None) for m in _WHOLE_RE.finditer(text))
+        spans.sort()
+
+        parts: List[str] = []
+        pos = 0
+        for start, end, replacement in spans:
+            if start < pos:
+                continue
+            if not self._residue_is_protected(text[pos:start]):
+                return None
+            parts.append(text[pos:start])
+            parts.append(text[start:end] if replacement is None else replacement)
+            pos = end
+        if not self._residue_is_protected(text[pos:]):
+            return None
+        parts.append(text[pos:])
+        return "".join(parts)
+
+    @staticmethod
+    def _residue_is_protected(fragment: str) -> bool:
+        return all(is_identifier_token(token) for token in _SEPARATORS_RE.split(fragment) if token)
+
+def _read_glossary(path: str) -> Dict[str, str]:
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+        if not isinstance(data, dict):
+            raise ValueError(f"Глоссарий {path}: ожидался JSON-объект {{термин: перевод}}")
+        return {str(k): str(v) for k, v in data.items()}
+
+    with open(path, encoding="utf-8-sig", newline="") as fh:
+        lines = [line for line in fh if line.strip() and not line.lstrip().startswith("#")]
+    delimiter = "\t" if lines and "\t" in lines[0] else ","
+    glossary = {}
+    for row in csv.reader(lines, delimiter=delimiter):
+        if len(row) >= 2 and row[0].strip():
+            glossary[row[0].strip()] = row[1].strip()
+    return glossary
+
+def _read_terms(path: str) -> List[str]:
+    with open(path, encoding="utf-8-sig") as fh:
+        return [line.strip() for line in fh if line.strip() and not line.lstrip().startswith("#")]
+
+def load_terms(glossary_path: str | None = None, dnt_path: str | None = None) -> TermMatcher:
+    """Собирает TermMatcher из файлов (CSV/TSV/JSON глоссарий, список «не переводить» построчно).
+
+    Если пути не заданы, берутся файлы из каталога памяти переводов, когда они есть.
+    """
+
+    default_glossary, default_dnt = default_terms_paths()
+    if glossary_path is None and os.path.isfile(default_glossary):
+        glossary_path = default_glossary
+    if dnt_path is None and os.path.isfile(default_dnt):
+        dnt_path = default_dnt
+
+    glossary = _read_glossary(glossary_path) if glossary_path else {}
+    terms = _read_terms(dnt_path) if dnt_path else []
+    return TermMatcher(terms, glossary)
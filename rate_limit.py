@@ -0,0 +1,149 @@
+import email.utils
+import random
+import threading
+import time
+from multiprocessing.managers import BaseManager
+from utils import check_cancel
+
+# Грубая локальная оценка: ~3 символа на токен для смеси латиницы/кириллицы/CJK
+CHARS_PER_TOKEN = 3
+
+def estimate_tokens(text: str) -> int:
+    """Оценка числа токенов строки без токенизатора."""
+
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+def parse_retry_after(headers) -> float | None:
+    """Возвращает задержку из заголовков retry-after-ms / Retry-After (секунды или HTTP-дата)."""
+
+    if not headers:
+        return None
+
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+def backoff_delay(attempt: int, base_s: float = 1.0, max_s: float = 30.0) -> float:
+    """Экспоненциальная задержка с полным джиттером для попытки attempt (с 0)."""
+
+    return random.uniform(0, min(max_s, base_s * (2 ** attempt)))
+
+class TokenBucket:
+    """Корзина токенов: пополняется со скоростью rate_per_minute.
+
+    Вмещает не больше burst_s секунд пополнения, чтобы лимит не выбирался
+    одним залпом в начале минуты. Крупный запрос может увести корзину в минус —
+    следующие запросы подождут, пока «долг» не погасится.
+    """
+
+    def __init__(self, rate_per_minute: float, burst_s: float = 1.0):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_s)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        need = min(amount, self.capacity)
+        if self.tokens >= need:
+            return 0.0
+        return (need - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.tokens -= amount
+
+class RateLimiter:
+    """Ограничитель запросов в минуту (RPM) и токенов в минуту (TPM) для нескольких потоков.
+
+    После ответа 429 все потоки приостанавливаются до момента, указанного в
+    Retry-After, чтобы не добивать лимит параллельными повторами.
+    """
+
+    def __init__(self, rpm: int | None = None, tpm: int | None = None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def try_acquire(self, tokens: int = 0) -> float:
+        """Занимает 1 запрос и tokens токенов, если они есть, и возвращает 0.
+
+        Иначе ничего не занимает и возвращает, сколько секунд подождать.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            wait = self._paused_until - now
+            if self.requests is not None:
+                wait = max(wait, self.requests.wait_time(1, now))
+            if self.tokens is not None and tokens:
+                wait = max(wait, self.tokens.wait_time(tokens, now))
+
+            if wait > 0:
+                return wait
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None and tokens:
+                self.tokens.take(tokens)
+            return 0.0
+
+    def acquire(self, tokens: int = 0, cancel_event: threading.Event | None = None) -> None:
+        """Блокирует поток, пока не освободится 1 запрос и tokens токенов."""
+
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+
+            wait = min(wait, 1.0)
+            if cancel_event is not None:
+                cancel_event.wait(wait)
+                check_cancel(cancel_event)
+            else:
+                time.sleep(wait)
+
+class RateLimitManager(BaseManager):
+    """Процесс-хранитель общего RateLimiter для нескольких процессов-обработчиков."""
+
+RateLimitManager.register("RateLimiter", RateLimiter, exposed=("try_acquire", "pause"))
+
+class SharedRateLimiter(RateLimiter):
+    """RateLimiter поверх прокси из RateLimitManager: лимит один на все процессы.
+
+    Ожидание идёт в своём процессе (с проверкой отмены), в менеджер уходят
+    только короткие вызовы try_acquire/pause.
+    """
+
+    def __init__(self, proxy):
+        self._proxy = proxy
+
+    def try_acquire(self, tokens: int = 0) -> float:
+        return self._proxy.try_acquire(tokens)
+
+    def pause(self, seconds: float) -> None:
+        self._proxy.pause(seconds)
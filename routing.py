@@ -0,0 +1,85 @@
+import json
+import re
+from dataclasses import dataclass, fields, replace
+from typing import Dict
+
+# Классы строк. Имена листов и тексты диаграмм Translator узнаёт из подсказок
+# вызывающего кода (hints), остальные классы определяются по самой строке
+SHEET_NAME = "sheet_name"
+CHART = "chart"  # заголовки диаграмм и осей, имена рядов
+LABEL = "label"  # короткая подпись: пара слов без предложений
+TEXT = "text"
+PROSE = "prose"  # длинный аналитический текст
+STRING_CLASSES = (SHEET_NAME, CHART, LABEL, TEXT, PROSE)
+
+# Маршрут основной модели Translator; классы без своего маршрута идут по нему
+PRIMARY = "primary"
+
+LABEL_MAX_WORDS = 4
+LABEL_MAX_CHARS = 40
+PROSE_MIN_WORDS = 40
+PROSE_MIN_CHARS = 250
+
+_SENTENCE_END_RE = re.compile(r"[.!?。！？](?:\s|$)")
+
+def classify(text: str, hint: str | None = None) -> str:
+    """Класс строки: подсказка вызывающего кода, иначе — по длине и числу предложений"""
+
+    if hint is not None:
+        return hint
+    words = len(text.split())
+    if words >= PROSE_MIN_WORDS or len(text) >= PROSE_MIN_CHARS or len(_SENTENCE_END_RE.findall(text)) >= 3:
+        return PROSE
+    if words <= LABEL_MAX_WORDS and len(text) <= LABEL_MAX_CHARS and not _SENTENCE_END_RE.search(text):
+        return LABEL
+    return TEXT
+
+@dataclass(frozen=True)
+class Route:
+    """Куда отправлять строки класса: модель, размер пачки, таймаут и цены.
+
+    Незаданные поля берутся у основной модели Translator. fallback=True —
+    строки, перевод которых не прошёл проверку (нет в ответе, пустой, невалидный
+    JSON, потеряны метки {{N}}), переводятся повторно основной моделью.
+    """
+
+    model: str | None = None
+    batch_size: int | None = None
+    timeout_s: float | None = None
+    price_in_per_1m: float | None = None
+    price_out_per_1m: float | None = None
+    price_cached_in_per_1m: float | None = None
+    fallback: bool = True
+
+    def resolve(self, primary: "Route") -> "Route":
+        """Маршрут, в котором пустые поля заполнены значениями основной модели"""
+
+        return replace(self, **{f.name: getattr(primary, f.name) for f in fields(self) if getattr(self, f.name) is None})
+
+# Короткие строки — дешёвой модели большими пачками, длинный текст остаётся на основной
+DEFAULT_ROUTES: Dict[str, Route] = {
+    SHEET_NAME: Route("gpt-5-mini", batch_size=200, timeout_s=15, price_in_per_1m=0.25, price_out_per_1m=2.0, price_cached_in_per_1m=0.025),
+    CHART: Route("gpt-5-mini", batch_size=200, timeout_s=15, price_in_per_1m=0.25, price_out_per_1m=2.0, price_cached_in_per_1m=0.025),
+    LABEL: Route("gpt-5-mini", batch_size=200, timeout_s=15, price_in_per_1m=0.25, price_out_per_1m=2.0, price_cached_in_per_1m=0.025),
+}
+
+def load_routes(path: str) -> Dict[str, Route]:
+    """Маршруты из JSON: {"label": {"model": "gpt-5-mini", "batch_size": 200, ...}, ...}; "default" — DEFAULT_ROUTES"""
+
+    if path == "default":
+        return dict(DEFAULT_ROUTES)
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    if not isinstance(data, dict):
+        raise ValueError(f"Маршруты должны быть JSON-объектом: {path}")
+
+    allowed = {f.name for f in fields(Route)}
+    routes: Dict[str, Route] = {}
+    for name, options in data.items():
+        if name not in STRING_CLASSES:
+            raise ValueError(f"Неизвестный класс строк: {name}. Допустимо: {', '.join(STRING_CLASSES)}")
+        unknown = set(options) - allowed
+        if unknown:
+            raise ValueError(f"Неизвестные поля маршрута {name}: {', '.join(sorted(unknown))}")
+        routes[name] = Route(**options)
+    return routes
@@ -0,0 +1,119 @@
+from array import array
+from typing import Dict, Iterator, List, Set, Tuple
+
+# Виды целей перевода. Смысл полей a и b зависит от вида:
+CELL = 0  # ячейка COM: a — строка, b — столбец
+SST = 1  # ячейка OOXML с общей строкой: a — индекс в sharedStrings, b — позиция ячейки (cell_position)
+INLINE = 2  # ячейка OOXML с inline-строкой: a — порядковый номер inline-ячейки листа, b — позиция ячейки
+CHART_BLOCK = 3  # текст диаграммы OOXML: a — часть диаграммы (handle), b — номер блока
+CHART_TITLE = 4  # заголовок диаграммы COM: a — диаграмма (handle)
+CHART_SERIES = 5  # имя ряда COM: a — диаграмма (handle), b — номер ряда
+CHART_AXIS = 6  # заголовок оси COM: a — диаграмма (handle), b — тип оси
+
+# Виды, у которых a — номер в handles
+HANDLE_KINDS = frozenset((CHART_BLOCK, CHART_TITLE, CHART_SERIES, CHART_AXIS))
+# Ячейки OOXML: b — позиция ячейки на листе
+POSITION_KINDS = frozenset((SST, INLINE))
+# Тексты диаграмм (обоих бэкендов)
+CHART_KINDS = frozenset((CHART_BLOCK, CHART_TITLE, CHART_SERIES, CHART_AXIS))
+
+# Столбцов на листе Excel (XFD)
+MAX_COLS = 16384
+
+def cell_position(row: int, col: int) -> int:
+    """Строка и столбец (с 1) одним числом; строк до 1 048 576, поэтому не помещается в int32"""
+
+    return row * MAX_COLS + col - 1
+
+class TargetIndex:
+    """Компактный список целей перевода листа, сгруппированных по исходному тексту.
+
+    Каждый уникальный текст хранится один раз, а цель — три числа в массивах
+    (вид, a, b) и номер текста. Объекты, на которые ссылаются цели (имена
+    частей пакета, COM-диаграммы), лежат в handles и добавляются один раз.
+    Цель занимает 17 байт вместо кортежа с кортежем-идентификатором и ссылкой на строку.
+    """
+
+    __slots__ = ("texts", "handles", "_handle_keys", "_text_ids", "_handle_ids", "_kinds", "_a", "_b", "_text_of")
+
+    def __init__(self) -> None:
+        self.texts: List[str] = []
+        self.handles: list = []
+        self._handle_keys: list = []
+        self._text_ids: Dict[str, int] = {}
+        self._handle_ids: Dict[object, int] = {}
+        self._kinds = array("b")
+        self._a = array("i")
+        self._b = array("q")
+        self._text_of = array("i")
+
+    def __len__(self) -> int:
+        return len(self._kinds)
+
+    def handle(self, obj, key=None) -> int:
+        """Номер объекта в handles; key — ключ повторного поиска (по умолчанию сам объект)"""
+
+        key = obj if key is None else key
+        handle_id = self._handle_ids.get(key)
+        if handle_id is None:
+            handle_id = len(self.handles)
+            self._handle_ids[key] = handle_id
+            self.handles.append(obj)
+            self._handle_keys.append(key)
+        return handle_id
+
+    def rebind(self, resolve) -> list:
+        """Заменяет объекты handles на resolve(key), например после переоткрытия книги"""
+
+        self.handles[:] = [resolve(key) for key in self._handle_keys]
+        return self.handles
+
+    def add(self, text: str, kind: int, a: int, b: int = 0) -> None:
+        text_id = self._text_ids.get(text)
+        if text_id is None:
+            text_id = len(self.texts)
+            self._text_ids[text] = text_id
+            self.texts.append(text)
+        self._kinds.append(kind)
+        self._a.append(a)
+        self._b.append(b)
+        self._text_of.append(text_id)
+
+    def translated(self, translations: Dict[str, str]) -> Iterator[Tuple[int, int, int, str]]:
+        """(вид, a, b, перевод) для целей, текст которых перевод изменил.
+
+        Словарь переводов опрашивается один раз на уникальный текст, затем
+        перевод раздаётся всем целям этого текста за один проход по массивам.
+        """
+
+        resolved: List[str | None] = []
+        for text in self.texts:
+            value = translations.get(text, text)
+            resolved.append(None if value == text else value)
+
+        for kind, a, b, text_id in zip(self._kinds, self._a, self._b, self._text_of):
+            value = resolved[text_id]
+            if value is not None:
+                yield kind, a, b, value
+
+    def texts_of(self, kinds) -> Set[str]:
+        """Тексты, у которых есть хотя бы одна цель из kinds"""
+
+        texts = self.texts
+        return {texts[text_id] for kind, text_id in zip(self._kinds, self._text_of) if kind in kinds}
+
+    def keyed(self) -> Iterator[Tuple[str, str]]:
+        """(ключ цели, текст); ключ не зависит от порядка сбора и совпадает между запусками.
+
+        Ячейки обоих бэкендов получают ключ по адресу ("0:строка:столбец"), а не по
+        индексу общей строки: пересохранение книги, перенумеровавшее sharedStrings,
+        не меняет ключи.
+        """
+
+        keys, texts = self._handle_keys, self.texts
+        for kind, a, b, text_id in zip(self._kinds, self._a, self._b, self._text_of):
+            if kind in POSITION_KINDS:
+                row, col = divmod(b, MAX_COLS)
+                yield f"{CELL}:{row}:{col + 1}", texts[text_id]
+            else:
+                yield f"{kind}:{keys[a] if kind in HANDLE_KINDS else a}:{b}", texts[text_id]
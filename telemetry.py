@@ -0,0 +1,128 @@
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List
+
+@dataclass(frozen=True)
+class SpanEvent:
+    """Завершённый отрезок работы: открытие книги, сбор листа, запрос к API и т. п."""
+
+    name: str
+    start_s: float
+    duration_s: float
+    thread: str
+    attrs: Dict[str, object] = field(default_factory=dict)
+
+@dataclass(frozen=True)
+class CounterEvent:
+    """Приращение счётчика (ячейки, уникальные строки, попадания в кеш...)"""
+
+    name: str
+    delta: int
+    value: int
+
+@dataclass(frozen=True)
+class ProgressEvent:
+    """Прогресс этапа для GUI: stage — collect, translate, apply или save"""
+
+    stage: str
+    done: int
+    total: int
+    sheet: str | None = None
+
+TraceEvent = SpanEvent | CounterEvent | ProgressEvent
+
+class _Span:
+    __slots__ = ("_tracer", "name", "attrs", "_started")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: dict):
+        self._tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self._started = 0.0
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, _exc, _tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self._tracer.record(self.name, self._started, **self.attrs)
+
+class Tracer:
+    """Сбор таймингов и счётчиков одной задачи перевода.
+
+    Суммарные длительности span-ов (totals) и счётчики (counters) копятся
+    всегда — это пара вызовов perf_counter и словарь. События отдельным
+    слушателям (GUI, JSONL-файл) создаются только если слушатели есть.
+    Слушатели вызываются из рабочих потоков и должны быть потокобезопасными.
+    """
+
+    def __init__(self, listeners: List[Callable[[TraceEvent], None]] | None = None):
+        self._listeners = list(listeners or [])
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self.totals: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    def _emit(self, event: TraceEvent) -> None:
+        for listener in self._listeners:
+            listener(event)
+
+    def span(self, name: str, **attrs) -> _Span:
+        """with tracer.span("apply", sheet=...) as span: ...; span.set(cells=...)"""
+
+        return _Span(self, name, attrs)
+
+    def record(self, name: str, started: float, **attrs) -> None:
+        """Регистрирует span, начатый в started (значение perf_counter) и закончившийся сейчас."""
+
+        duration = time.perf_counter() - started
+        with self._lock:
+            self.totals[name] = self.totals.get(name, 0.0) + duration
+        if self._listeners:
+            self._emit(SpanEvent(name, started - self._origin, duration, threading.current_thread().name, attrs))
+
+    def count(self, name: str, delta: int = 1) -> None:
+        if not delta:
+            return
+        with self._lock:
+            value = self.counters.get(name, 0) + delta
+            self.counters[name] = value
+        if self._listeners:
+            self._emit(CounterEvent(name, delta, value))
+
+    def progress(self, stage: str, done: int, total: int, sheet: str | None = None) -> None:
+        if self._listeners:
+            self._emit(ProgressEvent(stage, done, total, sheet))
+
+class JsonlTraceWriter:
+    """Слушатель Tracer, пишущий события построчно в JSON (для разбора после запуска)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def __call__(self, event: TraceEvent) -> None:
+        line = json.dumps({"type": type(event).__name__, **asdict(event)}, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _exc_type, _exc, _tb):
+        self.close()
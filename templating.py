@@ -0,0 +1,51 @@
+import re
+from typing import List, Tuple
+
+# Порядок важен: сначала более длинные конструкции (суммы с валютой, даты), затем голые числа
+_VALUE_RE = re.compile(
+    r"""
+    (?:[$€£¥₽]\s?[+-]?\d[\d,]*(?:\.\d+)?\s?(?:[KMB]|bn|mn|k)?\b)                 # $1.2M, € 300
+  | (?:(?<![\w.])\d[\d,]*(?:\.\d+)?\s?(?:[KMB]|bn|mn|k)?\s?(?:USD|EUR|CNY|RMB|JPY|KRW|GBP)\b)  # 1.2M USD
+  | (?:\b\d{4}-\d{2}-\d{2}\b)                                                      # 2024-03-31
+  | (?:\b\d{1,2}[./]\d{1,2}[./]\d{2,4}\b)                                          # 31.03.2024, 3/31/24
+  | (?:\b(?:Q[1-4]|H[12]|FY\d{2,4})\b)                                             # Q1, H2, FY24
+  | (?:(?<![\w.])[+-]?\d[\d,]*(?:\.\d+)?\s?%)                                     # +12.5%
+  | (?:(?<![\w.])\d[\d,]*(?:\.\d+)?(?:[KMB]|bn|mn|k)?\b)                          # 2023, 1,234, 3.4M
+    """,
+    re.VERBOSE,
+)
+_PLACEHOLDER_RE = re.compile(r"\{\{(\d+)\}\}")
+
+def extract_template(text: str) -> Tuple[str, List[str]]:
+    """Заменяет числа, даты, проценты и суммы на {{0}}, {{1}}, ... и возвращает (шаблон, значения).
+
+    Строки с фигурными скобками не шаблонизируются, чтобы не спутать их
+    содержимое с метками.
+    """
+
+    if "{{" in text or "}}" in text:
+        return text, []
+    values: List[str] = []
+
+    def repl(match: re.Match) -> str:
+        values.append(match.group(0))
+        return f"{{{{{len(values) - 1}}}}}"
+
+    return _VALUE_RE.sub(repl, text), values
+
+def fill_template(translated: str, values: List[str]) -> str | None:
+    """Подставляет значения в переведённый шаблон.
+
+    Возвращает None, если модель потеряла, размножила или придумала метку —
+    тогда строку нужно переводить целиком.
+    """
+
+    found = [int(n) for n in _PLACEHOLDER_RE.findall(translated)]
+    if sorted(found) != list(range(len(values))):
+        return None
+    return _PLACEHOLDER_RE.sub(lambda m: values[int(m.group(1))], translated)
+
+def placeholders_match(source: str, translated: str) -> bool:
+    """Перевод сохранил метки {{N}} исходной строки: каждую ровно столько же раз"""
+
+    return sorted(_PLACEHOLDER_RE.findall(source)) == sorted(_PLACEHOLDER_RE.findall(translated))
@@ -0,0 +1,38 @@
+import sqlite3
+from batch_jobs import BatchJobState, LocalBatchClient, batch_state_path
+from bench_pipeline import generate_workbook
+from core import run_excel_translation
+from mock_llm_server import MockLLMServer, mock_translate
+
+
+def _run(book, tmp_path, server, model):
+    return run_excel_translation(
+        str(book),
+        "sk-test",
+        backend="ooxml",
+        memory_path=str(tmp_path / "memory.sqlite"),
+        translator_options={"base_url": server.base_url, "model": model},
+        batch=True,
+        batch_client=LocalBatchClient(str(tmp_path / "batches"), mock_translate),
+    )
+
+
+def test_batch_translations_stored_under_submitted_namespace(tmp_path):
+    book = tmp_path / "book.xlsx"
+    generate_workbook(str(book), sheets=1, rows=20, charts=0)
+
+    with MockLLMServer() as server:
+        submitted = _run(book, tmp_path, server, "gpt-old")
+        assert submitted.batch_status == "submitted"
+        state = BatchJobState.load(batch_state_path(str(book)))
+        batch_strings = {text for chunk in state.chunks.values() for text in chunk}
+
+        # Пакет забирает Translator с другой моделью: переводы идут в книгу, но в память — под namespace пакета
+        done = _run(book, tmp_path, server, "gpt-new")
+
+    assert done.output_file
+    with sqlite3.connect(tmp_path / "memory.sqlite") as conn:
+        rows = conn.execute("SELECT ns, source FROM tm").fetchall()
+    stored = {source for ns, source in rows if ns == state.namespace}
+    assert stored == batch_strings
+    assert not {source for ns, source in rows if ns != state.namespace} & batch_strings
@@ -0,0 +1,45 @@
+import threading
+import time
+from concurrent.futures import CancelledError
+from bench_cancel import SHORT_ROLE, _wait_in_flight, cancel_job, cancel_translator
+from mock_llm_server import MockLLMServer
+from translator import Translator
+
+# Заглушка отвечает заметно дольше бюджета: уложиться в него можно, только прервав запросы в полёте
+LATENCY_S = 5.0
+IN_FLIGHT = 4
+BUDGET_S = 1.0
+
+
+def test_cancel_event_stops_translator_in_flight():
+    with MockLLMServer(latency_s=LATENCY_S) as server:
+        result = cancel_translator(server, IN_FLIGHT)
+
+    assert result["in_flight"] == IN_FLIGHT
+    assert result["future_s"] < BUDGET_S
+    assert result["close_s"] < BUDGET_S
+
+
+def test_close_without_cancel_event_aborts_requests():
+    with MockLLMServer(latency_s=LATENCY_S) as server:
+        translator = Translator("sk-test", base_url=server.base_url, max_in_flight=IN_FLIGHT, batch_size=1, system_role=SHORT_ROLE)
+        future = translator.submit_texts(["Slow string " + "x" * i for i in range(1, IN_FLIGHT * 2 + 1)])
+        assert _wait_in_flight(server, IN_FLIGHT) == IN_FLIGHT
+
+        started = time.perf_counter()
+        closer = threading.Thread(target=translator.close)
+        closer.start()
+        closer.join(BUDGET_S * 5)
+        elapsed = time.perf_counter() - started
+
+    assert not closer.is_alive()
+    assert elapsed < BUDGET_S
+    assert isinstance(future.exception(timeout=0), CancelledError)
+
+
+def test_cancel_event_stops_workbook_job(tmp_path):
+    with MockLLMServer(latency_s=LATENCY_S) as server:
+        result = cancel_job(server, IN_FLIGHT, str(tmp_path))
+
+    assert result["status"] == "cancelled"
+    assert result["job_s"] < BUDGET_S
@@ -0,0 +1,189 @@
+from collections import Counter
+from com_cells import XL_NO_CELLS_FOUND, ComCellAccess, cell_address, parse_address, rectangles
+
+
+class FakeComError(Exception):
+    """Как pywintypes.com_error: DISP_E_EXCEPTION, настоящий код Excel — в excepinfo[5]"""
+
+    def __init__(self, scode: int):
+        super().__init__("COM error")
+        self.hresult = -2147352567
+        self.excepinfo = (0, "Microsoft Excel", "No cells were found.", None, 0, scode)
+
+
+class FakeFont:
+    def __init__(self, rng):
+        self._range = rng
+
+    @property
+    def Name(self):
+        raise AttributeError("чтение Font.Name не используется")
+
+    @Name.setter
+    def Name(self, value):
+        self._range.sheet.calls["Font.Name"] += 1
+        for cell in self._range.cells():
+            self._range.sheet.fonts[cell] = value
+
+
+class FakeAreas:
+    def __init__(self, sheet, addresses):
+        self.sheet = sheet
+        self.addresses = addresses
+
+    @property
+    def Count(self):
+        return len(self.addresses)
+
+    def __call__(self, i):
+        return FakeRange(self.sheet, self.addresses[i - 1])
+
+
+class FakeRange:
+    """Range(address): каждое обращение к Value/Formula/Font — один вызов COM, он считается в sheet.calls"""
+
+    def __init__(self, sheet, address):
+        self.sheet = sheet
+        self.Address = address
+
+    def _bounds(self):
+        return parse_address(self.Address)
+
+    def cells(self):
+        for part in self.Address.split(","):
+            row0, col0, row1, col1 = parse_address(part)
+            for row in range(row0, row1 + 1):
+                for col in range(col0, col1 + 1):
+                    yield row, col
+
+    def _read(self, source, kind):
+        self.sheet.calls[f"{kind}.get"] += 1
+        row0, col0, row1, col1 = self._bounds()
+        rows = tuple(tuple(source(r, c) for c in range(col0, col1 + 1)) for r in range(row0, row1 + 1))
+        return rows[0][0] if (row0, col0) == (row1, col1) else rows
+
+    @property
+    def Value(self):
+        return self._read(lambda r, c: self.sheet.values.get((r, c)), "Value")
+
+    @Value.setter
+    def Value(self, value):
+        self.sheet.calls["Value.set"] += 1
+        row0, col0, row1, col1 = self._bounds()
+        rows = value if isinstance(value, tuple) else ((value,),)
+        assert len(rows) == row1 - row0 + 1 and all(len(row) == col1 - col0 + 1 for row in rows)
+        for r, row in enumerate(rows):
+            for c, item in enumerate(row):
+                self.sheet.values[(row0 + r, col0 + c)] = item
+
+    @property
+    def Formula(self):
+        return self._read(lambda r, c: self.sheet.formulas.get((r, c), self.sheet.values.get((r, c)) or ""), "Formula")
+
+    @property
+    def Font(self):
+        return FakeFont(self)
+
+    def SpecialCells(self, _cell_type, _value_type):
+        self.sheet.calls["SpecialCells"] += 1
+        if self.sheet.special_cells_error is not None:
+            raise self.sheet.special_cells_error
+        texts = sorted(
+            cell for cell, value in self.sheet.values.items() if isinstance(value, str) and cell not in self.sheet.formulas
+        )
+        if not texts:
+            raise FakeComError(XL_NO_CELLS_FOUND - 2**32)
+        # Область — горизонтальный отрезок текстовых ячеек
+        areas = []
+        for row, col in texts:
+            if areas and areas[-1][0] == row and areas[-1][2] == col - 1:
+                areas[-1][2] = col
+            else:
+                areas.append([row, col, col])
+        return FakeRange(self.sheet, ",".join(cell_address(r, c1, r, c2) for r, c1, c2 in areas))
+
+    @property
+    def Areas(self):
+        return FakeAreas(self.sheet, self.Address.split(","))
+
+
+class FakeSheet:
+    def __init__(self, values, formulas=None, used_range="A1:D10", special_cells_error=None):
+        self.values = dict(values)
+        self.special_cells_error = special_cells_error
+        self.formulas = dict(formulas or {})
+        self.fonts = {}
+        self.calls = Counter()
+        self._used_range = used_range
+
+    @property
+    def UsedRange(self):
+        return FakeRange(self, self._used_range)
+
+    def Range(self, address):
+        return FakeRange(self, address)
+
+
+def test_rectangles_do_not_bridge_skipped_rows():
+    assert rectangles({(1, 1): "a", (3, 1): "c"}) == [(1, 1, [["a"]]), (3, 1, [["c"]])]
+    assert rectangles({(1, 1): "a", (2, 1): "b", (1, 2): "x", (2, 2): "y"}) == [(1, 1, [["a", "x"], ["b", "y"]])]
+
+
+def test_write_texts_keeps_cells_between_rows():
+    sheet = FakeSheet({(1, 1): "Hello", (2, 1): 123, (3, 1): "World", (3, 2): "Again"})
+    ComCellAccess(sheet).write_texts({(1, 1): "你好", (3, 1): "世界", (3, 2): "再次"}, "Microsoft YaHei")
+
+    assert sheet.values == {(1, 1): "你好", (2, 1): 123, (3, 1): "世界", (3, 2): "再次"}
+    # Строки 1 и 3 не склеиваются через строку 2: два массива и одно объединение для шрифта
+    assert sheet.calls["Value.set"] == 2
+    assert sheet.calls["Font.Name"] == 1
+    assert set(sheet.fonts) == {(1, 1), (3, 1), (3, 2)}
+
+
+def test_write_texts_block_in_one_call():
+    cells = {(r, c): f"t{r}{c}" for r in range(1, 51) for c in range(1, 5)}
+    sheet = FakeSheet({})
+    ComCellAccess(sheet).write_texts(cells, "Microsoft YaHei")
+
+    assert sheet.values == cells
+    assert sheet.calls["Value.set"] == 1
+    assert sheet.calls["Font.Name"] == 1
+
+
+def test_read_texts_reads_only_text_areas():
+    sheet = FakeSheet(
+        {(1, 1): "Revenue", (1, 2): "Players", (2, 1): 10, (2, 2): "=A2*2", (5, 3): "Total", (6, 1): "Sum"},
+        formulas={(2, 2): "=A2*2", (6, 1): "=CONCAT(B1)"},
+        used_range="A1:Z5000",
+    )
+    targets = ComCellAccess(sheet).read_texts()
+
+    assert sorted(zip(targets.texts, targets._a, targets._b)) == [("Players", 1, 2), ("Revenue", 1, 1), ("Total", 5, 3)]
+    # Две области — два чтения Value, без обхода UsedRange и без чтения Formula
+    assert sheet.calls["SpecialCells"] == 1
+    assert sheet.calls["Value.get"] == 2
+    assert sheet.calls["Formula.get"] == 0
+
+
+def test_read_texts_without_text_constants_skips_used_range():
+    sheet = FakeSheet({(1, 1): 1, (2, 2): 2.5}, used_range="A1:Z100000")
+    targets = ComCellAccess(sheet).read_texts()
+
+    assert len(targets) == 0
+    assert sheet.calls["Value.get"] == 0
+    assert sheet.calls["Formula.get"] == 0
+
+
+def test_read_texts_falls_back_to_blocks_on_other_errors():
+    sheet = FakeSheet(
+        {(1, 1): "Revenue", (2, 1): "=B1", (3, 2): "Players"},
+        formulas={(2, 1): "=B1"},
+        used_range="A1:B3",
+        special_cells_error=FakeComError(0x800A0000 - 2**32),
+    )
+    targets = ComCellAccess(sheet).read_texts()
+
+    assert sorted(targets.texts) == ["Players", "Revenue"]
+    # Один блок UsedRange: одно чтение Value и одно Formula
+    assert sheet.calls["Value.get"] == 1
+    assert sheet.calls["Formula.get"] == 1
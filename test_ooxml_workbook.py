@@ -0,0 +1,47 @@
+import re
+import zipfile
+from xml.sax.saxutils import escape
+from bench_pipeline import generate_workbook
+from manifest import SheetDigest
+from ooxml_workbook import OoxmlWorkbook
+
+_SI_RE = re.compile(r"<si><t>(.*?)</t></si>")
+_SST_CELL_RE = re.compile(r'(t="s"><v>)(\d+)(</v>)')
+
+
+def _renumber_shared_strings(src: str, dst: str) -> None:
+    """Копия книги с sharedStrings в обратном порядке — как после пересохранения в Excel"""
+
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dst, "w", zipfile.ZIP_DEFLATED) as zout:
+        sst = zin.read("xl/sharedStrings.xml").decode("utf-8")
+        count = len(_SI_RE.findall(sst))
+        for info in zin.infolist():
+            data = zin.read(info).decode("utf-8") if info.filename.endswith(".xml") else zin.read(info)
+            if info.filename == "xl/sharedStrings.xml":
+                items = "".join(f"<si><t>{escape(text)}</t></si>" for text in reversed(_SI_RE.findall(data)))
+                data = data[: data.index("<si>")] + items + "</sst>"
+            elif info.filename.startswith("xl/worksheets/sheet"):
+                data = _SST_CELL_RE.sub(lambda m: f"{m.group(1)}{count - 1 - int(m.group(2))}{m.group(3)}", data)
+            zout.writestr(info, data)
+
+
+def _digests(path: str) -> list[SheetDigest]:
+    with OoxmlWorkbook(path) as book:
+        return [SheetDigest.of(book.collect_sheet(i)) for i in range(len(book.sheet_names()))]
+
+
+def test_digest_keys_cells_by_address(tmp_path):
+    book = str(tmp_path / "book.xlsx")
+    generate_workbook(book, sheets=1, rows=3, cols=2, text_share=1.0, charts=0)
+
+    (digest,) = _digests(book)
+    assert set(digest.cells) == {f"0:{row}:{col}" for row in range(1, 4) for col in range(1, 3)}
+
+
+def test_digest_survives_shared_strings_renumbering(tmp_path):
+    book = str(tmp_path / "book.xlsx")
+    renumbered = str(tmp_path / "renumbered.xlsx")
+    generate_workbook(book, sheets=2, rows=30, cols=4, charts=1)
+    _renumber_shared_strings(book, renumbered)
+
+    assert _digests(renumbered) == _digests(book)
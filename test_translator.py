@@ -0,0 +1,43 @@
+from mock_llm_server import MockLLMServer, mock_translate
+from translation_memory import TranslationMemory
+from translator import Translator
+
+
+def _translate(server, texts, memory=None):
+    translator = Translator("sk-test", base_url=server.base_url, memory=memory)
+    try:
+        return translator, translator.translate_texts(texts)
+    finally:
+        translator.close()
+
+
+def test_single_string_is_not_templated():
+    with MockLLMServer() as server:
+        translator, result = _translate(server, ["Revenue in 2024"])
+
+    assert result == {"Revenue in 2024": mock_translate("Revenue in 2024")}
+    assert translator.template_stats.strings == 0
+    assert translator.template_stats.tokens_saved == 0
+
+
+def test_shared_template_is_sent_once():
+    texts = ["Revenue in 2024", "Revenue in 2025", "Revenue in 2026"]
+    with MockLLMServer() as server:
+        translator, result = _translate(server, texts)
+
+    assert result == {text: "译Revenue in " + text[-4:] for text in texts}
+    stats = translator.template_stats
+    assert (stats.strings, stats.templates_sent) == (3, 1)
+    assert stats.tokens_saved > 0
+
+
+def test_single_string_uses_template_from_memory(tmp_path):
+    with TranslationMemory(str(tmp_path / "memory.sqlite")) as memory:
+        with MockLLMServer() as server:
+            _translate(server, ["Players: 10", "Players: 20"], memory)
+            translator, result = _translate(server, ["Players: 30"], memory)
+
+    assert result == {"Players: 30": "译Players: 30"}
+    stats = translator.template_stats
+    assert (stats.strings, stats.templates_sent) == (1, 0)
+    assert translator.api_requests == 0
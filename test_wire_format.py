@@ -0,0 +1,22 @@
+from wire_format import WIRE_FORMATS, format_lines, parse_lines
+
+
+def test_continuation_starting_with_number_stays_with_its_item():
+    assert parse_lines("0\t第一行\n2024 年收入增长\n1\t玩家", 2) == {0: "第一行\n2024 年收入增长", 1: "玩家"}
+    assert parse_lines("0\t第一行\n1 百万玩家\n1\t玩家", 2) == {0: "第一行\n1 百万玩家", 1: "玩家"}
+
+
+def test_out_of_order_and_out_of_range_ids_are_continuation():
+    content = "0\tA\n1\tB\n0\tC\n7\tD\n2: E"
+    assert parse_lines(content, 3) == {0: "A", 1: "B\n0\tC\n7\tD", 2: "E"}
+
+
+def test_fences_and_missing_items():
+    assert parse_lines("```\n0\tA\n2\tC\n```", 3) == {0: "A", 2: "C"}
+
+
+def test_lines_round_trip_with_escapes():
+    batch = {"id_0": "Revenue\nby region", "id_1": "C:\\Reports\\Q3", "id_2": "Top 10\tgames"}
+    wire = WIRE_FORMATS["lines"]
+    assert wire.decode(wire.encode(batch), list(batch)) == batch
+    assert format_lines([(0, "a\nb")]) == "0\ta\\nb"
@@ -0,0 +1,140 @@
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterable
+
+# SQLite до 3.32 ограничивает число параметров запроса 999
+_SQL_CHUNK = 500
+
+def default_memory_path() -> str:
+    """Путь к общей базе памяти переводов в пользовательском каталоге кеша."""
+
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "AI_Tools", "Excel-Translator", "translation_memory.sqlite")
+
+def memory_namespace(model: str, system_role: str) -> str:
+    """Отпечаток модели и системного промпта: переводы с другим промптом не смешиваются."""
+
+    digest = hashlib.sha256(f"{model}\0{system_role}".encode("utf-8")).hexdigest()
+    return digest[:16]
+
+class TranslationMemory:
+    """Постоянная память переводов на SQLite (WAL), общая для всех запусков.
+
+    Ключ — (отпечаток модели и промпта, исходный текст). Поиск и запись идут
+    пачками; при превышении max_entries вытесняются давно не использованные
+    записи. WAL и busy_timeout позволяют нескольким задачам на одной машине
+    работать с базой одновременно.
+    """
+
+    def __init__(self, path: str | None = None, max_entries: int = 500_000):
+        self.path = path or default_memory_path()
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._since_evict = 0
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tm ("
+                " ns TEXT NOT NULL,"
+                " source TEXT NOT NULL,"
+                " target TEXT NOT NULL,"
+                " used_at REAL NOT NULL,"
+                " PRIMARY KEY (ns, source)"
+                ") WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS tm_used_at ON tm (used_at)")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _exc_type, _exc, _tb):
+        self.close()
+
+    def lookup(self, namespace: str, texts: Iterable[str]) -> Dict[str, str]:
+        """Возвращает {оригинал: перевод} для найденных строк и обновляет их время использования."""
+
+        texts = list(texts)
+        found: Dict[str, str] = {}
+        if not texts:
+            return found
+
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(texts), _SQL_CHUNK):
+                chunk = texts[i : i + _SQL_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT source, target FROM tm WHERE ns = ? AND source IN ({placeholders})",
+                    [namespace, *chunk],
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE tm SET used_at = ? WHERE ns = ? AND source = ?",
+                        [(now, namespace, source) for source in found],
+                    )
+
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        return found
+
+    def store(self, namespace: str, translations: Dict[str, str]) -> None:
+        """Сохраняет пачку переводов; при переполнении вытесняет старые записи."""
+
+        rows = [(namespace, src, dst, time.time()) for src, dst in translations.items() if isinstance(dst, str)]
+        if not rows:
+            return
+
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO tm (ns, source, target, used_at) VALUES (?, ?, ?, ?)", rows)
+            self.stored += len(rows)
+            self._since_evict += len(rows)
+            if self._since_evict >= 1000:
+                self._since_evict = 0
+                self._evict()
+
+    def _evict(self) -> None:
+        count = self._conn.execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM tm WHERE (ns, source) IN (SELECT ns, source FROM tm ORDER BY used_at LIMIT ?)",
+                (excess,),
+            )
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        return f"Память переводов: {self.hits}/{total} ({self.hit_rate:.0%})"
@@ -1,84 +1,369 @@
 import json
 import threading
-from concurrent.futures import CancelledError
-from dataclasses import dataclass
-from typing import Dict, Iterable, List, Set
-from openai import OpenAI
-
-SYSTEM_ROLE_ESSENCE = (
-    "## Role\n"
-    "You are an expert Game Localization (L10N) Specialist and professional mobile game localizer. "
-    "Your goal is to translate English mobile gaming market reports and game text into Simplified Chinese, "
-    "ensuring the output is natural and uses industry-standard jargon used by developers and publishers.\n\n"
-
-    "## Terminology & Style Guidelines\n"
-    "- Do Not Translate Game Titles: Keep all game names/titles in their original English form.\n"
-    "- Avoid Literalism: Do not translate word-for-word. Focus on industry 'jargon.'\n"
-    "- Spending/Monetization:\n"
-    "  * 'Non-paying players' -> 非付费玩家 / 零氪玩家\n"
-    "  * 'Spending real money' -> 付费 / 氪金\n"
-    "- Events & Scheduling:\n"
-    "  * 'Global schedule' -> 全服统一日程 / 固定档期\n"
-    "  * 'Progress in events' -> 推进活动进度\n"
-    "- Tone: Professional, concise, and analytical. Use 'Game-speak.'\n\n"
-
-    "## STRICT RULES (L10N)\n"
-    "1. DO NOT translate game titles, bundle names, or offer names. Keep them in English."
-    "2. Translate all other values (descriptions, analysis, labels) into Simplified Chinese using the guidelines above."
-)
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Set, Tuple
+from openai import APIConnectionError, APIStatusError
+from batch_packer import PackStats, item_tokens, output_budget, pack_batches
+from languages import DEFAULT_LANGUAGE, LANGUAGES, TargetLanguage
+from openai_client import CANCEL_POLL_S, run_async, shared_async_client
+from protected_terms import TermMatcher
+from rate_limit import RateLimiter, backoff_delay, estimate_tokens, parse_retry_after
+from routing import PRIMARY, Route, classify
+from telemetry import Tracer
+from templating import extract_template, fill_template, placeholders_match
+from translation_memory import TranslationMemory, memory_namespace
+from utils import CancelSignal, should_translate_text
+from wire_format import WireFormat, get_wire_format, parse_json_object
+
+def system_role_essence(language: TargetLanguage) -> str:
+    """Часть промпта о роли и стиле для языка перевода (жаргон-примеры — из TargetLanguage)"""
+
+    return (
+        "## Role\n"
+        "You are an expert Game Localization (L10N) Specialist and professional mobile game localizer. "
+        f"Your goal is to translate English mobile gaming market reports and game text into {language.name}, "
+        "ensuring the output is natural and uses industry-standard jargon used by developers and publishers.\n\n"
+
+        "## Terminology & Style Guidelines\n"
+        "- Do Not Translate Game Titles: Keep all game names/titles in their original English form.\n"
+        "- Avoid Literalism: Do not translate word-for-word. Focus on industry 'jargon.'\n"
+        f"{language.jargon}"
+        "- Tone: Professional, concise, and analytical. Use 'Game-speak.'\n\n"
+
+        "## STRICT RULES (L10N)\n"
+        "1. DO NOT translate game titles, bundle names, or offer names. Keep them in English."
+        f"2. Translate all other values (descriptions, analysis, labels) into {language.name} using the guidelines above."
+    )
+
+SYSTEM_ROLE_ESSENCE = system_role_essence(LANGUAGES[DEFAULT_LANGUAGE])
 
 SYSTEM_ROLE_TECHNICAL = (
     "\n\n## STRICT RULES (TECHNICAL)\n"
     "3. Keep JSON keys unchanged."
     "4. Return ONLY a valid JSON object without any markdown formatting or extra text outside the JSON."
+    "5. Keep placeholders like {{0}} or {{1}} exactly as they are; they stand for numbers, dates and amounts."
 )
 
 SYSTEM_ROLE = SYSTEM_ROLE_ESSENCE + SYSTEM_ROLE_TECHNICAL
 
+def system_role_for(language: TargetLanguage) -> str:
+    return system_role_essence(language) + SYSTEM_ROLE_TECHNICAL
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# С какой длины провайдер кеширует префикс промпта
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+# Ключ, доступ или модель: повтор или дробление пачки не поможет
+FATAL_STATUS = {401, 403, 404}
+
+def _strip_placeholders(template: str) -> str:
+    return template.replace("{{", " ").replace("}}", " ")
+
+def _then(future: Future, fn) -> Future:
+    """Future с результатом fn(результат future). Если fn вернула Future, ждёт и его."""
+
+    out: Future = Future()
+
+    def relay(f: Future) -> None:
+        if f.cancelled():
+            out.set_exception(CancelledError())
+        elif f.exception() is not None:
+            out.set_exception(f.exception())
+        else:
+            out.set_result(f.result())
+
+    def on_done(f: Future) -> None:
+        if f.cancelled() or f.exception() is not None:
+            relay(f)
+            return
+        try:
+            value = fn(f.result())
+        except BaseException as e:
+            out.set_exception(e)
+            return
+        if isinstance(value, Future):
+            value.add_done_callback(relay)
+        else:
+            out.set_result(value)
+
+    future.add_done_callback(on_done)
+    return out
+
+def _cached_tokens(usage) -> int:
+    details = getattr(usage, "prompt_tokens_details", None)
+    return (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+
+class TranslationError(RuntimeError):
+    """Ошибка запроса перевода. fatal=True — ошибка не зависит от содержимого пачки"""
+
+    def __init__(self, message: str, fatal: bool = False) -> None:
+        super().__init__(message)
+        self.fatal = fatal
+
 @dataclass
 class UsageTotals:
     prompt_tokens: int = 0
     completion_tokens: int = 0
+    # Часть prompt_tokens, взятая провайдером из кеша префикса (дешевле обычного входа)
+    cached_tokens: int = 0
 
     @property
     def total_tokens(self) -> int:
         return self.prompt_tokens + self.completion_tokens
 
+    @property
+    def cache_hit_rate(self) -> float:
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+def wire_system_role(system_role: str, wire: WireFormat) -> str:
+    """Роль с правилами ответа формата wire вместо JSON-правил (для json-форматов — без изменений)"""
+
+    if wire.technical is None:
+        return system_role
+    return system_role.removesuffix(SYSTEM_ROLE_TECHNICAL) + wire.technical
+
+def build_system_prompt(system_role: str, glossary: Dict[str, str] | None = None) -> str:
+    """Неизменный префикс каждого запроса: роль и глоссарий.
+
+    Глоссарий сортируется, чтобы префикс был побайтно одинаковым от запуска к
+    запуску — тогда провайдер берёт его из кеша промптов (от ~1024 токенов).
+    """
+
+    if not glossary:
+        return system_role
+    lines = "\n".join(
+        f"- {json.dumps(src, ensure_ascii=False)} -> {json.dumps(dst, ensure_ascii=False)}" for src, dst in sorted(glossary.items())
+    )
+    return f"{system_role}\n\n## Glossary (use these translations exactly)\n{lines}"
+
+@dataclass
+class TemplateStats:
+    strings: int = 0
+    templates_sent: int = 0
+    fallbacks: int = 0
+    tokens_saved: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Доля шаблонизированных строк, не потребовавших отдельного перевода"""
+
+        return 1 - self.templates_sent / self.strings if self.strings else 0.0
+
+@dataclass
+class RouteStats:
+    """Что прошло через маршрут (см. routing): строки, запросы, токены и суммарная задержка ответов"""
+
+    model: str
+    strings: int = 0
+    requests: int = 0
+    latency_s: float = 0.0
+    # Строки, переведённые основной моделью после неудачной проверки ответа маршрута
+    fallbacks: int = 0
+    usage: UsageTotals = field(default_factory=UsageTotals)
+
+    @property
+    def avg_latency_s(self) -> float:
+        return self.latency_s / self.requests if self.requests else 0.0
+
 class Translator:
-    """Переводчик на базе OpenAI с батчингом и кешированием"""
+    """Переводчик на базе OpenAI с батчингом и кешированием.
+
+    Строки раскладываются по пачкам в пределах бюджета токенов (не больше
+    batch_size строк в пачке). Пачки отправляются параллельно (не больше max_in_flight запросов
+    одновременно) с ограничением RPM/TPM и повтором при 429/сетевых ошибках.
+    Ответ сверяется с запрошенными id: недостающие и испорченные строки
+    запрашиваются повторно, а сбойная пачка делится пополам, пока не найдутся
+    проблемные строки. Они попадают в failures и остаются без перевода.
+    Если передана memory, строки сначала ищутся в постоянной памяти переводов,
+    а новые переводы сохраняются в неё после каждой пачки.
+    routes задаёт для классов строк (короткие подписи, имена листов, тексты
+    диаграмм, длинный текст — см. routing) свою модель, размер пачки и таймаут.
+    wire_format выбирает кодировку пачек (см. wire_format): "json" с ключами
+    id_N, "numeric" с ключами-числами или "lines" — строка «номер TAB текст».
+    """
 
     def __init__(
         self,
         api_key: str,
         model: str = "gpt-5.2",
-        batch_size: int = 30,
+        batch_size: int = 100,
         timeout_s: int = 30,
         price_in_per_1m: float = 1.75,
         price_out_per_1m: float = 14.00,
+        price_cached_in_per_1m: float = 0.175,
+        batch_price_factor: float = 0.5,
         system_role: str = SYSTEM_ROLE,
         cancel_event: threading.Event | None = None,
+        max_in_flight: int = 4,
+        rpm: int | None = None,
+        tpm: int | None = None,
+        max_retries: int = 5,
+        base_url: str | None = None,
+        rate_limiter: RateLimiter | None = None,
+        memory: TranslationMemory | None = None,
+        max_batch_input_tokens: int | None = None,
+        max_batch_output_tokens: int | None = None,
+        max_repair_rounds: int = 2,
+        tracer: Tracer | None = None,
+        glossary: Dict[str, str] | None = None,
+        terms: TermMatcher | None = None,
+        templates: bool = True,
+        routes: Dict[str, Route] | None = None,
+        wire_format: str = "json",
     ) -> None:
         self.api_key = api_key
-        self.client = OpenAI(api_key=self.api_key)
+        self.base_url = base_url
+        # Асинхронный клиент: запрос в полёте прерывается при отмене, а не ждёт timeout_s
+        self.client = shared_async_client(self.api_key, base_url)
         self.model = model
         self.batch_size = batch_size
+        # None — бюджет пачки выводится из таймаута и предела ответа модели маршрута (см. batch_packer.output_budget)
+        self.max_batch_input_tokens = max_batch_input_tokens
+        self.max_batch_output_tokens = max_batch_output_tokens
         self.timeout_s = timeout_s
         self.system_role = system_role
+        self.terms = terms
+        if glossary is None and terms is not None:
+            glossary = terms.glossary
+        self.system_prompt = build_system_prompt(system_role, glossary)
+        # Промпт запросов; память, манифест и Batch API используют JSON-вариант (system_prompt),
+        # чтобы переводы не зависели от формата пачек
+        self.wire = get_wire_format(wire_format)
+        self.wire_prompt = build_system_prompt(wire_system_role(system_role, self.wire), glossary)
 
         self.cancel_event = cancel_event
+        # close() прерывает запросы в полёте, даже если внешнего события отмены нет
+        self._closing = threading.Event()
+        self._cancel = CancelSignal(cancel_event, self._closing)
+
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+        self.max_repair_rounds = max_repair_rounds
+        self.rate_limiter = rate_limiter or RateLimiter(rpm, tpm)
+        self._lock = threading.RLock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending: Dict[str, Future] = {}
+        self.batches_total = 0
+        self.batches_done = 0
+        # Вызовы chat.completions: каждая попытка, включая повторы, досылку недостающих строк и деление пачек
+        self.api_requests = 0
+        self.failures: Dict[str, str] = {}
 
         self.price_in_per_1m = price_in_per_1m
         self.price_out_per_1m = price_out_per_1m
+        self.price_cached_in_per_1m = price_cached_in_per_1m
         self.usage = UsageTotals()
+        # Токены отложенных пакетов Batch API (см. batch_jobs) оплачиваются со скидкой
+        self.batch_price_factor = batch_price_factor
+        self.batch_usage = UsageTotals()
+        self.pack_stats = PackStats()
 
         self.cache: Dict[str, str] = {}
+        # Строки, решённые TermMatcher без запроса, и оценка сэкономленных токенов (вход + выход)
+        self.local_strings = 0
+        self.local_tokens_saved = 0
+        # Строки из памяти переводов этого Translator (счётчики самой памяти общие для всех)
+        self.memory_hits = 0
+
+        # Строки с числами переводятся через общий шаблон: "Revenue in {{0}}: {{1}}"
+        self.templates = templates
+        self.template_stats = TemplateStats()
+
+        self.memory = memory
+        self.memory_namespace = memory_namespace(model, self.system_prompt)
+
+        # Основная модель — маршрут PRIMARY, по нему идут классы строк без своего маршрута
+        primary = Route(model, batch_size, timeout_s, price_in_per_1m, price_out_per_1m, price_cached_in_per_1m, fallback=False)
+        self.routes: Dict[str, Route] = {PRIMARY: primary}
+        for name, route in (routes or {}).items():
+            self.routes[name] = route.resolve(primary)
+        # У маршрута с другой моделью свой namespace памяти и ключ кеша промпта
+        self._route_namespaces = {name: memory_namespace(route.model, self.system_prompt) for name, route in self.routes.items()}
+        self.route_stats = {name: RouteStats(route.model) for name, route in self.routes.items()}
+        # Длинный префикс попадает в кеш только после первого ответа: пока он не
+        # получен, остальные запросы ждут, иначе первая параллельная волна заплатит полную цену
+        self._prefix_warm = threading.Event()
+        self._prefix_warming = False
+        if estimate_tokens(self.wire_prompt) < PROMPT_CACHE_MIN_TOKENS:
+            self._prefix_warm.set()
+        self.tracer = tracer or Tracer()
 
     def _check_cancel(self) -> None:
-        if self.cancel_event is not None and self.cancel_event.is_set():
+        if self._cancel.is_set():
             raise CancelledError()
 
-    def translate_batch(self, batch_dict: Dict[str, str]) -> Dict[str, str]:
-        """Отправляет пачку {id: text} на перевод в OpenAI.
+    def _sleep(self, seconds: float) -> None:
+        self._cancel.wait(seconds)
+        self._check_cancel()
+
+    def _create_completion(self, messages: List[Dict[str, str]], span=None, route_name: str = PRIMARY):
+        """chat.completions.create с учётом RPM/TPM и повторами при 429/5xx/сетевых ошибках.
+
+        Число повторов и время ожидания лимита записываются в span, если он передан.
+        """
+
+        # Ответ по объёму примерно равен пользовательскому сообщению
+        estimated = sum(estimate_tokens(m["content"]) for m in messages) + estimate_tokens(messages[-1]["content"])
+
+        with self._lock:
+            warming = not self._prefix_warm.is_set() and not self._prefix_warming
+            if warming:
+                self._prefix_warming = True
+        if not warming:
+            while not self._prefix_warm.wait(CANCEL_POLL_S):
+                self._check_cancel()
+
+        try:
+            return self._create_completion_with_retries(messages, estimated, span, route_name)
+        finally:
+            if warming:
+                self._prefix_warm.set()
+
+    def _create_completion_with_retries(self, messages: List[Dict[str, str]], estimated: int, span, route_name: str):
+        route = self.routes[route_name]
+        attempt = 0
+        throttled = 0.0
+        while True:
+            self._check_cancel()
+            started = time.perf_counter()
+            self.rate_limiter.acquire(estimated, self._cancel)
+            throttled += time.perf_counter() - started
+            if span is not None:
+                span.set(retries=attempt, throttled_s=round(throttled, 4))
+            with self._lock:
+                self.api_requests += 1
+            try:
+                return run_async(
+                    self.client.chat.completions.create(
+                        model=route.model,
+                        messages=messages,
+                        response_format=self.wire.response_format,
+                        timeout=route.timeout_s,
+                        # Подсказка маршрутизации кеша: запросы с одинаковым префиксом идут на один узел
+                        extra_body={"prompt_cache_key": self._route_namespaces[route_name]},
+                    ),
+                    self._cancel.is_set,
+                )
+            except (APIConnectionError, APIStatusError) as e:
+                status = getattr(e, "status_code", None)
+                if (status is not None and status not in RETRYABLE_STATUS) or attempt >= self.max_retries:
+                    raise
+
+                response = getattr(e, "response", None)
+                delay = parse_retry_after(getattr(response, "headers", None))
+                if delay is None:
+                    delay = backoff_delay(attempt)
+                elif status == 429:
+                    self.rate_limiter.pause(delay)
+
+                attempt += 1
+                self.tracer.count("api.retries")
+                self._sleep(delay)
+
+    def translate_batch(self, batch_dict: Dict[str, str], route_name: str = PRIMARY) -> Dict[str, str]:
+        """Отправляет пачку {id: text} на перевод в OpenAI (модель и таймаут — из маршрута).
            Возвращает словарь с теми же ключами и переведёнными значениями
         """
         if not batch_dict:
@@ -87,71 +372,474 @@ class Translator:
         self._check_cancel()
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_role},
-                    {"role": "user", "content": json.dumps(batch_dict, ensure_ascii=False)},
-                ],
-                response_format={"type": "json_object"},
-                timeout=self.timeout_s,
-            )
+            stats = self.route_stats[route_name]
+            with self.tracer.span("api.batch", items=len(batch_dict), route=route_name, model=stats.model) as span:
+                started = time.perf_counter()
+                response = self._create_completion(self._wire_messages(batch_dict), span, route_name)
+                latency = time.perf_counter() - started
+                usage = getattr(response, "usage", None)
+                cached = _cached_tokens(usage)
+                if usage is not None:
+                    span.set(tokens_in=usage.prompt_tokens, tokens_out=usage.completion_tokens, tokens_cached=cached)
+            self.tracer.count("api.requests")
 
             self._check_cancel()
 
-            usage = getattr(response, "usage", None)
-            if usage is not None:
-                self.usage.prompt_tokens += usage.prompt_tokens
-                self.usage.completion_tokens += usage.completion_tokens
+            with self._lock:
+                stats.requests += 1
+                stats.latency_s += latency
+                if usage is not None:
+                    for totals in (self.usage, stats.usage):
+                        totals.prompt_tokens += usage.prompt_tokens
+                        totals.completion_tokens += usage.completion_tokens
+                        totals.cached_tokens += cached
+
+            return self.wire.decode(response.choices[0].message.content, list(batch_dict))
+
+        except CancelledError:
+            raise
+
+        except Exception as e:
+            status = getattr(e, "status_code", None)
+            raise TranslationError(f"API_ERROR: {e}", fatal=status in FATAL_STATUS) from e
+
+    def _messages(self, batch_dict: Dict[str, str]) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": json.dumps(batch_dict, ensure_ascii=False)},
+        ]
+
+    def _wire_messages(self, batch_dict: Dict[str, str]) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.wire_prompt},
+            {"role": "user", "content": self.wire.encode(batch_dict)},
+        ]
+
+    def batch_request(self, custom_id: str, chunk: List[str]) -> dict:
+        """Строка входного JSONL для Batch API: тот же запрос, что отправил бы translate_batch в формате json"""
+
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": self.model,
+                "messages": self._messages({f"id_{j}": text for j, text in enumerate(chunk)}),
+                "response_format": {"type": "json_object"},
+                "prompt_cache_key": self.memory_namespace,
+            },
+        }
+
+    def plan_offline(self, texts: Iterable[str]) -> List[List[str]]:
+        """Раскладывает по пачкам строки, которым нужен запрос к модели, не отправляя их.
+
+        Проходит те же этапы, что submit_texts: термины, шаблоны, память переводов.
+        """
 
-            content = response.choices[0].message.content
-            if content is None:
-                raise RuntimeError("RESPONSE_ERROR: API вернул пустой ответ (None).")
+        with self._lock:
+            unique = sorted({t for t in texts if t and t not in self.cache and t not in self._pending})
+        if unique and self.terms is not None:
+            unique = self._resolve_locally(unique)
+        templated: Dict[str, Tuple[str, List[str]]] = {}
+        if unique and self.templates:
+            unique, templated = self._group_templates(unique)
+        unique = self._lookup_memory(unique)
+        if templated:
+            self._count_templates(templated, unique)
+        return self._pack(unique)
+
+    def absorb_batch_output(self, chunks: Dict[str, List[str]], lines: Iterable[dict], namespace: str | None = None) -> int:
+        """Кладёт в кеш (и память) переводы из выходного JSONL Batch API; возвращает число строк.
+
+        Сбойные запросы и строки, пропущенные моделью, остаются без перевода —
+        их переведёт обычный конвейер при сборке книги. namespace — namespace
+        памяти, с которым пакет отправлялся (модель и промпт могли с тех пор смениться).
+        """
 
+        absorbed = 0
+        for line in lines:
+            chunk = chunks.get(line.get("custom_id"))
+            response = line.get("response") or {}
+            if chunk is None or response.get("status_code") != 200:
+                continue
+            body = response.get("body") or {}
+            usage = body.get("usage") or {}
+            with self._lock:
+                self.batch_usage.prompt_tokens += usage.get("prompt_tokens", 0)
+                self.batch_usage.completion_tokens += usage.get("completion_tokens", 0)
+                self.batch_usage.cached_tokens += (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
             try:
-                result = json.loads(content)
-            except json.JSONDecodeError as e:
-                raise RuntimeError(f"Чат вернул невалидный JSON: {e}. ") from e
+                result = parse_json_object(body["choices"][0]["message"]["content"])
+            except (KeyError, IndexError, TypeError, RuntimeError):
+                continue
+
+            translated = {}
+            for j, text in enumerate(chunk):
+                value = result.get(f"id_{j}")
+                if isinstance(value, str) and value.strip():
+                    translated[text] = value
+            with self._lock:
+                self.cache.update(translated)
+            if self.memory is not None:
+                self.memory.store(namespace or self.memory_namespace, translated)
+            absorbed += len(translated)
+        self.tracer.count("strings.batch_absorbed", absorbed)
+        return absorbed
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="translate")
+            return self._executor
+
+    def close(self) -> None:
+        """Останавливает пул отправки пачек: ещё не начатые пачки отменяются, запросы в полёте прерываются"""
+
+        self._closing.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def submit_texts(self, texts: Iterable[str], use_templates: bool = True, hints: Dict[str, str] | None = None) -> Future:
+        """Ставит строки в общую очередь перевода и сразу возвращает Future с {оригинал: перевод}.
+
+        Строки, которые уже переводятся по более раннему запросу, повторно не
+        отправляются: Future ждёт и их пачки. Пачки разных вызовов выполняются
+        параллельно в общем пуле (не больше max_in_flight запросов).
+        Строки с числами, датами и суммами переводятся через шаблоны (см. templating).
+        hints — известные вызывающему коду классы строк ({строка: routing.SHEET_NAME}).
+        """
 
-            if not isinstance(result, dict):
-                raise RuntimeError(f"Ожидался JSON object (dict), получено: {type(result).__name__}")
+        self._check_cancel()
+        requested = {t for t in texts if t}
+
+        with self._lock:
+            # Сортировка делает состав пачек (и значит результат) независимым от порядка set
+            unique: List[str] = sorted(t for t in requested if t not in self.cache and t not in self._pending)
+        self.tracer.count("strings.reused", len(requested) - len(unique))
+
+        if unique and self.terms is not None:
+            unique = self._resolve_locally(unique)
+
+        templated: Dict[str, Tuple[str, List[str]]] = {}
+        if unique and self.templates and use_templates:
+            unique, templated = self._group_templates(unique, hints)
+            if hints:
+                # Шаблон идёт по маршруту строки, из которой получен
+                hints = {**hints, **{template: hints[text] for text, (template, _) in templated.items() if text in hints}}
+
+        sent = self._dispatch(unique, hints)
+        if templated:
+            self._count_templates(templated, sent)
+
+        wanted = requested | {template for template, _ in templated.values()}
+        with self._lock:
+            waits = {self._pending[t] for t in wanted if t in self._pending}
+
+        gathered = self._gather(waits, requested)
+        if not templated:
+            return gathered
+        return _then(gathered, lambda result: self._fill_templates(result, templated))
+
+    def _group_templates(
+        self, texts: List[str], hints: Dict[str, str] | None = None
+    ) -> Tuple[List[str], Dict[str, Tuple[str, List[str]]]]:
+        """Делит строки на обычные и шаблонизированные; возвращает (строки и шаблоны к отправке, {строка: (шаблон, значения)})
+
+        Шаблон нужен, только если его делят хотя бы две строки или его перевод
+        уже есть в кеше или памяти: иначе он ничего не сокращает, а метки {{N}}
+        добавляют токены и риск отката на перевод целиком.
+        """
 
-            return result if result else {}
+        plain: List[str] = []
+        candidates: Dict[str, Tuple[str, List[str]]] = {}
+        for text in texts:
+            template, values = extract_template(text)
+            if values and should_translate_text(_strip_placeholders(template)):
+                candidates[text] = (template, values)
+            else:
+                plain.append(text)
+
+        shared: Dict[str, int] = {}
+        for template, _ in candidates.values():
+            shared[template] = shared.get(template, 0) + 1
+        with self._lock:
+            known = {t for t in shared if t in self.cache or t in self._pending}
+        # Одиночные шаблоны ищутся в памяти по маршруту своей строки
+        single_routes: Dict[str, List[str]] = {}
+        for text, (template, _) in candidates.items():
+            if shared[template] == 1 and template not in known:
+                hint = {template: hints[text]} if hints and text in hints else None
+                single_routes.setdefault(self._route_for(template, hint), []).append(template)
+        for route_name, singles in single_routes.items():
+            remaining = set(self._lookup_memory(singles, self._route_namespaces[route_name]))
+            known.update(t for t in singles if t not in remaining)
+
+        templated: Dict[str, Tuple[str, List[str]]] = {}
+        for text, (template, values) in candidates.items():
+            if shared[template] > 1 or template in known:
+                templated[text] = (template, values)
+            else:
+                plain.append(text)
+        if not templated:
+            return plain, templated
+
+        templates = sorted({template for template, _ in templated.values()})
+        with self._lock:
+            to_send = [t for t in templates if t not in self.cache and t not in self._pending]
+            self.template_stats.strings += len(templated)
+        self.tracer.count("strings.templated", len(templated))
+        return plain + to_send, templated
+
+    def _count_templates(self, templated: Dict[str, Tuple[str, List[str]]], sent: Iterable[str]) -> None:
+        """Учитывает шаблоны, которые ушли к модели (найденные в памяти переводов не считаются отправленными)"""
+
+        templates = {template for template, _ in templated.values()}
+        sent_templates = [t for t in sent if t in templates]
+        saved = 2 * (sum(item_tokens(t) for t in templated) - sum(item_tokens(t) for t in sent_templates))
+        with self._lock:
+            self.template_stats.templates_sent += len(sent_templates)
+            # Экономия не бывает отрицательной: шаблон без выгоды сюда не попадает, а откаты её только уменьшают
+            self.template_stats.tokens_saved = max(0, self.template_stats.tokens_saved + saved)
+        self.tracer.count("templates.sent", len(sent_templates))
+
+    def _fill_templates(self, result: Dict[str, str], templated: Dict[str, Tuple[str, List[str]]]):
+        """Подставляет значения в переведённые шаблоны; строки с испорченными метками переводятся целиком"""
+
+        filled: Dict[str, str] = {}
+        fallback: List[str] = []
+        with self._lock:
+            for text, (template, values) in templated.items():
+                translated = self.cache.get(template)
+                value = fill_template(translated, values) if translated is not None else None
+                if value is None:
+                    fallback.append(text)
+                else:
+                    filled[text] = value
+            self.cache.update(filled)
+        result.update(filled)
+
+        if not fallback:
+            return result
+        with self._lock:
+            self.template_stats.fallbacks += len(fallback)
+            self.template_stats.tokens_saved = max(0, self.template_stats.tokens_saved - 2 * sum(item_tokens(t) for t in fallback))
+        self.tracer.count("templates.fallbacks", len(fallback))
+        return _then(self.submit_texts(fallback, use_templates=False), lambda rest: {**result, **rest})
+
+    def _lookup_memory(self, unique: List[str], namespace: str | None = None) -> List[str]:
+        """Кладёт в кеш строки, найденные в памяти переводов, и возвращает остальные"""
+
+        if unique and self.memory is not None:
+            found = self.memory.lookup(namespace or self.memory_namespace, unique)
+            if found:
+                with self._lock:
+                    self.cache.update(found)
+                    self.memory_hits += len(found)
+                unique = [t for t in unique if t not in found]
+                self.tracer.count("strings.memory_hits", len(found))
+        return unique
+
+    def _pack(self, unique: List[str], route: Route | None = None) -> List[List[str]]:
+        if not unique:
+            return []
+        route = route or self.routes[PRIMARY]
+        chunks, stats = pack_batches(
+            unique,
+            max_input_tokens=self.max_batch_input_tokens,
+            max_output_tokens=self.max_batch_output_tokens or output_budget(route.model, route.timeout_s),
+            max_items=route.batch_size or self.batch_size,
+        )
+        self.tracer.count("strings.sent", len(unique))
+        with self._lock:
+            self.pack_stats.merge(stats)
+        return chunks
 
-        except CancelledError:
-            raise
+    def _route_for(self, text: str, hints: Dict[str, str] | None) -> str:
+        string_class = classify(text, hints.get(text) if hints else None)
+        return string_class if string_class in self.routes else PRIMARY
 
-        except Exception as e:
-            raise RuntimeError(f"API_ERROR: {e}") from e
+    def _dispatch(self, unique: List[str], hints: Dict[str, str] | None = None) -> List[str]:
+        """Делит строки по маршрутам, ищет их в памяти переводов, остальные раскладывает по пачкам и отправляет в пул.
+
+        Возвращает строки, ушедшие к модели.
+        """
+
+        sent: List[str] = []
+        groups: Dict[str, List[str]] = {}
+        for text in unique:
+            groups.setdefault(self._route_for(text, hints), []).append(text)
+
+        for route_name, texts in groups.items():
+            texts = self._lookup_memory(texts, self._route_namespaces[route_name])
+            chunks = self._pack(texts, self.routes[route_name])
+            if not chunks:
+                continue
+            sent.extend(texts)
+            self.tracer.count(f"routes.{route_name}.strings", len(texts))
+            executor = self._get_executor()
+            with self._lock:
+                self.route_stats[route_name].strings += len(texts)
+                self.batches_total += len(chunks)
+                for chunk in chunks:
+                    future = executor.submit(self._translate_chunk, chunk, route_name)
+                    for t in chunk:
+                        self._pending[t] = future
+                    future.add_done_callback(lambda f, chunk=chunk: self._forget_pending(chunk, f))
+        return sent
+
+    def _resolve_locally(self, texts: List[str]) -> List[str]:
+        """Кладёт в кеш строки, которые TermMatcher решил без модели, и возвращает остальные"""
+
+        resolved = {}
+        remaining = []
+        for text in texts:
+            local = self.terms.resolve(text)
+            if local is None:
+                remaining.append(text)
+            else:
+                resolved[text] = local
+        if resolved:
+            saved = sum(2 * item_tokens(text) for text in resolved)
+            with self._lock:
+                self.cache.update(resolved)
+                self.local_strings += len(resolved)
+                self.local_tokens_saved += saved
+            self.tracer.count("strings.local", len(resolved))
+            self.tracer.count("tokens.saved_local", saved)
+        return remaining
+
+    def _forget_pending(self, chunk: List[str], future: Future) -> None:
+        with self._lock:
+            for t in chunk:
+                if self._pending.get(t) is future:
+                    del self._pending[t]
+
+    def _gather(self, waits: Set[Future], texts: Set[str]) -> Future:
+        """Future, который завершается, когда завершены все пачки из waits"""
+
+        result: Future = Future()
+        remaining = [len(waits)]
+        lock = threading.Lock()
+
+        def finish() -> None:
+            with self._lock:
+                result.set_result({t: self.cache.get(t, t) for t in texts})
+
+        def on_done(f: Future) -> None:
+            if result.done():
+                return
+            error = f.exception() if not f.cancelled() else CancelledError()
+            with lock:
+                if result.done():
+                    return
+                if error is not None:
+                    result.set_exception(error)
+                    return
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            finish()
+
+        if not waits:
+            finish()
+        for f in waits:
+            f.add_done_callback(on_done)
+        return result
+
+    def preload(self, translations: Dict[str, str]) -> None:
+        """Кладёт в кеш готовые переводы (например, из манифеста прошлого запуска)"""
+
+        with self._lock:
+            self.cache.update(translations)
+
+    def cached(self, texts: Iterable[str]) -> Dict[str, str]:
+        """{строка: перевод} для строк из texts, которые есть в кеше и не попали в failures"""
+
+        with self._lock:
+            return {t: self.cache[t] for t in texts if t in self.cache and t not in self.failures}
 
     def ensure_translated(self, texts: Iterable[str]) -> None:
         """Переводит все строки, которых ещё нет в кеше, используя батчинг"""
 
+        self.submit_texts(texts).result()
+
+    def _translate_chunk(self, chunk: List[str], route_name: str = PRIMARY) -> None:
+        """Переводит одну пачку и кладёт результат в кеш (вызывается из нескольких потоков)"""
+
         self._check_cancel()
+        translated = self._translate_with_recovery(chunk, route_name)
 
-        unique: List[str] = []
-        for t in texts:
-            if t not in self.cache:
-                unique.append(t)
+        with self._lock:
+            self.cache.update(translated)
+            self.batches_done += 1
+            done, total = self.batches_done, self.batches_total
+        self.tracer.progress("translate", done, total)
 
-        if not unique:
-            return
+        if self.memory is not None:
+            self.memory.store(self._route_namespaces[route_name], translated)
 
-        for i in range(0, len(unique), self.batch_size):
-            self._check_cancel()
-            chunk = unique[i : i + self.batch_size]
-            batch = {f"id_{j}": text for j, text in enumerate(chunk)}
-            res = self.translate_batch(batch)
-
-            for batch_id, trans_text in res.items():
-                if (hash(batch_id) & 0xF) == 0:
-                    self._check_cancel()
-                orig_text = batch.get(batch_id)
-                if orig_text is None:
-                    continue
-                self.cache[orig_text] = trans_text
+    def _translate_with_recovery(self, chunk: List[str], route_name: str = PRIMARY) -> Dict[str, str]:
+        """Переводит пачку, дозапрашивая пропущенные строки и деля пачку пополам при ошибке.
 
-        return
+        Маршрут с fallback не чинит ответ сам: строки, не прошедшие проверку,
+        сразу уходят основной модели.
+        """
+
+        fallback = route_name != PRIMARY and self.routes[route_name].fallback
+        translated: Dict[str, str] = {}
+        todo = chunk
+        for _round in range(self.max_repair_rounds + 1):
+            self._check_cancel()
+            batch = {f"id_{j}": text for j, text in enumerate(todo)}
+            try:
+                res = self.translate_batch(batch, route_name)
+            except TranslationError as e:
+                if e.fatal:
+                    raise
+                if fallback:
+                    translated.update(self._fall_back(todo, route_name))
+                    return translated
+                if len(todo) == 1:
+                    self._record_failure(todo[0], str(e))
+                    return translated
+                mid = len(todo) // 2
+                translated.update(self._translate_with_recovery(todo[:mid], route_name))
+                translated.update(self._translate_with_recovery(todo[mid:], route_name))
+                return translated
+
+            missing = []
+            for batch_id, orig_text in batch.items():
+                trans_text = res.get(batch_id)
+                if isinstance(trans_text, str) and trans_text.strip() and (not fallback or placeholders_match(orig_text, trans_text)):
+                    translated[orig_text] = trans_text
+                else:
+                    missing.append(orig_text)
+
+            if not missing:
+                return translated
+            if fallback:
+                translated.update(self._fall_back(missing, route_name))
+                return translated
+            todo = missing
+
+        for text in todo:
+            self._record_failure(text, "модель не вернула перевод для строки")
+        return translated
+
+    def _fall_back(self, texts: List[str], route_name: str) -> Dict[str, str]:
+        """Переводит основной моделью строки, которые маршрут route_name не смог перевести"""
+
+        with self._lock:
+            self.route_stats[route_name].fallbacks += len(texts)
+        self.tracer.count(f"routes.{route_name}.fallbacks", len(texts))
+        return self._translate_with_recovery(texts, PRIMARY)
+
+    def _record_failure(self, text: str, reason: str) -> None:
+        with self._lock:
+            self.failures[text] = reason
+        self.tracer.count("strings.failed")
 
     def translate_texts(self, texts: Iterable[str]) -> Dict[str, str]:
         """Переводит набор строк и возвращает словарь {оригинал: перевод}"""
@@ -165,8 +853,37 @@ class Translator:
 
         return {t: self.cache.get(t, t) for t in unique}
 
+    def _usage_cost(self, usage: UsageTotals, route: Route | None = None) -> float:
+        route = route or self.routes[PRIMARY]
+        uncached = usage.prompt_tokens - usage.cached_tokens
+        return (
+            uncached / 1_000_000 * route.price_in_per_1m
+            + usage.cached_tokens / 1_000_000 * route.price_cached_in_per_1m
+            + usage.completion_tokens / 1_000_000 * route.price_out_per_1m
+        )
+
     @property
     def total_cost_usd(self) -> float:
-        return (self.usage.prompt_tokens / 1_000_000 * self.price_in_per_1m) + (
-            self.usage.completion_tokens / 1_000_000 * self.price_out_per_1m
-        )
+        routed = sum(self._usage_cost(stats.usage, self.routes[name]) for name, stats in self.route_stats.items())
+        return routed + self._usage_cost(self.batch_usage) * self.batch_price_factor
+
+    def route_report(self) -> Dict[str, dict]:
+        """Токены, стоимость и задержка по маршрутам, через которые прошла хотя бы одна строка"""
+
+        report = {}
+        with self._lock:
+            for name, stats in self.route_stats.items():
+                if not stats.requests:
+                    continue
+                report[name] = {
+                    "model": stats.model,
+                    "strings": stats.strings,
+                    "requests": stats.requests,
+                    "prompt_tokens": stats.usage.prompt_tokens,
+                    "completion_tokens": stats.usage.completion_tokens,
+                    "cached_tokens": stats.usage.cached_tokens,
+                    "cost_usd": round(self._usage_cost(stats.usage, self.routes[name]), 6),
+                    "avg_latency_s": round(stats.avg_latency_s, 3),
+                    "fallbacks": stats.fallbacks,
+                }
+        return report
@@ -0,0 +1,50 @@
+import re
+import threading
+import time
+from concurrent.futures import CancelledError
+
+HAS_LETTERS_RE = re.compile(r"[A-Za-zА-Яа-яЁё]", re.UNICODE)
+
+def check_cancel(cancel_event: threading.Event | None) -> None:
+    if cancel_event is not None and cancel_event.is_set():
+        raise CancelledError()
+
+class CancelSignal:
+    """Отмена по любому из событий, например кнопке «Отмена» и закрытию Translator.
+
+    Повторяет нужную часть threading.Event (is_set, wait), поэтому
+    передаётся туда же, куда и cancel_event.
+    """
+
+    POLL_S = 0.05
+
+    def __init__(self, *events: threading.Event | None):
+        self._events = [e for e in events if e is not None]
+
+    def is_set(self) -> bool:
+        return any(e.is_set() for e in self._events)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        if len(self._events) == 1:
+            return self._events[0].wait(timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.is_set():
+            left = self.POLL_S if deadline is None else min(self.POLL_S, deadline - time.monotonic())
+            if left <= 0:
+                return False
+            self._events[0].wait(left)
+        return True
+
+def should_translate_text(text: str) -> bool:
+    """Определяет, нужно ли переводить строку.
+       Возвращает True, если текст содержит буквы.
+    """
+
+    t = text.strip()
+    if len(t) <= 1:
+        return False
+
+    if not HAS_LETTERS_RE.search(t):
+        return False
+
+    return True
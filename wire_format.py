@@ -0,0 +1,147 @@
+import json
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Tuple
+
+# Правила ответа для строкового формата; заменяют JSON-правила системного промпта
+LINES_TECHNICAL = (
+    "\n\n## STRICT RULES (TECHNICAL)\n"
+    "3. Each input line is a number, a TAB and a text. Reply with exactly one line per input line: "
+    "the same number, a TAB and the translation, in the same order."
+    "4. Line breaks, tabs and backslashes inside a text are written as \\n, \\t and \\\\; write them the same way. "
+    "Return ONLY these lines, without markdown, headers or comments."
+    "5. Keep placeholders like {{0}} or {{1}} exactly as they are; they stand for numbers, dates and amounts."
+)
+
+_ESCAPES = {"\\": "\\\\", "\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_UNESCAPES = {"\\": "\\", "n": "\n", "r": "\r", "t": "\t"}
+_ESCAPE_RE = re.compile(r"[\\\n\r\t]")
+_UNESCAPE_RE = re.compile(r"\\(.)")
+# "12<TAB>текст"; модели иногда заменяют TAB на «12: ». Пробел или точка после числа — не разделитель:
+# так начинаются обычные строки текста («2024 год», «1. Введение»)
+_LINE_RE = re.compile(r"^\s*(\d+)(?:\t|: )(.*)$")
+_FENCE_RE = re.compile(r"^\s*```")
+
+def parse_json_object(content: str | None) -> dict:
+    """Разбирает ответ модели: JSON-объект {id: перевод}"""
+
+    if content is None:
+        raise RuntimeError("RESPONSE_ERROR: API вернул пустой ответ (None).")
+
+    try:
+        result = json.loads(content)
+    except json.JSONDecodeError as e:
+        raise RuntimeError(f"Чат вернул невалидный JSON: {e}. ") from e
+
+    if not isinstance(result, dict):
+        raise RuntimeError(f"Ожидался JSON object (dict), получено: {type(result).__name__}")
+
+    return result if result else {}
+
+def escape_line(text: str) -> str:
+    return _ESCAPE_RE.sub(lambda m: _ESCAPES[m.group(0)], text)
+
+def unescape_line(text: str) -> str:
+    return _UNESCAPE_RE.sub(lambda m: _UNESCAPES.get(m.group(1), m.group(0)), text)
+
+def format_lines(items: Iterable[Tuple[int, str]]) -> str:
+    return "\n".join(f"{number}\t{escape_line(text)}" for number, text in items)
+
+def parse_lines(content: str | None, count: int | None = None) -> Dict[int, str]:
+    """Разбирает ответ «номер TAB текст» в {номер: текст}.
+
+    Строка без номера считается продолжением предыдущей (модель развернула \\n
+    в настоящий перенос), ограждения ``` пропускаются. Номера идут по
+    возрастанию: номер вне диапазона 0..count-1 или не больше предыдущего —
+    тоже продолжение текста («2024<TAB>...» внутри перевода), а не новая строка.
+    """
+
+    if content is None:
+        raise RuntimeError("RESPONSE_ERROR: API вернул пустой ответ (None).")
+
+    result: Dict[int, List[str]] = {}
+    current: List[str] | None = None
+    last = -1
+    for line in content.splitlines():
+        if _FENCE_RE.match(line):
+            current = None
+            continue
+        match = _LINE_RE.match(line)
+        number = int(match.group(1)) if match is not None else -1
+        if number <= last or (count is not None and number >= count):
+            if current is not None and line.strip():
+                current.append(line)
+            continue
+        last = number
+        current = result[number] = [match.group(2)]
+
+    if not result and content.strip():
+        raise RuntimeError(f"Ответ не в формате «номер TAB перевод»: {content[:200]!r}")
+    return {number: unescape_line("\n".join(parts)).strip() for number, parts in result.items()}
+
+class WireFormat(ABC):
+    """Как пачка {id: текст} кодируется в сообщение модели и как разбирается ответ.
+
+    technical — правила ответа для системного промпта вместо JSON-правил
+    (None — промпт не меняется).
+    """
+
+    name = ""
+    technical: str | None = None
+    response_format = {"type": "json_object"}
+
+    @abstractmethod
+    def encode(self, batch: Dict[str, str]) -> str:
+        """Текст пользовательского сообщения для пачки"""
+
+    @abstractmethod
+    def decode(self, content: str | None, keys: List[str]) -> Dict[str, object]:
+        """{ключ пачки: значение из ответа}; ключи, которых нет в ответе, отсутствуют"""
+
+class JsonFormat(WireFormat):
+    """Исходный формат: {"id_0": текст, ...} в обе стороны"""
+
+    name = "json"
+
+    def encode(self, batch: Dict[str, str]) -> str:
+        return json.dumps(batch, ensure_ascii=False)
+
+    def decode(self, content: str | None, keys: List[str]) -> Dict[str, object]:
+        return parse_json_object(content)
+
+class NumericJsonFormat(WireFormat):
+    """JSON-объект с ключами "0", "1", ...: те же правила промпта, короче каждый ключ"""
+
+    name = "numeric"
+
+    def encode(self, batch: Dict[str, str]) -> str:
+        return json.dumps({str(i): text for i, text in enumerate(batch.values())}, ensure_ascii=False)
+
+    def decode(self, content: str | None, keys: List[str]) -> Dict[str, object]:
+        result = {}
+        for key, value in parse_json_object(content).items():
+            index = int(key) if isinstance(key, str) and key.isdigit() else -1
+            if 0 <= index < len(keys):
+                result[keys[index]] = value
+        return result
+
+class LinesFormat(WireFormat):
+    """Строка на текст: «номер TAB текст» без кавычек и JSON-экранирования"""
+
+    name = "lines"
+    technical = LINES_TECHNICAL
+    response_format = {"type": "text"}
+
+    def encode(self, batch: Dict[str, str]) -> str:
+        return format_lines(enumerate(batch.values()))
+
+    def decode(self, content: str | None, keys: List[str]) -> Dict[str, object]:
+        return {keys[number]: text for number, text in parse_lines(content, len(keys)).items()}
+
+WIRE_FORMATS: Dict[str, WireFormat] = {wire.name: wire for wire in (JsonFormat(), NumericJsonFormat(), LinesFormat())}
+
+def get_wire_format(name: str) -> WireFormat:
+    wire = WIRE_FORMATS.get(name)
+    if wire is None:
+        raise ValueError(f"Неизвестный формат пачек: {name}. Допустимо: {', '.join(WIRE_FORMATS)}")
+    return wire